@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Local Policy Benchmark
+Throughput of the GPU-free policies in local_policies.py, as policies and as
+load generators:
+
+  1. raw     - get_action() alone, to show the policy itself is never the
+               bottleneck
+  2. loop    - the full MinecraftAIServer loop driven by the policy against
+               the mock bridge (step_delay=0), with per-stage latency
+
+One report per policy. Without --policy-log the replay policy replays a
+session log recorded from the random policy first.
+
+  python bridge/benchmarks/bench_policies.py --steps 2000
+  python bridge/benchmarks/bench_policies.py --policies replay \\
+      --policy-log bridge/agent_logs/session_20250101_120000.jsonl --json policies.json
+"""
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from replay_bench import StageTimer
+from mock_bridge import MockBridgeServer, SessionRecording
+from local_policies import POLICIES, RandomPolicy, make_policy
+from server_mineflayer import MinecraftAIServer
+
+
+def record_random_log(path: Path, count: int, seed: int = 0) -> Path:
+    """Write a session log of random actions, in the server's log format"""
+    policy = RandomPolicy(seed=seed)
+    with open(path, 'w') as f:
+        for step in range(count):
+            action = policy.get_action({})
+            f.write(json.dumps({'step': step, 'action': str(action), 'action_type': action['type']}) + '\n')
+    return path
+
+
+def bench_raw(policy, actions: int):
+    """Time get_action() on a fixed observation"""
+    obs = {'position': {'x': 0.0, 'y': 64.0, 'z': 0.0}, 'health': 20}
+    start = time.perf_counter()
+    for _ in range(actions):
+        policy.get_action(obs)
+    wall = time.perf_counter() - start
+    return {'actions': actions, 'wall_s': wall, 'actions_per_s': actions / wall if wall > 0 else 0.0}
+
+
+def bench_loop(name: str, args, policy_log: str, log_dir: str):
+    """Run the server loop with the policy as its agent"""
+    server = MinecraftAIServer(
+        bridge_port=args.bridge_port,
+        auto_start_bridge=False,
+        spawn_wait=0,
+        policy=name,
+        policy_log=policy_log,
+        seed=args.seed,
+        max_steps=args.steps,
+        step_delay=0,
+        log_dir=log_dir,
+        binary_actions=args.binary_actions,
+    )
+
+    timer = StageTimer()
+    timer.wrap(server.env, 'get_pov_image', 'screenshot')
+    timer.wrap(server.env, 'step', 'env_step')
+    timer.wrap(server.env, 'get_chat_instructions', 'chat_poll')
+    timer.wrap(server.agent, 'get_action', 'policy')
+
+    start = time.perf_counter()
+    server.run()
+    wall = time.perf_counter() - start
+
+    steps = len(timer.samples['env_step'])
+    return {
+        'steps': steps,
+        'wall_s': wall,
+        'steps_per_s': steps / wall if wall > 0 else 0.0,
+        'stages': timer.summary(),
+        'policy_stats': server.agent.stats(),
+    }
+
+
+def run_benchmark(args):
+    recording = SessionRecording.synthetic(count=args.frames)
+    bridge = MockBridgeServer(recording, port=args.bridge_port).start()
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix='bench_policies_')
+
+    policy_log = args.policy_log
+    if 'replay' in args.policies and not policy_log:
+        policy_log = str(record_random_log(Path(log_dir) / 'recorded_random.jsonl', 1000, seed=args.seed or 0))
+
+    reports = {}
+    try:
+        for name in args.policies:
+            policy = make_policy(name, seed=args.seed, replay_path=policy_log)
+            reports[name] = {
+                'raw': bench_raw(policy, args.raw_actions),
+                'loop': bench_loop(name, args, policy_log, str(Path(log_dir) / name)),
+            }
+    finally:
+        bridge.stop()
+
+    return {
+        'policies': reports,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'config': {k: v for k, v in vars(args).items() if k != 'json'},
+    }
+
+
+def print_report(report):
+    print()
+    print("=" * 70)
+    for name, result in report['policies'].items():
+        raw, loop = result['raw'], result['loop']
+        print(f"[Bench] policy={name}")
+        print(f"[Bench]   raw:  {raw['actions']} actions in {raw['wall_s']:.3f}s "
+              f"-> {raw['actions_per_s']:.0f} actions/s")
+        print(f"[Bench]   loop: {loop['steps']} steps in {loop['wall_s']:.2f}s "
+              f"-> {loop['steps_per_s']:.1f} steps/s")
+        print(f"[Bench]   {'stage':<12} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+        for stage, row in loop['stages'].items():
+            print(f"[Bench]   {stage:<12} {row['count']:>6} {row['mean_ms']:>7.2f}ms {row['p50_ms']:>7.2f}ms "
+                  f"{row['p95_ms']:>7.2f}ms {row['max_ms']:>7.2f}ms")
+    print(f"[Bench] Max RSS: {report['max_rss_mb']:.1f} MB")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput of the local policies, alone and driving the loop')
+    parser.add_argument('--policies', type=lambda s: s.split(','), default=list(POLICIES),
+                        help='Comma-separated policies to benchmark (default: all)')
+    parser.add_argument('--policy-log', type=str, default=None,
+                        help='Session log for the replay policy (default: a recorded random run)')
+    parser.add_argument('--steps', type=int, default=1000,
+                        help='Loop steps per policy')
+    parser.add_argument('--raw-actions', type=int, default=100000,
+                        help='get_action() calls for the raw measurement')
+    parser.add_argument('--frames', type=int, default=8,
+                        help='Synthetic frames served by the mock bridge')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='RNG seed for the random/explore policies')
+    parser.add_argument('--binary-actions', action='store_true',
+                        help='Send compound actions as packed binary records')
+    parser.add_argument('--bridge-port', type=int, default=11111,
+                        help='Port for the mock bridge')
+    parser.add_argument('--log-dir', type=str, default=None,
+                        help='Where the server writes session logs (default: temp dir)')
+    parser.add_argument('--json', type=str, default=None,
+                        help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.policies if name not in POLICIES]
+    if unknown:
+        parser.error(f"Unknown policies {unknown} (expected {sorted(POLICIES)})")
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
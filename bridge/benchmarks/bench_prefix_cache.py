@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Prefix Cache Benchmark
+Measures time-to-first-token (TTFT) against a running vLLM server with and
+without a shared prompt prefix.
+
+  shared   - system -> instruction -> image (layout used by VLLMAgentAdapter)
+  unshared - a per-request nonce, then image -> instruction, so no two
+             requests share a cacheable prefix
+
+Start the server with prefix caching enabled (the default in
+start_vllm_server.sh), then run:
+
+  python bridge/benchmarks/bench_prefix_cache.py --base-url http://localhost:3000/v1
+"""
+
+import argparse
+import base64
+import io
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from openai import OpenAI
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from vllm_client import layout_messages
+
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+INSTRUCTION = (
+    "You are playing Minecraft. Look at the current first-person view and "
+    "output the next low-level action (camera and buttons) to complete the task: "
+)
+
+
+def random_frame(width=640, height=360) -> str:
+    """Return a random JPEG frame as a data URL (a new frame every step)"""
+    image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def build_messages(task: str, shared: bool):
+    image_part = {'type': 'image_url', 'image_url': {'url': random_frame()}}
+    text_part = {'type': 'text', 'text': INSTRUCTION + task}
+    if shared:
+        messages = [{'role': 'user', 'content': [image_part, text_part]}]
+        return layout_messages(messages, SYSTEM_PROMPT)
+    nonce = f"[request {uuid.uuid4()}] "
+    return [
+        {'role': 'system', 'content': nonce + SYSTEM_PROMPT},
+        {'role': 'user', 'content': [image_part, text_part]},
+    ]
+
+
+def measure_ttft(client, model, messages, max_tokens) -> float:
+    """Seconds until the first streamed token arrives"""
+    start = time.perf_counter()
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.0,
+        stream=True,
+    )
+    ttft = None
+    for chunk in stream:
+        if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+            ttft = time.perf_counter() - start
+    return ttft if ttft is not None else time.perf_counter() - start
+
+
+def summarize(name, samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))]
+    print(f"  {name:<9} n={len(samples_ms):<4} "
+          f"mean={statistics.mean(samples_ms):7.1f}ms  "
+          f"p50={statistics.median(samples_ms):7.1f}ms  p95={p95:7.1f}ms")
+    return statistics.median(samples_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTFT with and without a shared prompt prefix')
+    parser.add_argument('--base-url', type=str, default='http://localhost:3000/v1',
+                        help='vLLM OpenAI-compatible base URL')
+    parser.add_argument('--steps', type=int, default=50,
+                        help='Requests per mode')
+    parser.add_argument('--warmup', type=int, default=3,
+                        help='Warm-up requests per mode (not measured)')
+    parser.add_argument('--max-tokens', type=int, default=8,
+                        help='Tokens to generate per request')
+    parser.add_argument('--task', type=str, default='chop down a tree and collect logs',
+                        help='Task text appended to the instruction')
+    args = parser.parse_args()
+
+    client = OpenAI(api_key='EMPTY', base_url=args.base_url)
+    model = client.models.list().data[0].id
+    print(f"[Bench] Model: {model} @ {args.base_url}")
+
+    results = {}
+    for mode in ('unshared', 'shared'):
+        for _ in range(args.warmup):
+            measure_ttft(client, model, build_messages(args.task, mode == 'shared'), args.max_tokens)
+        results[mode] = [
+            measure_ttft(client, model, build_messages(args.task, mode == 'shared'), args.max_tokens)
+            for _ in range(args.steps)
+        ]
+
+    print("[Bench] Time to first token:")
+    unshared = summarize('unshared', results['unshared'])
+    shared = summarize('shared', results['shared'])
+    print(f"[Bench] Shared prefix p50 speedup: {unshared / max(shared, 1e-6):.2f}x")
+
+
+if __name__ == '__main__':
+    main()
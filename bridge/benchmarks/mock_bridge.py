@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Mock Mineflayer Bridge
+Local HTTP stand-in for mineflayer_bridge.js that serves recorded frames, so
+MineflayerEnv can be driven without Node, a Minecraft server or a GPU.
+
+Frames come from an agent session (session_*.jsonl written by
+MinecraftAIServer, whose entries point at the saved step JPEGs) or from any
+directory of JPEG files. JPEG bytes are served as-is, no re-encoding.
+For an in-process replay without HTTP, see ReplayEnv in replay_env.py.
+
+  python bridge/benchmarks/mock_bridge.py --session agent_logs/session_X.jsonl --port 1111
+"""
+
+import argparse
+import base64
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from replay_env import SessionRecording
+
+
+class MockBridgeServer:
+    """
+    Threaded HTTP server implementing the bridge API used by MineflayerEnv
+    """
+
+    def __init__(self, recording: SessionRecording, port: int = 1111, host: str = 'localhost'):
+        self.recording = recording
+        self.host = host
+        self.port = port
+        self.step = 0
+        self.frame_index = 0
+        self.request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _make_handler(self):
+        bridge = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                route = self.path.split('?')[0]
+                with bridge._lock:
+                    bridge.request_counts[route] = bridge.request_counts.get(route, 0) + 1
+                self._reply(bridge.handle(route))
+
+            do_GET = _handle
+            do_POST = _handle
+
+        return Handler
+
+    def handle(self, route: str) -> Dict[str, Any]:
+        """Build the JSON response for a bridge route"""
+        if route == '/init':
+            return {'success': True, 'message': 'Bot initialized'}
+        if route == '/status':
+            return {'success': True, 'connected': True, 'username': 'MockBot'}
+        if route == '/viewer/status':
+            return {'success': True, 'viewerReady': True, 'serverViewer': True,
+                    'viewerRenderer': True, 'botConnected': True}
+        if route == '/reset':
+            with self._lock:
+                self.step = 0
+            return {'success': True, 'observation': self.recording.observation(0)}
+        if route in ('/action', '/action/binary'):
+            with self._lock:
+                self.step += 1
+                step = self.step
+            return {'success': True, 'observation': self.recording.observation(step)}
+        if route == '/screenshot':
+            with self._lock:
+                index = self.frame_index
+                self.frame_index += 1
+            image = base64.b64encode(self.recording.frame(index)).decode('ascii')
+            # Recorded frames always differ from the previous one
+            return {'success': True, 'image': image, 'changed': True, 'frameId': index + 1,
+                    'format': 'jpeg', 'width': 640, 'height': 360, 'viewerReady': True}
+        if route == '/chat/instructions':
+            return {'success': True, 'instructions': [], 'current': None}
+        if route == '/chat/start_instruction':
+            return {'success': True, 'instruction': None}
+        if route in ('/chat/clear_instruction', '/close'):
+            return {'success': True}
+        return {'success': False, 'error': f'Unknown route: {route}'}
+
+    def start(self) -> 'MockBridgeServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Mineflayer bridge serving recorded frames')
+    parser.add_argument('--session', type=str, default=None,
+                        help='session_*.jsonl file or directory of JPEGs (default: synthetic frames)')
+    parser.add_argument('--port', type=int, default=1111,
+                        help='Port to listen on')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Maximum number of frames to load')
+    args = parser.parse_args()
+
+    if args.session:
+        recording = SessionRecording.load(args.session, limit=args.limit)
+    else:
+        recording = SessionRecording.synthetic(count=8)
+    server = MockBridgeServer(recording, port=args.port)
+    print(f"[MockBridge] Serving {len(recording)} frames on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
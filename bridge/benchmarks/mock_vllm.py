@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Mock vLLM Endpoint
+Minimal OpenAI-compatible server (/v1/models, /v1/chat/completions) that
+answers with a fixed action text after a sampled delay, so the agent loop can
+be benchmarked on a CPU-only machine.
+
+Latency specs (milliseconds):
+  const:50            always 50ms
+  uniform:20,80       uniform between 20 and 80ms
+  normal:60,15        normal(mean, std), clipped at 0
+  lognormal:4.0,0.5   exp(normal(mu, sigma))
+  exp:60              exponential with the given mean
+
+  python bridge/benchmarks/mock_vllm.py --port 8000 --ttft normal:80,20 --per-token const:5
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from replay_env import parse_latency
+
+
+def split_tokens(text: str) -> List[str]:
+    """Rough tokenization for streaming: special tokens, then single characters"""
+    return [t for t in re.split(r'(<\|[^|]*\|>)', text) if t] if '<|' in text else list(text)
+
+
+class MockVLLMServer:
+    """
+    Threaded OpenAI-compatible server with configurable latency
+    """
+
+    def __init__(
+        self,
+        port: int = 8000,
+        host: str = 'localhost',
+        model: str = 'JarvisVLA-Qwen2-VL-7B',
+        action_text: str = '',
+        ttft: str = 'const:50',
+        per_token: str = 'const:0',
+    ):
+        self.host = host
+        self.port = port
+        self.model = model
+        self.action_text = action_text
+        self.sample_ttft = parse_latency(ttft)
+        self.sample_per_token = parse_latency(per_token)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _completion_chunk(self, request_id: str, content: str, finish_reason=None) -> Dict[str, Any]:
+        return {
+            'id': request_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': self.model,
+            'choices': [{'index': 0, 'delta': {'content': content} if content else {},
+                         'finish_reason': finish_reason}],
+        }
+
+    def _completion(self, request_id: str, content: str) -> Dict[str, Any]:
+        return {
+            'id': request_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': self.model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop', 'logprobs': None}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(split_tokens(content)),
+                      'total_tokens': len(split_tokens(content))},
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, payload: Dict[str, Any], status: int = 200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self._reply({'object': 'list', 'data': [
+                        {'id': server.model, 'object': 'model', 'owned_by': 'mock'}]})
+                elif self.path.rstrip('/') == '/health':
+                    self._reply({})
+                else:
+                    self._reply({'error': 'not found'}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._reply({'error': 'not found'}, status=404)
+                    return
+
+                with server._lock:
+                    server.requests += 1
+                request_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                tokens = split_tokens(server.action_text)
+                max_tokens = request.get('max_tokens')
+                if max_tokens:
+                    tokens = tokens[:max_tokens]
+
+                time.sleep(server.sample_ttft())
+
+                if not request.get('stream'):
+                    for _ in tokens[1:]:
+                        time.sleep(server.sample_per_token())
+                    self._reply(server._completion(request_id, ''.join(tokens)))
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for i, token in enumerate(tokens):
+                        if i:
+                            time.sleep(server.sample_per_token())
+                        chunk = server._completion_chunk(request_id, token)
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    chunk = server._completion_chunk(request_id, '', finish_reason='stop')
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client closed the stream early (early-exit decoding)
+                    pass
+
+        return Handler
+
+    def start(self) -> 'MockVLLMServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock OpenAI-compatible vLLM endpoint')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='Port to listen on')
+    parser.add_argument('--model', type=str, default='JarvisVLA-Qwen2-VL-7B',
+                        help='Model id reported by /v1/models')
+    parser.add_argument('--action-text', type=str, default='',
+                        help='Completion text returned for every request')
+    parser.add_argument('--ttft', type=str, default='const:50',
+                        help='Time-to-first-token distribution (ms)')
+    parser.add_argument('--per-token', type=str, default='const:0',
+                        help='Inter-token latency distribution (ms)')
+    args = parser.parse_args()
+
+    server = MockVLLMServer(port=args.port, model=args.model, action_text=args.action_text,
+                            ttft=args.ttft, per_token=args.per_token)
+    print(f"[MockVLLM] Serving {args.model} on {server.base_url} (ttft={args.ttft}, per-token={args.per_token})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
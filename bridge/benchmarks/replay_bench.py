@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Offline Replay Benchmark
+Runs the full agent loop (MinecraftAIServer -> MineflayerEnv ->
+VLLMAgentAdapter) against a mock bridge serving recorded frames and a mock
+vLLM endpoint with configurable latency. Nothing in the loop is modified;
+per-stage timings are collected by wrapping the env/agent methods.
+
+Reports steps/s, per-stage latency (mean/p50/p95/max) and memory.
+
+  # Env + server only (no agent)
+  python bridge/benchmarks/replay_bench.py --no-agent --steps 500
+
+  # Full loop (needs JarvisVLA installed for the action tokenizer)
+  python bridge/benchmarks/replay_bench.py --checkpoint ./models/JarvisVLA-Qwen2-VL-7B \\
+      --session agent_logs/session_X.jsonl --ttft normal:80,20 --steps 300
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_bridge import MockBridgeServer, SessionRecording
+from mock_vllm import MockVLLMServer
+from server_mineflayer import MinecraftAIServer
+
+
+class StageTimer:
+    """Collects wall-clock durations of wrapped methods, keyed by stage name"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, obj, method: str, stage: str = None):
+        fn = getattr(obj, method)
+        samples = self.samples[stage or method]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        setattr(obj, method, timed)
+
+    def summary(self):
+        rows = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = sorted(s * 1000 for s in samples)
+            rows[stage] = {
+                'count': len(ms),
+                'mean_ms': statistics.mean(ms),
+                'p50_ms': statistics.median(ms),
+                'p95_ms': ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+                'max_ms': ms[-1],
+            }
+        return rows
+
+
+def run_benchmark(args):
+    if args.session:
+        recording = SessionRecording.load(args.session, limit=args.frames)
+    else:
+        recording = SessionRecording.synthetic(count=args.frames or 8)
+
+    bridge = MockBridgeServer(recording, port=args.bridge_port).start()
+    vllm = None
+    if not args.no_agent:
+        vllm = MockVLLMServer(port=args.vllm_port, action_text=args.action_text,
+                              ttft=args.ttft, per_token=args.per_token).start()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix='replay_bench_')
+    server = MinecraftAIServer(
+        bridge_port=args.bridge_port,
+        auto_start_bridge=False,
+        spawn_wait=0,
+        vllm_base_url=vllm.base_url if vllm else None,
+        checkpoint_path=None if args.no_agent else args.checkpoint,
+        action_chunk_len=args.action_chunk_len,
+        history_num=args.history_num,
+        cached_history=args.cached_history,
+        max_steps=args.steps,
+        step_delay=0,
+        log_dir=log_dir,
+        binary_actions=args.binary_actions,
+    )
+
+    timer = StageTimer()
+    timer.wrap(server.env, 'get_pov_image', 'screenshot')
+    timer.wrap(server.env, 'step', 'env_step')
+    timer.wrap(server.env, 'get_chat_instructions', 'chat_poll')
+    if server.agent:
+        timer.wrap(server.agent, 'get_action', 'inference')
+
+    start = time.perf_counter()
+    server.run()
+    wall = time.perf_counter() - start
+
+    steps = len(timer.samples['env_step'])
+    report = {
+        'steps': steps,
+        'wall_s': wall,
+        'steps_per_s': steps / wall if wall > 0 else 0.0,
+        'stages': timer.summary(),
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'frames': len(recording),
+        'vllm_requests': vllm.requests if vllm else 0,
+        'config': {k: v for k, v in vars(args).items() if k != 'json'},
+    }
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report['python_heap_current_mb'] = current / (1024 * 1024)
+        report['python_heap_peak_mb'] = peak / (1024 * 1024)
+
+    bridge.stop()
+    if vllm:
+        vllm.stop()
+    return report
+
+
+def print_report(report):
+    print()
+    print("=" * 70)
+    print(f"[Bench] {report['steps']} steps in {report['wall_s']:.2f}s "
+          f"-> {report['steps_per_s']:.1f} steps/s")
+    print(f"[Bench] {'stage':<12} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for stage, row in report['stages'].items():
+        print(f"[Bench] {stage:<12} {row['count']:>6} {row['mean_ms']:>7.2f}ms {row['p50_ms']:>7.2f}ms "
+              f"{row['p95_ms']:>7.2f}ms {row['max_ms']:>7.2f}ms")
+    print(f"[Bench] Max RSS: {report['max_rss_mb']:.1f} MB")
+    if 'python_heap_peak_mb' in report:
+        print(f"[Bench] Python heap peak: {report['python_heap_peak_mb']:.1f} MB")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the full agent loop')
+    parser.add_argument('--session', type=str, default=None,
+                        help='Recorded session_*.jsonl or directory of JPEGs (default: synthetic frames)')
+    parser.add_argument('--frames', type=int, default=None,
+                        help='Maximum number of recorded frames to load')
+    parser.add_argument('--steps', type=int, default=200,
+                        help='Number of loop steps to run')
+    parser.add_argument('--no-agent', action='store_true',
+                        help='Run without the VLLM agent (noop actions)')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='JarvisVLA checkpoint (for the action tokenizer)')
+    parser.add_argument('--action-text', type=str, default='',
+                        help='Completion text the mock vLLM returns')
+    parser.add_argument('--ttft', type=str, default='const:50',
+                        help='Mock vLLM time-to-first-token distribution (ms)')
+    parser.add_argument('--per-token', type=str, default='const:0',
+                        help='Mock vLLM inter-token latency distribution (ms)')
+    parser.add_argument('--action-chunk-len', type=int, default=1,
+                        help='Actions generated per request')
+    parser.add_argument('--binary-actions', action='store_true',
+                        help='Send compound actions as packed binary records')
+    parser.add_argument('--history-num', type=int, default=0,
+                        help='History frames sent per request')
+    parser.add_argument('--cached-history', action='store_true',
+                        help='Keep history frames pre-encoded (flat history layout)')
+    parser.add_argument('--bridge-port', type=int, default=11111,
+                        help='Port for the mock bridge')
+    parser.add_argument('--vllm-port', type=int, default=18000,
+                        help='Port for the mock vLLM endpoint')
+    parser.add_argument('--log-dir', type=str, default=None,
+                        help='Where the server writes step logs (default: temp dir)')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='Track Python heap usage (adds overhead)')
+    parser.add_argument('--json', type=str, default=None,
+                        help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    if not args.no_agent and not args.checkpoint:
+        parser.error('--checkpoint is required unless --no-agent is set')
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+/**
+ * Shared chunk mesh cache for server-side viewers
+ *
+ * Every viewer's WorldRenderer meshes the columns its WorldView loads. Bots
+ * standing in the same area (or walking back through explored terrain)
+ * would mesh the same columns again, so finished column meshes are kept
+ * here, keyed by version, column coordinates and a hash of the column data:
+ *
+ *   - the first viewer to load a column meshes it as usual; once all of its
+ *     sections are finished the geometries move into the cache
+ *   - any viewer loading an identical column (same key) builds its meshes
+ *     from the cached geometries - no mesher work, and since all viewers
+ *     render through one renderer the GPU buffers are shared too
+ *   - entries are refcounted by the viewers showing them; unreferenced
+ *     entries stay around in LRU order until maxIdle is exceeded
+ *
+ * A column that changes after loading (block updates) gets fresh meshes for
+ * the changed sections from that viewer's own workers; cached geometry is
+ * never modified or disposed while referenced.
+ */
+
+const crypto = require('crypto')
+const THREE = require('three')
+
+// Same key as prismarine-viewer's worker uses in sectionFinished messages
+function sectionKeyOf(pos) {
+  return `${Math.floor(pos.x / 16) * 16},${Math.floor(pos.y / 16) * 16},${Math.floor(pos.z / 16) * 16}`
+}
+
+function columnOf(sectionKey) {
+  const [x, , z] = sectionKey.split(',')
+  return `${x},${z}`
+}
+
+class ChunkMeshCache {
+  constructor(maxIdle = 1024) {
+    this.maxIdle = maxIdle
+    this.entries = new Map()      // key -> { sections, complete, builder, refs }
+    this.idle = new Map()         // unreferenced complete entries, least recently used first
+    this.shared = new WeakSet()   // geometries owned by the cache (never disposed by viewers)
+    this.worlds = new WeakMap()   // WorldRenderer -> { version, columns, outstanding }
+    this.hits = 0
+    this.misses = 0
+    this.evictions = 0
+  }
+
+  columnKey(version, x, z, chunk) {
+    const data = typeof chunk === 'string' ? chunk : JSON.stringify(chunk)
+    const digest = crypto.createHash('sha1').update(data).digest('base64')
+    return `${version}:${x},${z}:${digest}`
+  }
+
+  // Hook a viewer's WorldRenderer (call before it receives any chunk)
+  attach(world, version) {
+    const cache = this
+    const state = { version, columns: new Map(), outstanding: new Set() }
+    this.worlds.set(world, state)
+
+    const addColumn = world.addColumn.bind(world)
+    const removeColumn = world.removeColumn.bind(world)
+    const setSectionDirty = world.setSectionDirty.bind(world)
+    const resetWorld = world.resetWorld ? world.resetWorld.bind(world) : null
+
+    world.addColumn = function (x, z, chunk) {
+      const column = `${x},${z}`
+      cache._releaseColumn(world, state, column)
+      const key = cache.columnKey(state.version, x, z, chunk)
+      const entry = cache.entries.get(key)
+
+      if (entry && entry.complete) {
+        cache.hits++
+        cache.idle.delete(key)
+        entry.refs.add(world)
+        state.columns.set(column, key)
+        // Workers still get the column for later block updates, but nothing is re-meshed
+        this.loadedChunks[column] = true
+        for (const worker of this.workers) {
+          worker.postMessage({ type: 'chunk', x, z, chunk })
+        }
+        for (const [sectionKey, section] of entry.sections) {
+          const mesh = new THREE.Mesh(section.geometry, this.material)
+          mesh.position.copy(section.position)
+          mesh.name = 'mesh'
+          mesh.matrixAutoUpdate = false
+          mesh.updateMatrix()
+          this.sectionMeshs[sectionKey] = mesh
+          this.scene.add(mesh)
+        }
+        return
+      }
+
+      cache.misses++
+      if (!entry) {
+        // This viewer builds the entry; identical columns loading meanwhile mesh on their own
+        cache.entries.set(key, { sections: new Map(), complete: false, builder: world, refs: new Set([world]) })
+        state.columns.set(column, key)
+      }
+      addColumn(x, z, chunk)
+    }
+
+    world.removeColumn = function (x, z) {
+      const column = `${x},${z}`
+      cache._detachMeshes(world, key => columnOf(key) === column)
+      cache._releaseColumn(world, state, column)
+      removeColumn(x, z)
+    }
+
+    world.setSectionDirty = function (pos, value = true) {
+      // Block-level calls (setBlockStateId and its neighbours) pass block
+      // coordinates; the worker answers with the section-aligned key.
+      // removeColumn clears sections with value=false - nothing to wait for.
+      if (value) state.outstanding.add(sectionKeyOf(pos))
+      return setSectionDirty(pos, value)
+    }
+
+    if (resetWorld) {
+      world.resetWorld = function () {
+        cache.detach(world)
+        return resetWorld()
+      }
+    }
+
+    for (const worker of world.workers) {
+      const onmessage = worker.onmessage
+      worker.onmessage = function (message) {
+        const data = message.data
+        if (data && data.type === 'geometry') {
+          // Replacing a cached mesh: take it out of the scene so the
+          // original handler does not dispose the shared geometry
+          const mesh = world.sectionMeshs[data.key]
+          if (mesh && cache.shared.has(mesh.geometry)) {
+            world.scene.remove(mesh)
+            delete world.sectionMeshs[data.key]
+          }
+        }
+        const result = onmessage.call(this, message)
+        if (data && data.type === 'geometry') {
+          cache._recordSection(world, state, data.key)
+        } else if (data && data.type === 'sectionFinished') {
+          state.outstanding.delete(data.key)
+          cache._maybeComplete(world, state, columnOf(data.key))
+        }
+        return result
+      }
+    }
+  }
+
+  // Drop all of a viewer's references and take cached meshes out of its scene
+  detach(world) {
+    const state = this.worlds.get(world)
+    if (!state) return
+    this._detachMeshes(world, () => true)
+    for (const column of [...state.columns.keys()]) {
+      this._releaseColumn(world, state, column)
+    }
+    state.outstanding.clear()
+  }
+
+  stats() {
+    let building = 0
+    for (const entry of this.entries.values()) {
+      if (!entry.complete) building++
+    }
+    const lookups = this.hits + this.misses
+    return {
+      entries: this.entries.size,
+      idle: this.idle.size,
+      building,
+      hits: this.hits,
+      misses: this.misses,
+      hitRate: lookups ? +(this.hits / lookups).toFixed(3) : 0,
+      evictions: this.evictions
+    }
+  }
+
+  _detachMeshes(world, match) {
+    for (const [sectionKey, mesh] of Object.entries(world.sectionMeshs)) {
+      if (match(sectionKey) && this.shared.has(mesh.geometry)) {
+        world.scene.remove(mesh)
+        delete world.sectionMeshs[sectionKey]
+      }
+    }
+  }
+
+  _recordSection(world, state, sectionKey) {
+    const entry = this.entries.get(state.columns.get(columnOf(sectionKey)))
+    if (!entry || entry.complete || entry.builder !== world) return
+    const mesh = world.sectionMeshs[sectionKey]
+    if (mesh) {
+      entry.sections.set(sectionKey, { geometry: mesh.geometry, position: mesh.position.clone() })
+    } else {
+      entry.sections.delete(sectionKey)
+    }
+  }
+
+  _maybeComplete(world, state, column) {
+    const entry = this.entries.get(state.columns.get(column))
+    if (!entry || entry.complete || entry.builder !== world) return
+    for (const sectionKey of state.outstanding) {
+      if (columnOf(sectionKey) === column) return
+    }
+    entry.complete = true
+    entry.builder = null
+    for (const section of entry.sections.values()) {
+      this.shared.add(section.geometry)
+    }
+  }
+
+  _releaseColumn(world, state, column) {
+    const key = state.columns.get(column)
+    if (key === undefined) return
+    state.columns.delete(column)
+    const entry = this.entries.get(key)
+    if (!entry) return
+    entry.refs.delete(world)
+    if (!entry.complete) {
+      // Unfinished: the meshes are still the viewer's own and go with its column
+      this.entries.delete(key)
+    } else if (entry.refs.size === 0) {
+      this.idle.set(key, entry)
+      this._evict()
+    }
+  }
+
+  _evict() {
+    while (this.idle.size > this.maxIdle) {
+      const [key, entry] = this.idle.entries().next().value
+      this.idle.delete(key)
+      this.entries.delete(key)
+      for (const section of entry.sections.values()) {
+        section.geometry.dispose()
+      }
+      this.evictions++
+    }
+  }
+}
+
+module.exports = { ChunkMeshCache }
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Frame Store Exporter
+Converts agent sessions (session_*.jsonl + one JPEG per step, written by
+MinecraftAIServer) into a memory-mapped training dataset:
+
+  frames.u8     raw uint8 frames, fixed stride H*W*3, frame i at i*stride
+  steps.bin     fixed-size step records (STEP_DTYPE), row i describes frame i
+  actions.jsonl one action string per step; steps['action_offset'] is its byte offset
+  meta.json     shape/dtype, instruction/action-type vocabularies and the
+                sessions (and how many of their lines) already exported
+
+Loaders slice steps straight out of the memmap without decoding JPEGs:
+
+  store = FrameStore('datasets/frames')
+  batch = store.frames[1000:1064]          # (64, H, W, 3) uint8, no copy
+  health = store.steps['health'][1000:1064]
+
+Export is incremental: re-running only appends new sessions and the new
+lines of sessions that are still being written. Sessions are decoded in
+parallel, each worker writing its own pre-reserved slice of frames.u8.
+
+  python bridge/export_frames.py bridge/agent_logs --out datasets/frames --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+STEP_DTYPE = np.dtype([
+    ('session', np.int32),
+    ('step', np.int32),
+    ('timestamp', np.float64),
+    ('instruction', np.int32),
+    ('health', np.float32),
+    ('x', np.float32),
+    ('y', np.float32),
+    ('z', np.float32),
+    ('action_type', np.int16),
+    ('valid', np.uint8),
+    ('action_offset', np.int64),
+])
+
+# A step JPEG written more than this long after its log entry belongs to a
+# later session (step images are named by step number and get overwritten)
+STALE_FRAME_S = 60.0
+
+
+def _parse_timestamp(value) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _frame_path(entry: dict, session_path: Path) -> Optional[Path]:
+    """Step JPEG for a log entry, or None if missing or overwritten by a later session"""
+    pov = Path(entry.get('pov_saved') or '')
+    if not pov.is_file():
+        # Logs may have been moved - look next to the session file
+        pov = session_path.parent / pov.name
+    if not pov.is_file():
+        return None
+    logged_at = _parse_timestamp(entry.get('timestamp'))
+    if logged_at and pov.stat().st_mtime - logged_at > STALE_FRAME_S:
+        return None
+    return pov
+
+
+def _decode_session(args) -> Tuple[str, int, List[int]]:
+    """
+    Worker: decode frames of one session segment into its slice of frames.u8
+
+    Returns:
+        (session name, frames written, list of row indices that failed to decode)
+    """
+    name, frame_paths, frames_file, start, shape = args
+    from PIL import Image
+
+    height, width, channels = shape
+    failed = []
+    if not frame_paths:
+        return name, 0, failed
+    out = np.memmap(frames_file, dtype=np.uint8, mode='r+',
+                    offset=start * height * width * channels,
+                    shape=(len(frame_paths), height, width, channels))
+    for i, path in enumerate(frame_paths):
+        try:
+            with Image.open(path) as image:
+                image = image.convert('RGB')
+                if image.size != (width, height):
+                    image = image.resize((width, height), Image.BILINEAR)
+                out[i] = np.asarray(image)
+        except Exception:
+            out[i] = 0
+            failed.append(i)
+    out.flush()
+    del out
+    return name, len(frame_paths), failed
+
+
+class FrameStore:
+    """
+    Read/append access to an exported frame store
+    """
+
+    def __init__(self, path, mode: str = 'r'):
+        """
+        Args:
+            path: Store directory (must contain meta.json)
+            mode: 'r' for read-only memmaps, 'r+' to allow in-place edits
+        """
+        self.path = Path(path)
+        with open(self.path / 'meta.json') as f:
+            self.meta = json.load(f)
+        self.count = self.meta['count']
+        self.shape = tuple(self.meta['frame_shape'])
+        self.instructions = self.meta['instructions']
+        self.action_types = self.meta['action_types']
+        self.sessions = list(self.meta['sessions'])  # steps['session'] indexes this
+        if self.count:
+            self.frames = np.memmap(self.path / 'frames.u8', dtype=np.uint8, mode=mode,
+                                    shape=(self.count,) + self.shape)
+            self.steps = np.memmap(self.path / 'steps.bin', dtype=STEP_DTYPE, mode=mode, shape=(self.count,))
+        else:
+            self.frames = np.zeros((0,) + self.shape, dtype=np.uint8)
+            self.steps = np.zeros(0, dtype=STEP_DTYPE)
+
+    def __len__(self):
+        return self.count
+
+    def action(self, index: int) -> str:
+        """Logged action string of step `index`"""
+        with open(self.path / 'actions.jsonl', 'rb') as f:
+            f.seek(int(self.steps['action_offset'][index]))
+            return json.loads(f.readline())
+
+    def session_slice(self, name: str) -> List[slice]:
+        """Row ranges holding a session's frames (one per exported segment)"""
+        return [slice(start, start + count) for start, count in self.meta['sessions'].get(name, {}).get('segments', [])]
+
+
+def _empty_meta(shape) -> Dict:
+    return {
+        'version': 1,
+        'frame_shape': list(shape),
+        'frame_dtype': 'uint8',
+        'step_dtype': [list(field) for field in STEP_DTYPE.descr],
+        'count': 0,
+        'instructions': [],
+        'action_types': [],
+        'sessions': {},
+    }
+
+
+def _vocab_index(vocab: List[str], value) -> int:
+    if value is None:
+        return -1
+    value = str(value)
+    try:
+        return vocab.index(value)
+    except ValueError:
+        vocab.append(value)
+        return len(vocab) - 1
+
+
+def _find_sessions(inputs: List[str]) -> List[Path]:
+    sessions = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            sessions.extend(sorted(path.glob('session_*.jsonl')))
+        elif path.is_file():
+            sessions.append(path)
+    return sessions
+
+
+def _first_frame_shape(sessions: List[Path]):
+    from PIL import Image
+
+    for session in sessions:
+        with open(session) as f:
+            for line in f:
+                try:
+                    frame = _frame_path(json.loads(line), session)
+                except json.JSONDecodeError:
+                    continue
+                if frame:
+                    with Image.open(frame) as image:
+                        return (image.height, image.width, 3)
+    return None
+
+
+def export_sessions(inputs: List[str], out_dir: str, workers: int = 4, size: Optional[Tuple[int, int]] = None):
+    """
+    Append new sessions (and new lines of growing sessions) to the store
+
+    Args:
+        inputs: Session JSONL files and/or directories containing them
+        out_dir: Store directory (created if missing)
+        workers: Parallel decode processes
+        size: (height, width) of stored frames; default: first frame's size.
+            Fixed when the store is created.
+
+    Returns:
+        Number of steps appended
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    meta_path = out / 'meta.json'
+    sessions = _find_sessions(inputs)
+
+    if meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+        shape = tuple(meta['frame_shape'])
+    else:
+        shape = (size[0], size[1], 3) if size else _first_frame_shape(sessions)
+        if shape is None:
+            print("[Export] No frames found")
+            return 0
+        meta = _empty_meta(shape)
+
+    frames_file = out / 'frames.u8'
+    steps_file = out / 'steps.bin'
+    actions_file = out / 'actions.jsonl'
+    stride = int(np.prod(shape))
+    count = meta['count']
+
+    # Drop anything past the committed count (left by an interrupted export)
+    for path, row_size in ((frames_file, stride), (steps_file, STEP_DTYPE.itemsize)):
+        with open(path, 'ab') as f:
+            f.truncate(count * row_size)
+    with open(actions_file, 'ab') as f:
+        f.truncate(meta.get('actions_bytes', 0))
+
+    # Plan: reserve a contiguous row range for the new lines of every session
+    jobs, records, actions = [], [], []
+    next_row = count
+    session_names = list(meta['sessions'])
+    for session in sessions:
+        name = session.name
+        state = meta['sessions'].setdefault(name, {'lines': 0, 'segments': []})
+        if name not in session_names:
+            session_names.append(name)
+        session_id = session_names.index(name)
+
+        with open(session) as f:
+            lines = f.readlines()
+        # The last line may still be being written
+        if lines and not lines[-1].endswith('\n'):
+            lines = lines[:-1]
+        new_lines = lines[state['lines']:]
+        if not new_lines:
+            continue
+
+        frame_paths = []
+        for line in new_lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            frame = _frame_path(entry, session)
+            if frame is None:
+                continue
+            position = entry.get('position') or {}
+            frame_paths.append(str(frame))
+            records.append((
+                session_id,
+                int(entry.get('step', -1)),
+                _parse_timestamp(entry.get('timestamp')),
+                _vocab_index(meta['instructions'], entry.get('instruction')),
+                float(entry.get('health') or 0),
+                float(position.get('x', 0)),
+                float(position.get('y', 0)),
+                float(position.get('z', 0)),
+                _vocab_index(meta['action_types'], entry.get('action_type')),
+                1,
+                0,
+            ))
+            actions.append(entry.get('action'))
+
+        state['lines'] = len(lines)
+        if frame_paths:
+            state['segments'].append([next_row, len(frame_paths)])
+            jobs.append((name, frame_paths, str(frames_file), next_row, shape))
+            next_row += len(frame_paths)
+
+    added = next_row - count
+    if not added:
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        print(f"[Export] Up to date ({count} steps)")
+        return 0
+
+    start = time.time()
+    with open(frames_file, 'r+b') as f:
+        f.truncate(next_row * stride)
+    print(f"[Export] Decoding {added} frames from {len(jobs)} sessions with {workers} workers...")
+
+    failed_rows = []
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_decode_session, jobs))
+    else:
+        results = [_decode_session(job) for job in jobs]
+    for (name, written, failed), job in zip(results, jobs):
+        failed_rows.extend(job[3] + i for i in failed)
+        print(f"[Export]   {name}: {written} frames" + (f" ({len(failed)} unreadable)" if failed else ""))
+
+    # Step table and actions are written after the frames, then meta commits the count
+    table = np.array(records, dtype=STEP_DTYPE)
+    for row in failed_rows:
+        table['valid'][row - count] = 0
+    with open(actions_file, 'ab') as f:
+        for i, action in enumerate(actions):
+            table['action_offset'][i] = f.tell()
+            f.write((json.dumps(action) + '\n').encode())
+        meta['actions_bytes'] = f.tell()
+    with open(steps_file, 'ab') as f:
+        f.write(table.tobytes())
+
+    meta['count'] = next_row
+    tmp = meta_path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+    elapsed = time.time() - start
+    print(f"[Export] Appended {added} steps in {elapsed:.1f}s ({added / max(elapsed, 1e-6):.0f} frames/s), "
+          f"store now {next_row} steps, {next_row * stride / 1024 ** 3:.2f} GB")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export agent sessions to a memory-mapped frame store')
+    parser.add_argument('inputs', nargs='+',
+                        help='Session JSONL files or directories containing session_*.jsonl')
+    parser.add_argument('--out', type=str, required=True,
+                        help='Store directory (appended to if it exists)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help='Parallel decode processes')
+    parser.add_argument('--size', type=str, default=None,
+                        help='Frame size as HxW, e.g. 360x640 (default: first frame; fixed per store)')
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split('x')) if args.size else None
+    export_sessions(args.inputs, args.out, workers=args.workers, size=size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Health Watchdog
+Background thread that heartbeats a component (e.g. the Node bridge), counts
+consecutive failures and restarts it once a threshold is crossed
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+
+class Watchdog:
+    """
+    Heartbeat + consecutive-failure watchdog with background restart
+
+    Failures come from two places, counted separately: the periodic
+    ``heartbeat`` callable, and callers reporting the outcome of their own
+    requests via ``record_success`` / ``record_failure``. A passing heartbeat
+    does not clear request failures - a component whose status endpoint
+    answers while its real work path is wedged still gets restarted. When
+    either count reaches ``failure_threshold``, ``restart`` is run on the
+    watchdog thread so the caller's loop is never blocked by recovery.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        heartbeat: Callable[[], bool],
+        restart: Callable[[], None],
+        interval: float = 2.0,
+        failure_threshold: int = 3,
+        restart_backoff: float = 5.0,
+    ):
+        """
+        Args:
+            name: Name used in log lines
+            heartbeat: Returns True if the component is alive (exceptions count as failure)
+            restart: Restarts the component (exceptions count as a failed restart)
+            interval: Seconds between heartbeats
+            failure_threshold: Consecutive failures that trigger a restart
+            restart_backoff: Base delay after a failed restart (doubles each time, max 60s)
+        """
+        self.name = name
+        self.heartbeat = heartbeat
+        self.restart = restart
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.restart_backoff = restart_backoff
+
+        self.heartbeat_streak = 0      # Consecutive failed heartbeats
+        self.request_failures = 0      # Consecutive failed caller requests
+        self.restarting = False
+        self.restarts = 0
+        self.failed_restarts = 0
+        self.heartbeat_failures = 0
+        self.last_heartbeat = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def consecutive_failures(self) -> int:
+        return max(self.heartbeat_streak, self.request_failures)
+
+    @property
+    def healthy(self) -> bool:
+        return not self.restarting and self.consecutive_failures == 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 1)
+
+    def record_success(self):
+        with self._lock:
+            self.request_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.request_failures += 1
+            tripped = self.request_failures >= self.failure_threshold
+        if tripped:
+            # Don't wait for the next heartbeat tick
+            self._wake.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'restarts': self.restarts,
+            'failed_restarts': self.failed_restarts,
+            'heartbeat_failures': self.heartbeat_failures,
+            'consecutive_failures': self.consecutive_failures,
+            'request_failures': self.request_failures,
+            'restarting': self.restarting,
+        }
+
+    def _run(self):
+        backoff = self.restart_backoff
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+
+            try:
+                alive = bool(self.heartbeat())
+            except Exception:
+                alive = False
+            self.last_heartbeat = time.time()
+            with self._lock:
+                if alive:
+                    self.heartbeat_streak = 0
+                else:
+                    self.heartbeat_failures += 1
+                    self.heartbeat_streak += 1
+                heartbeat_streak, request_failures = self.heartbeat_streak, self.request_failures
+            if max(heartbeat_streak, request_failures) < self.failure_threshold:
+                if alive:
+                    backoff = self.restart_backoff
+                continue
+
+            print(f"[Watchdog] {self.name} unhealthy ({heartbeat_streak} failed heartbeats, "
+                  f"{request_failures} failed requests in a row) - restarting")
+            self.restarting = True
+            try:
+                self.restart()
+                self.restarts += 1
+                with self._lock:
+                    self.heartbeat_streak = 0
+                    self.request_failures = 0
+                backoff = self.restart_backoff
+                print(f"[Watchdog] {self.name} restarted (restarts: {self.restarts})")
+                continue
+            except Exception as e:
+                self.failed_restarts += 1
+                print(f"[Watchdog] {self.name} restart failed: {e} - retrying in {backoff:.0f}s")
+            finally:
+                self.restarting = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
@@ -0,0 +1,358 @@
+/**
+ * Instruction scheduler for the bots of one Minecraft world
+ *
+ * Every bot on a server hears the same chat, so instructions are queued once
+ * per world (not once per bot) and handed out to bots as they become free:
+ *
+ *   - priority: leading '!'s raise a message's priority ('!!mine iron' = +2)
+ *     on top of a per-player base priority (INSTRUCTION_PRIORITIES=alice=1,bob=2)
+ *   - fairness: within a priority level players are served round-robin, so
+ *     one player's burst of commands cannot starve everyone else
+ *   - preemption: an instruction that finds no free bot takes over the bot
+ *     running the lowest-priority instruction below its own; the preempted
+ *     instruction goes back to the front of its player's queue
+ *   - deduplication: the copies of a message heard by the other bots, and
+ *     commands already queued or running for the same player, are dropped
+ *   - bounded: at most maxQueued instructions in total, maxPerPlayer each
+ *
+ * '@<bot> <message>' targets one bot. 'reset' cancels the sender's queued
+ * and running instructions ('@<bot> reset' clears that bot).
+ *
+ * A bot counts as available while its agent keeps polling
+ * /chat/instructions; the assignment is reported there as `current`.
+ */
+
+const MAX_PRIORITY_BOOST = 2
+const CHAT_ECHO_MS = 1000         // Same player + message within this window = one chat line heard by several bots
+const AVAILABLE_MS = 5000         // A bot not polled for this long gets no new instructions
+const LATENCY_SAMPLES = 1024
+
+function normalize(message) {
+  return message.toLowerCase().replace(/\s+/g, ' ').trim()
+}
+
+function parsePriorities(text) {
+  const priorities = new Map()
+  for (const entry of (text || '').split(',')) {
+    const [name, value] = entry.split('=')
+    if (name && value !== undefined && !Number.isNaN(Number(value))) {
+      priorities.set(name.trim().toLowerCase(), Number(value))
+    }
+  }
+  return priorities
+}
+
+function percentile(sorted, q) {
+  if (sorted.length === 0) return null
+  return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * q))]
+}
+
+class InstructionScheduler {
+  constructor(options = {}) {
+    this.maxQueued = options.maxQueued || 256
+    this.maxPerPlayer = options.maxPerPlayer || 16
+    this.preemption = options.preemption !== false
+    this.playerPriorities = options.playerPriorities || new Map()
+    this.players = new Map()       // username -> { queue, lastServed }
+    this.bots = new Map()          // session -> { current, lastPoll }
+    this.recentChat = new Map()    // 'user\nmessage' -> time heard
+    this.queued = 0
+    this.nextId = 1
+    this.serveCount = 0
+    this.latencies = []            // Enqueue -> first dispatch, ms (ring buffer)
+    this.latencyIndex = 0
+    this.counts = { enqueued: 0, dispatched: 0, deduplicated: 0, dropped: 0, preempted: 0, cancelled: 0 }
+  }
+
+  addBot(session) {
+    if (!this.bots.has(session)) this.bots.set(session, { current: null, lastPoll: 0 })
+  }
+
+  // Bot left: its instruction goes back to the queue for another bot
+  removeBot(session) {
+    const state = this.bots.get(session)
+    if (!state) return
+    this.bots.delete(session)
+    if (state.current) this._requeue(state.current)
+    this._dispatch()
+  }
+
+  // Chat line heard by `session`'s bot; returns what happened, for logging
+  handleChat(session, username, message) {
+    const now = Date.now()
+    const echoKey = `${username}\n${message}`
+    for (const [key, heard] of this.recentChat) {
+      if (now - heard > CHAT_ECHO_MS) this.recentChat.delete(key)
+    }
+    if (this.recentChat.has(echoKey)) return 'echo'
+    this.recentChat.set(echoKey, now)
+
+    let text = message.trim()
+    let target = null
+    const addressed = text.match(/^@(\S+)\s+(.*)$/)
+    if (addressed && this._botNamed(addressed[1])) {
+      target = this._botNamed(addressed[1])
+      text = addressed[2].trim()
+    }
+
+    if (normalize(text) === 'reset') {
+      return target ? this.clearBot(target) : this.cancel(username)
+    }
+
+    const boost = Math.min(MAX_PRIORITY_BOOST, (text.match(/^!+/) || [''])[0].length)
+    text = text.slice(boost).trim()
+    if (!text) return 'empty'
+    const priority = (this.playerPriorities.get(username.toLowerCase()) || 0) + boost
+
+    return this.enqueue({
+      username,
+      message: text,
+      priority,
+      target: target ? target.id : null,
+      timestamp: now
+    })
+  }
+
+  enqueue(instruction) {
+    const key = normalize(instruction.message)
+    const player = this._player(instruction.username)
+    const duplicate = player.queue.find(queued => normalize(queued.message) === key && queued.target === instruction.target)
+    if (duplicate || this._running(instruction.username, key)) {
+      if (duplicate && instruction.priority > duplicate.priority) {
+        duplicate.priority = instruction.priority
+        this._sort(player)
+      }
+      this.counts.deduplicated++
+      return 'duplicate'
+    }
+    if (player.queue.length >= this.maxPerPlayer) {
+      this.counts.dropped++
+      return 'player queue full'
+    }
+    if (this.queued >= this.maxQueued && !this._evictFor(instruction)) {
+      this.counts.dropped++
+      return 'queue full'
+    }
+
+    const queued = { id: this.nextId++, ...instruction, assignedAt: null, preemptions: 0 }
+    player.queue.push(queued)
+    this._sort(player)
+    this.queued++
+    this.counts.enqueued++
+
+    this._dispatch()
+    if (queued.assignedAt === null && this.preemption) this._preemptFor(queued)
+    return queued.assignedAt === null ? 'queued' : 'dispatched'
+  }
+
+  // Agent poll: marks the bot available and hands it work if it is free
+  poll(session) {
+    this.addBot(session)
+    const state = this.bots.get(session)
+    state.lastPoll = Date.now()
+    if (!state.current) this._dispatch()
+    return state.current
+  }
+
+  currentOf(session) {
+    const state = this.bots.get(session)
+    return state ? state.current : null
+  }
+
+  // The bot's instruction is done (or abandoned by its agent)
+  finish(session) {
+    const state = this.bots.get(session)
+    if (!state || !state.current) return
+    state.current = null
+    this._dispatch()
+  }
+
+  // 'reset' from a player: drop their queued and running instructions
+  cancel(username) {
+    const player = this.players.get(username)
+    let cancelled = 0
+    if (player) {
+      cancelled += player.queue.length
+      this.queued -= player.queue.length
+      player.queue = []
+    }
+    for (const state of this.bots.values()) {
+      if (state.current && state.current.username === username) {
+        state.current = null
+        cancelled++
+      }
+    }
+    this.counts.cancelled += cancelled
+    this._dispatch()
+    return `cancelled ${cancelled}`
+  }
+
+  // '@bot reset': stop whatever the bot is doing
+  clearBot(session) {
+    const state = this.bots.get(session)
+    if (!state || !state.current) return 'cancelled 0'
+    state.current = null
+    this.counts.cancelled++
+    this._dispatch()
+    return 'cancelled 1'
+  }
+
+  // Queued instructions in dispatch order (highest priority, then oldest)
+  pending(limit = 50) {
+    const all = []
+    for (const player of this.players.values()) all.push(...player.queue)
+    all.sort((a, b) => b.priority - a.priority || a.id - b.id)
+    return all.slice(0, limit).map(({ id, username, message, priority, target, timestamp }) =>
+      ({ id, username, message, priority, target, timestamp }))
+  }
+
+  stats() {
+    const sorted = [...this.latencies].sort((a, b) => a - b)
+    let busy = 0
+    let available = 0
+    for (const [session, state] of this.bots) {
+      if (state.current) busy++
+      if (this._available(session, state)) available++
+    }
+    return {
+      bots: this.bots.size,
+      available,
+      busy,
+      queued: this.queued,
+      players: [...this.players.values()].filter(player => player.queue.length > 0).length,
+      ...this.counts,
+      dispatchLatencyMs: {
+        samples: sorted.length,
+        p50: percentile(sorted, 0.5),
+        p95: percentile(sorted, 0.95),
+        max: sorted.length ? sorted[sorted.length - 1] : null
+      }
+    }
+  }
+
+  _player(username) {
+    let player = this.players.get(username)
+    if (!player) {
+      player = { queue: [], lastServed: 0 }
+      this.players.set(username, player)
+    }
+    return player
+  }
+
+  _sort(player) {
+    // Preempted instructions keep their original id, so they sort back to the front
+    player.queue.sort((a, b) => b.priority - a.priority || a.id - b.id)
+  }
+
+  _running(username, key) {
+    for (const state of this.bots.values()) {
+      if (state.current && state.current.username === username && normalize(state.current.message) === key) return true
+    }
+    return false
+  }
+
+  _botNamed(name) {
+    const lower = name.toLowerCase()
+    for (const session of this.bots.keys()) {
+      if (session.bot && session.bot.username && session.bot.username.toLowerCase() === lower) return session
+      if (session.id.toLowerCase() === lower) return session
+    }
+    return null
+  }
+
+  _available(session, state) {
+    return !!(session.bot && Date.now() - state.lastPoll < AVAILABLE_MS)
+  }
+
+  // Make room by dropping the newest lowest-priority instruction of the
+  // player with the longest queue, if it ranks below the newcomer
+  _evictFor(instruction) {
+    let victimPlayer = null
+    for (const player of this.players.values()) {
+      if (player.queue.length && (!victimPlayer || player.queue.length > victimPlayer.queue.length)) victimPlayer = player
+    }
+    if (!victimPlayer) return false
+    const victim = victimPlayer.queue[victimPlayer.queue.length - 1]
+    if (victim.priority >= instruction.priority) return false
+    victimPlayer.queue.pop()
+    this.queued--
+    this.counts.dropped++
+    return true
+  }
+
+  // Next instruction for a bot: highest priority first, then the player
+  // served longest ago (round-robin across players)
+  _next(session) {
+    let best = null
+    let bestPlayer = null
+    for (const player of this.players.values()) {
+      const candidate = player.queue.find(queued => !queued.target || queued.target === session.id)
+      if (!candidate) continue
+      if (!best || candidate.priority > best.priority ||
+          (candidate.priority === best.priority && player.lastServed < bestPlayer.lastServed)) {
+        best = candidate
+        bestPlayer = player
+      }
+    }
+    return best ? { instruction: best, player: bestPlayer } : null
+  }
+
+  _assign(session, state, instruction, player) {
+    player.queue.splice(player.queue.indexOf(instruction), 1)
+    player.lastServed = ++this.serveCount
+    this.queued--
+    if (instruction.assignedAt === null) {
+      this._recordLatency(Date.now() - instruction.timestamp)
+    }
+    instruction.assignedAt = Date.now()
+    state.current = instruction
+    this.counts.dispatched++
+  }
+
+  _dispatch() {
+    for (const [session, state] of this.bots) {
+      if (this.queued === 0) return
+      if (state.current || !this._available(session, state)) continue
+      const next = this._next(session)
+      if (next) this._assign(session, state, next.instruction, next.player)
+    }
+  }
+
+  _preemptFor(instruction) {
+    let victim = null
+    for (const [session, state] of this.bots) {
+      if (!state.current || !this._available(session, state)) continue
+      if (instruction.target && instruction.target !== session.id) continue
+      if (state.current.priority >= instruction.priority) continue
+      // Lowest priority first; among equals the most recently started (least work lost)
+      if (!victim || state.current.priority < victim.state.current.priority ||
+          (state.current.priority === victim.state.current.priority && state.current.assignedAt > victim.state.current.assignedAt)) {
+        victim = { session, state }
+      }
+    }
+    if (!victim) return
+    const preempted = victim.state.current
+    preempted.preemptions++
+    this._requeue(preempted)
+    this.counts.preempted++
+    this._assign(victim.session, victim.state, instruction, this._player(instruction.username))
+  }
+
+  _requeue(instruction) {
+    const player = this._player(instruction.username)
+    player.queue.push(instruction)
+    this._sort(player)
+    this.queued++
+  }
+
+  _recordLatency(ms) {
+    if (this.latencies.length < LATENCY_SAMPLES) {
+      this.latencies.push(ms)
+    } else {
+      this.latencies[this.latencyIndex] = ms
+      this.latencyIndex = (this.latencyIndex + 1) % LATENCY_SAMPLES
+    }
+  }
+}
+
+module.exports = { InstructionScheduler, parsePriorities }
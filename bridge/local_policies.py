@@ -0,0 +1,261 @@
+"""
+Local Policies
+Fast, GPU-free stand-ins for VLLMAgentAdapter. They expose the same
+interface (reset / set_instruction / get_action / stats, fallback_actions,
+last_action) so MinecraftAIServer can run them as its agent, and are cheap
+enough to drive the bridge at thousands of actions per second when load
+testing:
+
+  random   - VPT-style sampler: independent button presses and Gaussian
+             camera deltas, drawn in vectorised batches
+  explore  - scripted walk: run forward (jumping now and then), turn when
+             the bot stops making progress or after a while
+  replay   - actions read back from a server session log (session_*.jsonl)
+"""
+
+import ast
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from mineflayer_env import BUTTON_NAMES, ActionMapper
+
+# Per-step press probability of each button for the random policy; drop and
+# inventory stay off so a load test does not empty the bot's hands or sit in
+# the inventory screen
+RANDOM_BUTTON_PROBS = {
+    'attack': 0.25, 'back': 0.05, 'forward': 0.4, 'jump': 0.15,
+    'left': 0.1, 'right': 0.1, 'sneak': 0.02, 'sprint': 0.2, 'use': 0.05,
+    'drop': 0.0, 'inventory': 0.0,
+    **{f'hotbar.{i}': 0.005 for i in range(1, 10)},
+}
+
+
+class LocalPolicy:
+    """Shared bookkeeping; subclasses implement _next_action()"""
+
+    name = 'local'
+
+    def __init__(self):
+        self.current_instruction = None
+        self.last_action = None
+        # Never set - local policies have no inference to fail - but the
+        # server reads it the same way it does for VLLMAgentAdapter
+        self.fallback_actions = 0
+        self.actions = 0
+        self.policy_time = 0.0
+
+    def reset(self):
+        """Reset agent state"""
+        self.current_instruction = None
+        self.last_action = None
+
+    def set_instruction(self, instruction: str):
+        """Set the current task instruction (ignored by the policy itself)"""
+        self.current_instruction = instruction
+
+    def get_action(self, observation: dict, need_crafting_table: bool = False, verbos: bool = False) -> dict:
+        """
+        Next action for the observation
+
+        Args:
+            observation: Env observation dict (only 'position' is used, by explore)
+            need_crafting_table: Unused, kept for interface compatibility
+            verbos: Print each action
+
+        Returns:
+            Mineflayer-compatible action dict
+        """
+        start = time.perf_counter()
+        action = self._next_action(observation or {})
+        self.policy_time += time.perf_counter() - start
+        self.actions += 1
+        self.last_action = action
+        if verbos:
+            print(f"[{type(self).__name__}] {action}")
+        return action
+
+    def _next_action(self, observation: dict) -> dict:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Action count and mean time spent choosing an action"""
+        mean_us = self.policy_time / self.actions * 1e6 if self.actions else 0.0
+        return {
+            'policy': self.name,
+            'actions': self.actions,
+            'mean_action_us': round(mean_us, 2),
+            'fallback_actions': self.fallback_actions,
+        }
+
+
+class RandomPolicy(LocalPolicy):
+    """Random VPT sampler (seeded, so runs are reproducible)"""
+
+    name = 'random'
+
+    def __init__(self, seed: Optional[int] = None, camera_std: float = 5.0,
+                 camera_max: float = 10.0, batch_size: int = 256):
+        """
+        Args:
+            seed: RNG seed
+            camera_std: Standard deviation of the camera deltas in degrees
+            camera_max: Clip camera deltas to +-camera_max (VPT's camera range)
+            batch_size: Actions sampled per refill
+        """
+        super().__init__()
+        self.rng = np.random.default_rng(seed)
+        self.camera_std = camera_std
+        self.camera_max = camera_max
+        self.batch_size = batch_size
+        self.button_probs = np.array([RANDOM_BUTTON_PROBS.get(name, 0.0) for name in BUTTON_NAMES])
+        self._pending: List[dict] = []
+
+    def _next_action(self, observation: dict) -> dict:
+        if not self._pending:
+            self._pending = self.sample(self.batch_size)
+            self._pending.reverse()
+        return self._pending.pop()
+
+    def sample(self, count: int) -> List[dict]:
+        """Draw `count` actions in one vectorised pass"""
+        buttons = self.rng.random((count, len(BUTTON_NAMES))) < self.button_probs
+        camera = np.clip(self.rng.normal(0.0, self.camera_std, (count, 2)),
+                         -self.camera_max, self.camera_max)
+        return ActionMapper.batch_jarvis_to_mineflayer(buttons, camera)
+
+
+class ScriptedExplorePolicy(LocalPolicy):
+    """Walk forward and turn when stuck or after a fixed number of steps"""
+
+    name = 'explore'
+
+    def __init__(self, seed: Optional[int] = None, walk_steps: int = 100,
+                 turn_step: int = 10, jump_every: int = 20, stuck_steps: int = 10):
+        """
+        Args:
+            seed: RNG seed for the turn angles
+            walk_steps: Steps to walk before turning anyway
+            turn_step: Yaw change per step while turning, in degrees
+            jump_every: Jump on every n-th walking step
+            stuck_steps: Walking steps with (almost) no horizontal progress
+                before the policy jumps and turns away
+        """
+        super().__init__()
+        self.rng = np.random.default_rng(seed)
+        self.walk_steps = walk_steps
+        self.turn_step = turn_step
+        self.jump_every = jump_every
+        self.stuck_steps = stuck_steps
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._walked = 0
+        self._turn_left = 0
+        self._turn_sign = 1
+        self._stalled = 0
+        self._last_pos = None
+
+    def _next_action(self, observation: dict) -> dict:
+        if self._turn_left > 0:
+            self._turn_left -= 1
+            return {'type': 'compound', 'camera': [0, self._turn_sign * self.turn_step], 'buttons': {}}
+
+        pos = observation.get('position')
+        if pos and self._last_pos:
+            moved = abs(pos.get('x', 0) - self._last_pos[0]) + abs(pos.get('z', 0) - self._last_pos[1])
+            self._stalled = self._stalled + 1 if moved < 0.05 else 0
+        if pos:
+            self._last_pos = (pos.get('x', 0), pos.get('z', 0))
+
+        self._walked += 1
+        if self._stalled >= self.stuck_steps or self._walked >= self.walk_steps:
+            # Turn 60-180 degrees in a random direction over the next steps
+            self._turn_left = int(self.rng.integers(6, 19)) * 10 // self.turn_step
+            self._turn_sign = 1 if self.rng.random() < 0.5 else -1
+            self._walked = 0
+            self._stalled = 0
+            return {'type': 'compound', 'camera': [0, 0], 'buttons': {'forward': 1, 'jump': 1}}
+
+        buttons = {'forward': 1, 'sprint': 1}
+        if self.jump_every and self._walked % self.jump_every == 0:
+            buttons['jump'] = 1
+        return {'type': 'compound', 'camera': [0, 0], 'buttons': buttons}
+
+
+class ReplayPolicy(LocalPolicy):
+    """Replay the actions of recorded session logs, in order"""
+
+    name = 'replay'
+
+    def __init__(self, path: str, loop: bool = True):
+        """
+        Args:
+            path: session_*.jsonl written by the server, or a directory of them
+            loop: Start over after the last action (otherwise noop from then on)
+        """
+        super().__init__()
+        self.actions_log = self.load(path)
+        if not self.actions_log:
+            raise ValueError(f"No replayable actions in {path}")
+        self.loop = loop
+        self._index = 0
+
+    @staticmethod
+    def load(path: str) -> List[Dict[str, Any]]:
+        """Read logged actions (stored as str(action) by the server)"""
+        path = Path(path)
+        files = sorted(path.glob('session_*.jsonl')) if path.is_dir() else [path]
+        actions = []
+        for file in files:
+            with open(file) as f:
+                for line in f:
+                    try:
+                        action = ast.literal_eval(json.loads(line)['action'])
+                    except (ValueError, SyntaxError, KeyError, TypeError):
+                        continue
+                    if isinstance(action, dict) and 'type' in action:
+                        actions.append(action)
+        return actions
+
+    def reset(self):
+        super().reset()
+        self._index = 0
+
+    def _next_action(self, observation: dict) -> dict:
+        if self._index >= len(self.actions_log):
+            if not self.loop:
+                return {'type': 'noop'}
+            self._index = 0
+        action = self.actions_log[self._index]
+        self._index += 1
+        return action
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'explore': ScriptedExplorePolicy,
+    'replay': ReplayPolicy,
+}
+
+
+def make_policy(name: str, seed: Optional[int] = None, replay_path: Optional[str] = None) -> LocalPolicy:
+    """
+    Build a local policy by name
+
+    Args:
+        name: One of POLICIES
+        seed: RNG seed (random / explore)
+        replay_path: Session log or directory of logs (replay)
+    """
+    if name not in POLICIES:
+        raise ValueError(f"Unknown policy '{name}' (expected one of {sorted(POLICIES)})")
+    if name == 'replay':
+        if not replay_path:
+            raise ValueError("The replay policy needs a session log (--policy-log)")
+        return ReplayPolicy(replay_path)
+    return POLICIES[name](seed=seed)
@@ -1,7 +1,15 @@
 /**
  * Mineflayer Bridge Server
- * Exposes Mineflayer bot via HTTP API for Python to control
+ * Exposes Mineflayer bots via HTTP API for Python to control
  * Mimics MineStudio's action/observation interface
+ *
+ * One process hosts many bots. Every bot route is served both at
+ * /bots/<botId>/<route> and at /<route> (which addresses the 'default' bot,
+ * or the bot named by ?bot=<id> / the X-Bot-Id header), so single-bot
+ * clients keep working unchanged. All bots share one headless-gl context,
+ * one THREE renderer and, per Minecraft version, one texture atlas and
+ * block-state table. Column meshes are shared through ChunkMeshCache, so a
+ * bot mostly owns just its scene and camera.
  */
 
 const mineflayer = require('mineflayer')
@@ -9,6 +17,8 @@ const { Viewer } = require('prismarine-viewer').viewer
 const express = require('express')
 const { createCanvas, loadImage } = require('canvas')
 const gl = require('gl')
+const { ChunkMeshCache } = require('./chunk_mesh_cache')
+const { InstructionScheduler, parsePriorities } = require('./instruction_scheduler')
 const app = express()
 
 // Make loadImage globally available for prismarine-viewer
@@ -16,811 +26,1321 @@ global.loadImage = loadImage
 
 app.use(express.json({ limit: '50mb' }))
 
-let bot = null
-let currentObservation = null
 let serverConfig = {
   host: 'localhost',
   port: 25565,
   username: 'AIBot'
 }
 
-// Chat instruction system - module level
-let chatInstructions = []
-let processingInstruction = null
-
-// Screenshot system - module level using server-side rendering
-let viewerReady = false
-let serverViewer = null  // Server-side prismarine viewer
-let viewerRenderer = null
-let viewerWorldView = null  // Keep reference to world view for updates
-
-// Initialize bot
-function createBot(config) {
-  if (bot) {
-    bot.end()
-  }
-  
-  bot = mineflayer.createBot({
-    host: config.host || serverConfig.host,
-    port: config.port || serverConfig.port,
-    username: config.username || serverConfig.username,
-    version: config.version || false, // Auto-detect
-    auth: config.auth || 'offline'
-  })
+const DEFAULT_BOT = 'default'
+const sessions = new Map()  // botId -> BotSession
 
-  bot.on('login', () => {
-    console.log('[Bot] Logged in to server')
-  })
+// Chat instructions are scheduled per world (every bot there hears the same chat)
+const schedulers = new Map()  // 'host:port' -> InstructionScheduler
+const SCHEDULER_OPTIONS = {
+  maxQueued: parseInt(process.env.INSTRUCTION_QUEUE_MAX || '256', 10),
+  maxPerPlayer: parseInt(process.env.INSTRUCTION_QUEUE_PER_PLAYER || '16', 10),
+  preemption: process.env.INSTRUCTION_PREEMPT !== '0',
+  playerPriorities: parsePriorities(process.env.INSTRUCTION_PRIORITIES)
+}
 
-  bot.on('spawn', () => {
-    console.log('[Bot] Spawned in world')
-  })
+function schedulerFor(host, port) {
+  const world = `${host}:${port}`
+  if (!schedulers.has(world)) schedulers.set(world, new InstructionScheduler(SCHEDULER_OPTIONS))
+  return schedulers.get(world)
+}
 
-  bot.on('error', (err) => {
-    console.error('[Bot] Error:', err)
-  })
+// Screenshot system - one headless-gl context and renderer shared by all bots
+const VIEW_WIDTH = 640
+const VIEW_HEIGHT = 360
+const JPEG_QUALITY = 0.9      // Default; agents lower it per request (quality controller)
+let sharedRenderer = null
+const sharedWorldAssets = new Map()  // version -> { material, blockStates }
+// prismarine-viewer starts 4 mesher workers per viewer; a few are plenty per bot
+const MESHER_WORKERS_PER_BOT = parseInt(process.env.MESHER_WORKERS_PER_BOT || '2', 10)
+const VIEW_DISTANCE = 4       // Render distance in chunks
+const ENTITY_VIEW_RANGE = 32  // Entities moving closer than this (blocks) dirty the frame
+// Column meshes shared between viewers (co-located bots, revisited terrain)
+const chunkMeshCache = new ChunkMeshCache(parseInt(process.env.CHUNK_CACHE_COLUMNS || '1024', 10))
 
-  bot.on('kicked', (reason) => {
-    console.log('[Bot] Kicked:', reason)
-  })
+// VPT compound actions - button order and wire format must match
+// BUTTON_NAMES / ACTION_WIRE_DTYPE in mineflayer_env.py
+const BUTTON_NAMES = [
+  'attack', 'back', 'forward', 'jump', 'left', 'right', 'sneak', 'sprint', 'use',
+  'drop', 'inventory',
+  'hotbar.1', 'hotbar.2', 'hotbar.3', 'hotbar.4', 'hotbar.5',
+  'hotbar.6', 'hotbar.7', 'hotbar.8', 'hotbar.9'
+]
+const MOVEMENT_CONTROLS = ['forward', 'back', 'left', 'right', 'jump', 'sneak', 'sprint']
+const ACTION_RECORD_BYTES = 8  // uint32 buttons, int16 pitch, int16 yaw
+const CAMERA_SCALE = 100       // camera is sent in hundredths of a degree
 
-  bot.on('end', () => {
-    console.log('[Bot] Disconnected')
-  })
+// Motion smoothing at server tick rate (20 Hz). Inference runs slower than
+// the server ticks, so camera deltas are spread over the ticks until the
+// next action is expected, and movement keys stay held until it arrives.
+const TICK_MS = 50
+const DEFAULT_MOTION = {
+  cameraSmoothing: true,  // Interpolate camera deltas instead of snapping
+  holdTimeoutMs: 1000     // Release movement keys if no action arrives for this long
+}
+
+// Everything that belongs to one bot: connection, chat queue, motion state and viewer
+class BotSession {
+  constructor(id) {
+    this.id = id
+    this.tag = id === DEFAULT_BOT ? '' : ` ${id}`  // Log suffix, e.g. "[Bot worker-3]"
+    this.bot = null
+
+    // Chat instructions come from the world's shared scheduler (set in createBot)
+    this.scheduler = null
 
-  // Setup chat listener when bot is created
-  bot.on('chat', (username, message) => {
-    if (username === bot.username) return  // Ignore self
-    
-    console.log(`[Chat] ${username}: ${message}`)
-    
-    // Handle reset
-    if (message.toLowerCase().trim() === 'reset') {
-      console.log('[Chat] Reset command')
-      processingInstruction = null
-      chatInstructions = []
-      return
-    }
-    
-    // Queue new instruction
-    chatInstructions.push({
-      username: username,
-      message: message,
-      timestamp: Date.now()
+    // Server-side viewer (renders through sharedRenderer)
+    this.viewerReady = false
+    this.viewer = null
+    this.worldView = null
+
+    // Render-on-demand: the last frame (canvas + lazily encoded JPEG) is
+    // reused while the frame signature (pose, scene revision, HUD state) stays the same
+    this.sceneRevision = 0       // Bumped by scene graph changes, block updates and entity movement in view
+    this.frameId = 0
+    this.frameSignature = null
+    this.lastFrame = null
+    this.framesRendered = 0
+    this.framesReused = 0
+
+    this.motionConfig = { ...DEFAULT_MOTION }
+    this.queuedActions = []      // Remaining actions of a chunk, spread over the action interval
+    this.lastActionAt = 0
+    this.actionIntervalMs = 200  // EWMA of the time between agent actions
+    this.cameraTarget = null     // { yaw, pitch } the camera is easing towards
+    this.cameraTicksLeft = 0
+    this.queueTicksLeft = 0
+    this.chunkStepTicks = 4      // Ticks each action of the current chunk gets
+    this.movementHeld = false
+  }
+
+  // Track how often actions arrive so interpolation spans one action interval
+  noteActionArrival() {
+    const now = Date.now()
+    if (this.lastActionAt) {
+      const interval = Math.min(2000, Math.max(TICK_MS, now - this.lastActionAt))
+      this.actionIntervalMs += 0.3 * (interval - this.actionIntervalMs)
+    }
+    this.lastActionAt = now
+  }
+
+  intervalTicks() {
+    return Math.max(1, Math.round(this.actionIntervalMs / TICK_MS))
+  }
+
+  releaseMovement() {
+    for (const control of MOVEMENT_CONTROLS) {
+      this.bot.setControlState(control, false)
+    }
+    this.movementHeld = false
+  }
+
+  // Runs every physics tick: ease the camera, play queued chunk actions and
+  // release held keys if the agent went quiet
+  onPhysicsTick() {
+    const bot = this.bot
+    if (!bot || !bot.entity) return
+
+    if (this.cameraTarget && this.cameraTicksLeft > 0) {
+      const yaw = bot.entity.yaw + (this.cameraTarget.yaw - bot.entity.yaw) / this.cameraTicksLeft
+      const pitch = bot.entity.pitch + (this.cameraTarget.pitch - bot.entity.pitch) / this.cameraTicksLeft
+      this.cameraTicksLeft--
+      bot.look(yaw, pitch, true).catch(() => {})
+      if (this.cameraTicksLeft === 0) this.cameraTarget = null
+    }
+
+    if (this.queuedActions.length > 0 && --this.queueTicksLeft <= 0) {
+      this.queueTicksLeft = this.chunkStepTicks
+      this.executeCompound(this.queuedActions.shift()).catch(() => {})
+    }
+
+    if (this.movementHeld && this.queuedActions.length === 0 &&
+        Date.now() - this.lastActionAt > this.motionConfig.holdTimeoutMs) {
+      this.releaseMovement()
+    }
+  }
+
+  // Initialize bot
+  createBot(config) {
+    this.close()
+
+    if (config.motion) {
+      this.motionConfig = { ...this.motionConfig, ...config.motion }
+    }
+
+    const host = config.host || serverConfig.host
+    const port = config.port || serverConfig.port
+    const bot = this.bot = mineflayer.createBot({
+      host,
+      port,
+      username: config.username || serverConfig.username,
+      version: config.version || false, // Auto-detect
+      auth: config.auth || 'offline'
     })
-    console.log(`[Chat] Queued: "${message}"`)
-  })
-  
-  // Init server-side viewer after spawn
-  bot.once('spawn', () => {
-    console.log('[Bot] Spawned! Waiting for chunks to load...')
-    
-    // Wait for chunks to load before starting viewer  
-    setTimeout(async () => {
-      console.log('[Viewer] Initializing server-side renderer...')
-      
-      try {
-        await initServerSideViewer()
-      } catch (err) {
-        console.error('[Viewer] Failed to initialize server-side viewer:', err.message)
-        console.error('[Viewer] Stack:', err.stack)
+    this.scheduler = schedulerFor(host, port)
+    this.scheduler.addBot(this)
+
+    bot.on('login', () => {
+      console.log(`[Bot${this.tag}] Logged in to server`)
+    })
+
+    bot.on('spawn', () => {
+      console.log(`[Bot${this.tag}] Spawned in world`)
+    })
+
+    this.queuedActions = []
+    this.cameraTarget = null
+    this.movementHeld = false
+    this.lastFrame = null
+    bot.on('physicsTick', () => this.onPhysicsTick())
+
+    // World changes that can show up in the frame without the bot moving
+    const inView = (position, range) => bot.entity && position && position.distanceTo(bot.entity.position) < range
+    bot.on('blockUpdate', (oldBlock, newBlock) => {
+      if (newBlock && inView(newBlock.position, VIEW_DISTANCE * 16)) this.sceneRevision++
+    })
+    const onEntity = (entity) => {
+      if (entity !== bot.entity && inView(entity.position, ENTITY_VIEW_RANGE)) this.sceneRevision++
+    }
+    bot.on('entityMoved', onEntity)
+    bot.on('entitySpawn', onEntity)
+    bot.on('entityGone', onEntity)
+
+    bot.on('error', (err) => {
+      console.error(`[Bot${this.tag}] Error:`, err)
+    })
+
+    bot.on('kicked', (reason) => {
+      console.log(`[Bot${this.tag}] Kicked:`, reason)
+    })
+
+    bot.on('end', () => {
+      console.log(`[Bot${this.tag}] Disconnected`)
+    })
+
+    // Setup chat listener when bot is created
+    bot.on('chat', (username, message) => {
+      if (isHostedBot(username)) return  // Ignore self and the other bots of the fleet
+
+      const outcome = this.scheduler.handleChat(this, username, message)
+      if (outcome === 'echo') return  // Already handled when another bot heard it
+      console.log(`[Chat${this.tag}] ${username}: ${message} -> ${outcome}`)
+    })
+
+    // Init server-side viewer after spawn
+    bot.once('spawn', () => {
+      console.log(`[Bot${this.tag}] Spawned! Waiting for chunks to load...`)
+
+      // Wait for chunks to load before starting viewer
+      setTimeout(async () => {
+        if (this.bot !== bot) return  // Closed or re-initialized meanwhile
+        console.log(`[Viewer${this.tag}] Initializing server-side renderer...`)
+
+        try {
+          await this.initViewer()
+        } catch (err) {
+          console.error(`[Viewer${this.tag}] Failed to initialize server-side viewer:`, err.message)
+          console.error(`[Viewer${this.tag}] Stack:`, err.stack)
+        }
+      }, 3000)  // 3 seconds for initial chunks
+    })
+
+    return bot
+  }
+
+  async initViewer() {
+    const bot = this.bot
+    try {
+      if (!bot || !bot.entity) {
+        console.log(`[Viewer${this.tag}] Bot or entity not ready`)
+        return false
       }
-    }, 3000)  // 3 seconds for initial chunks
-  })
 
-  return bot
-}
+      const THREE = require('three')
+      const Vec3 = require('vec3').Vec3
+      const { WorldView } = require('prismarine-viewer').viewer
+      const renderer = getSharedRenderer()
 
-async function initServerSideViewer() {
-  try {
-    if (!bot || !bot.entity) {
-      console.log('[Viewer] Bot or entity not ready')
+      // Each bot gets its own scene and camera on the shared renderer
+      const viewer = new Viewer(renderer)
+      // Meshes arriving from the workers (or the mesh cache) change the picture
+      for (const method of ['add', 'remove']) {
+        const original = viewer.scene[method].bind(viewer.scene)
+        viewer.scene[method] = (...objects) => {
+          this.sceneRevision++
+          return original(...objects)
+        }
+      }
+      trimMesherWorkers(viewer)
+      chunkMeshCache.attach(viewer.world, bot.version)
+      const reused = shareWorldAssets(viewer, bot.version)
+      viewer.setVersion(bot.version)
+      console.log(`[Viewer${this.tag}] ✓ Viewer created for version:`, bot.version,
+        reused ? '(shared textures)' : '(loading textures)')
+
+      // Configure camera clipping planes
+      viewer.camera.near = 0.1
+      viewer.camera.far = 1000
+      viewer.camera.updateProjectionMatrix()
+
+      // Add bright lighting to the scene
+      const ambientLight = new THREE.AmbientLight(0xffffff, 1.0)  // Full bright ambient
+      viewer.scene.add(ambientLight)
+
+      // Add a directional light from the sun position
+      const directionalLight = new THREE.DirectionalLight(0xffffff, 0.8)
+      directionalLight.position.set(1, 1, 0.5).normalize()
+      viewer.scene.add(directionalLight)
+
+      // Wait a bit for textures to process
+      await new Promise(resolve => setTimeout(resolve, reused ? 50 : 500))
+
+      // Create world view
+      const botPos = bot.entity.position
+      const center = new Vec3(botPos.x, botPos.y, botPos.z)
+      console.log(`[Viewer${this.tag}] Bot position:`, center)
+
+      const worldView = new WorldView(bot.world, VIEW_DISTANCE, center)
+      viewer.listen(worldView)
+
+      console.log(`[Viewer${this.tag}] Initializing world view (this loads chunks and textures)...`)
+      await worldView.init(center)
+      console.log(`[Viewer${this.tag}] ✓ World view initialized`)
+
+      // Set camera position and look at the world
+      viewer.camera.position.set(botPos.x, botPos.y + 1.6, botPos.z)
+      viewer.camera.rotation.set(bot.entity.pitch || 0, bot.entity.yaw || 0, 0, 'YXZ')
+
+      // Give chunks time to mesh (and, for the first bot of a version, textures to upload)
+      console.log(`[Viewer${this.tag}] Waiting for chunks and textures to load and upload to GPU...`)
+      await new Promise(resolve => setTimeout(resolve, reused ? 2000 : 5000))
+
+      if (this.bot !== bot) {
+        // Closed while we were waiting
+        worldView.removeListenersFromBot && worldView.removeListenersFromBot(bot)
+        disposeViewer(viewer)
+        return false
+      }
+
+      // Do a test render
+      renderer.render(viewer.scene, viewer.camera)
+
+      // Check if any meshes rendered and their materials
+      let meshCount = 0
+      let meshWithTexture = 0
+      viewer.scene.traverse(obj => {
+        if (obj.isMesh) {
+          meshCount++
+          if (obj.material && obj.material.map) meshWithTexture++
+        }
+      })
+      console.log(`[Viewer${this.tag}] Test render complete: ${meshCount} meshes, ${meshWithTexture} with textures`)
+
+      this.viewer = viewer
+      this.worldView = worldView
+      this.viewerReady = true
+      console.log(`[Viewer${this.tag}] ✓✓✓ Server-side viewer FULLY INITIALIZED ✓✓✓`)
+      return true
+
+    } catch (err) {
+      console.error(`[Viewer${this.tag}] ✗ Server-side viewer init failed:`, err.message)
+      console.error(`[Viewer${this.tag}] Stack:`, err.stack)
+      this.viewerReady = false
       return false
     }
-    
-    console.log('[Viewer] Setting up server-side renderer with headless-gl...')
-    const THREE = require('three')
-    const Vec3 = require('vec3').Vec3
-    const { WorldView } = require('prismarine-viewer').viewer
-    
-    const width = 640
-    const height = 360
-    
-    // Create WebGL context using headless-gl
-    console.log('[Viewer] Creating headless WebGL context...')
-    const glContext = gl(width, height, { preserveDrawingBuffer: true })
-    
-    // Create a mock canvas element
-    const mockCanvas = {
-      width: width,
-      height: height,
-      clientWidth: width,
-      clientHeight: height,
-      style: {},
-      addEventListener: function() {},
-      removeEventListener: function() {},
-      getBoundingClientRect: function() {
-        return { left: 0, top: 0, width: width, height: height }
-      },
-      getContext: function(type) {
-        if (type === 'webgl' || type === 'experimental-webgl') {
-          return glContext
+  }
+
+  // Everything the rendered frame depends on; equal signatures mean equal frames
+  currentSignature() {
+    const bot = this.bot
+    const entity = bot.entity
+    const pose = entity
+      ? [entity.position.x.toFixed(3), entity.position.y.toFixed(3), entity.position.z.toFixed(3),
+         entity.yaw.toFixed(4), entity.pitch.toFixed(4)].join(',')
+      : 'none'
+    const hotbar = bot.inventory.slots.slice(36, 45).map(item => item ? `${item.name}x${item.count}` : '').join(',')
+    return `${pose}|${this.sceneRevision}|${bot.health}|${bot.food}|${bot.quickBarSlot}|${hotbar}`
+  }
+
+  // Returns { frame, changed, frameId } where frame is { canvas, jpegs } (or
+  // null while there is nothing to render). Unchanged frames reuse the last
+  // canvas and its JPEGs without rendering, reading back or encoding.
+  captureScreenshot() {
+    const bot = this.bot
+    // Return black image if not ready
+    if (!this.viewerReady || !this.viewer || !sharedRenderer || !bot) {
+      console.log(`[Viewer${this.tag}] Not ready for screenshot - returning black image`)
+      return { frame: null, changed: true, frameId: this.frameId }
+    }
+
+    const signature = this.currentSignature()
+    if (this.lastFrame && signature === this.frameSignature) {
+      this.framesReused++
+      return { frame: this.lastFrame, changed: false, frameId: this.frameId }
+    }
+
+    try {
+      const viewer = this.viewer
+      // Update world view center to bot's position
+      if (bot.entity && this.worldView) {
+        const Vec3 = require('vec3').Vec3
+        const botPos = bot.entity.position
+        const center = new Vec3(botPos.x, botPos.y, botPos.z)
+
+        // Update world view center (loads new chunks as bot moves)
+        this.worldView.updatePosition(center)
+
+        // Update camera position to bot's eye level
+        viewer.camera.position.set(botPos.x, botPos.y + 1.6, botPos.z)
+
+        // Update camera rotation based on bot's yaw and pitch
+        viewer.camera.rotation.set(bot.entity.pitch, bot.entity.yaw, 0, 'YXZ')
+      }
+
+      // Render and read back synchronously: the GL context is shared, so no
+      // other bot may render in between (nothing else runs until we return)
+      const width = VIEW_WIDTH
+      const height = VIEW_HEIGHT
+      sharedRenderer.render(viewer.scene, viewer.camera)
+      const pixels = readPixels(sharedRenderer.getContext(), width, height)
+
+      // Check if we got any data (debug - only log occasionally)
+      if (Math.random() < 0.1) {
+        let nonZero = 0
+        for (let i = 0; i < Math.min(100, pixels.length); i++) {
+          if (pixels[i] !== 0) nonZero++
+        }
+        if (nonZero === 0) {
+          console.log(`[Viewer${this.tag}] WARNING: First 100 pixels are all zero - image will be black`)
         }
-        return null
       }
+
+      const canvas = createCanvas(width, height)
+      const ctx = canvas.getContext('2d')
+      const imageData = ctx.createImageData(width, height)
+
+      // headless-gl returns pixels bottom-up: copy rows in reverse order
+      // (alpha is always 255 since the renderer clears opaque)
+      const rowBytes = width * 4
+      for (let y = 0; y < height; y++) {
+        const srcRow = (height - 1 - y) * rowBytes
+        imageData.data.set(pixels.subarray(srcRow, srcRow + rowBytes), y * rowBytes)
+      }
+
+      ctx.putImageData(imageData, 0, 0)
+      drawHud(ctx, bot, width, height)
+
+      this.lastFrame = { canvas, jpegs: new Map() }
+      this.frameSignature = signature
+      this.frameId++
+      this.framesRendered++
+      return { frame: this.lastFrame, changed: true, frameId: this.frameId }
+
+    } catch (err) {
+      console.error(`[Viewer${this.tag}] Screenshot error:`, err.message)
+      console.error(`[Viewer${this.tag}] Stack:`, err.stack)
+
+      // Return black image on error
+      this.lastFrame = null
+      return { frame: null, changed: true, frameId: this.frameId }
     }
-    
-    // Attach canvas to context
-    glContext.canvas = mockCanvas
-    
-    // Ensure drawing buffer dimensions are set
-    Object.defineProperty(glContext, 'drawingBufferWidth', {
-      get: function() { return width }
-    })
-    Object.defineProperty(glContext, 'drawingBufferHeight', {
-      get: function() { return height }
-    })
-    
-    // Patch texImage2D to handle node-canvas Image objects
-    const originalTexImage2D = glContext.texImage2D.bind(glContext)
-    glContext.texImage2D = function(...args) {
-      // Handle the case where we're uploading an Image
-      if (args.length >= 6 && args[5] && typeof args[5] === 'object') {
-        const image = args[5]
-        // If it's a node-canvas Image, we need to get its raw pixel data
-        if (image.width && image.height && typeof image.src !== 'undefined') {
-          // Create a temporary canvas to extract pixel data
-          const tempCanvas = createCanvas(image.width, image.height)
-          const tempCtx = tempCanvas.getContext('2d')
-          tempCtx.drawImage(image, 0, 0)
-          const imageData = tempCtx.getImageData(0, 0, image.width, image.height)
-          
-          // Upload using the ImageData instead
-          args[5] = imageData
-        }
+  }
+
+  // Get current observation (screenshot + state)
+  getObservation() {
+    const bot = this.bot
+    if (!bot) return null
+
+    const obs = {
+      // Position
+      position: bot.entity ? {
+        x: bot.entity.position.x,
+        y: bot.entity.position.y,
+        z: bot.entity.position.z
+      } : null,
+
+      // Rotation (yaw, pitch)
+      yaw: bot.entity ? bot.entity.yaw : 0,
+      pitch: bot.entity ? bot.entity.pitch : 0,
+
+      // Health/Food
+      health: bot.health || 0,
+      food: bot.food || 0,
+
+      // Inventory (simplified)
+      inventory: bot.inventory.items().map(item => ({
+        name: item.name,
+        count: item.count,
+        slot: item.slot
+      })),
+
+      // Nearby entities
+      entities: Object.values(bot.entities).filter(e =>
+        e.position && bot.entity &&
+        e.position.distanceTo(bot.entity.position) < 32
+      ).map(e => ({
+        type: e.name,
+        position: { x: e.position.x, y: e.position.y, z: e.position.z },
+        distance: bot.entity ? e.position.distanceTo(bot.entity.position) : null
+      })),
+
+      // Time
+      time: bot.time.timeOfDay || 0,
+
+      // Game mode
+      gameMode: bot.game.gameMode || 'survival'
+    }
+
+    return obs
+  }
+
+  // Apply a VPT-style compound action: full button state + camera delta (degrees)
+  async executeCompound(action) {
+    const bot = this.bot
+    const buttons = action.buttons || {}
+    const [pitchDelta, yawDelta] = action.camera || [0, 0]
+
+    // VPT buttons describe the whole state: anything not pressed is released,
+    // pressed keys stay held until the next action (or the hold timeout)
+    this.movementHeld = false
+    for (const control of MOVEMENT_CONTROLS) {
+      bot.setControlState(control, !!buttons[control])
+      this.movementHeld = this.movementHeld || !!buttons[control]
+    }
+
+    // VPT: +pitch looks down, +yaw turns right; Mineflayer (radians): +pitch
+    // looks up, +yaw turns left. Deltas accumulate onto any unfinished easing.
+    if (bot.entity && (pitchDelta || yawDelta)) {
+      const base = this.cameraTarget || { yaw: bot.entity.yaw, pitch: bot.entity.pitch }
+      const target = {
+        yaw: base.yaw - yawDelta * Math.PI / 180,
+        pitch: Math.max(-Math.PI / 2, Math.min(Math.PI / 2, base.pitch - pitchDelta * Math.PI / 180))
       }
-      return originalTexImage2D(...args)
-    }
-    
-    // Mock document object for THREE.js
-    if (typeof document === 'undefined') {
-      global.document = {
-        createElement: function(tag) {
-          if (tag === 'canvas') {
-            return mockCanvas
-          }
-          if (tag === 'img') {
-            // Create a proper image element for texture loading
-            // Use node-canvas Image which works with headless-gl
-            const { Image } = require('canvas')
-            const img = new Image()
-            
-            // Override to handle both data URLs and file paths
-            const originalSrcSetter = Object.getOwnPropertyDescriptor(Image.prototype, 'src').set
-            Object.defineProperty(img, 'src', {
-              set: function(value) {
-                // Call original setter
-                if (originalSrcSetter) {
-                  originalSrcSetter.call(this, value)
-                }
-                
-                // Also trigger onload for data URLs
-                if (value && value.startsWith('data:')) {
-                  setTimeout(() => {
-                    if (this.onload) this.onload()
-                  }, 0)
-                }
-              },
-              get: function() {
-                return this._src || ''
-              }
-            })
-            
-            return img
-          }
-          return {
-            style: {},
-            addEventListener: function() {},
-            removeEventListener: function() {}
+      if (this.motionConfig.cameraSmoothing && this.chunkStepTicks > 1) {
+        this.cameraTarget = target
+        this.cameraTicksLeft = this.chunkStepTicks
+      } else {
+        this.cameraTarget = null
+        await bot.look(target.yaw, target.pitch, true)
+      }
+    }
+
+    for (let slot = 1; slot <= 9; slot++) {
+      if (buttons[`hotbar.${slot}`]) {
+        bot.setQuickBarSlot(slot - 1)
+        break
+      }
+    }
+
+    if (buttons.attack) {
+      const target = bot.entityAtCursor ? bot.entityAtCursor() : null
+      if (target) {
+        bot.attack(target)
+      } else {
+        bot.swingArm()
+      }
+    }
+    if (buttons.use) {
+      bot.activateItem()
+    }
+    if (buttons.drop && bot.heldItem) {
+      await bot.tossStack(bot.heldItem)
+    }
+  }
+
+  // Play a chunk of compound actions: the first now, the rest one per tick share
+  async executeChunk(actions) {
+    this.noteActionArrival()
+    // The chunk plays out over one action interval, each action getting an equal share
+    this.queuedActions = actions.slice(1)
+    this.chunkStepTicks = Math.max(1, Math.floor(this.intervalTicks() / actions.length))
+    this.queueTicksLeft = this.chunkStepTicks
+    await this.executeCompound(actions[0])
+  }
+
+  // Execute action (MineStudio-like)
+  async executeAction(action) {
+    const bot = this.bot
+    if (!bot) {
+      return { success: false, error: 'Bot not initialized' }
+    }
+
+    try {
+      // Handle different action types
+      const { type, ...params } = action
+      this.noteActionArrival()
+      const holdMs = params.duration || this.actionIntervalMs
+
+      switch (type) {
+        case 'forward':
+        case 'back':
+        case 'left':
+        case 'right':
+          bot.setControlState(type, params.value || true)
+          setTimeout(() => bot.setControlState(type, false), holdMs)
+          break
+
+        case 'jump':
+          bot.setControlState('jump', true)
+          setTimeout(() => bot.setControlState('jump', false), holdMs)
+          break
+
+        case 'sneak':
+          bot.setControlState('sneak', params.value || true)
+          break
+
+        case 'sprint':
+          bot.setControlState('sprint', params.value || true)
+          break
+
+        case 'attack':
+          if (bot.entity && bot.nearestEntity) {
+            await bot.attack(bot.nearestEntity())
           }
-        },
-        createElementNS: function(ns, tag) {
-          return this.createElement(tag)
-        }
+          break
+
+        case 'use':
+          bot.activateItem()
+          break
+
+        case 'look':
+          if (params.yaw !== undefined) bot.look(params.yaw, params.pitch || 0, true)
+          break
+
+        case 'chat':
+          bot.chat(params.message || '')
+          break
+
+        case 'compound':
+          this.queuedActions = []
+          this.chunkStepTicks = this.intervalTicks()
+          await this.executeCompound(params)
+          break
+
+        case 'noop':
+          // Do nothing
+          break
+
+        default:
+          return { success: false, error: `Unknown action type: ${type}` }
       }
+
+      return { success: true }
+    } catch (error) {
+      return { success: false, error: error.message }
     }
-    
-    console.log('[Viewer] Creating THREE.js renderer...')
-    viewerRenderer = new THREE.WebGLRenderer({
-      canvas: mockCanvas,
-      context: glContext,
-      antialias: false,
-      alpha: false,
-      preserveDrawingBuffer: true
-    })
-    
-    viewerRenderer.setSize(width, height)
-    
-    // Set clear color to sky blue instead of black for debugging
-    viewerRenderer.setClearColor(0x87CEEB, 1.0)  // Sky blue
-    
-    console.log('[Viewer] ✓ Renderer created with sky blue background')
-    
-    // Create the viewer
-    console.log('[Viewer] Creating Prismarine Viewer...')
-    serverViewer = new Viewer(viewerRenderer)
-    serverViewer.setVersion(bot.version)
-    console.log('[Viewer] ✓ Viewer created for version:', bot.version)
-    
-    // Configure camera clipping planes
-    serverViewer.camera.near = 0.1
-    serverViewer.camera.far = 1000
-    serverViewer.camera.updateProjectionMatrix()
-    console.log('[Viewer] ✓ Camera clip planes configured')
-    
-    // Add bright lighting to the scene
-    const ambientLight = new THREE.AmbientLight(0xffffff, 1.0)  // Full bright ambient
-    serverViewer.scene.add(ambientLight)
-    
-    // Add a directional light from the sun position
-    const directionalLight = new THREE.DirectionalLight(0xffffff, 0.8)
-    directionalLight.position.set(1, 1, 0.5).normalize()
-    serverViewer.scene.add(directionalLight)
-    
-    console.log('[Viewer] ✓ Added bright lighting to scene')
-    
-    // Wait a bit for textures to process
-    await new Promise(resolve => setTimeout(resolve, 500))
-    
-    // Create world view
-    const botPos = bot.entity.position
-    const center = new Vec3(botPos.x, botPos.y, botPos.z)
-    console.log('[Viewer] Bot position:', center)
-    
-    const viewDistance = 4  // Render distance in chunks
-    viewerWorldView = new WorldView(bot.world, viewDistance, center)
-    serverViewer.listen(viewerWorldView)
-    
-    console.log('[Viewer] Initializing world view (this loads chunks and textures)...')
-    await viewerWorldView.init(center)
-    console.log('[Viewer] ✓ World view initialized')
-    
-    // Check texture loading
-    console.log('[Viewer] Checking textures...')
-    let textureCount = 0
-    let loadedTextures = 0
-    serverViewer.scene.traverse(obj => {
-      if (obj.material) {
-        if (obj.material.map) {
-          textureCount++
-          if (obj.material.map.image) loadedTextures++
+  }
+
+  motionStatus() {
+    return {
+      ...this.motionConfig,
+      actionIntervalMs: Math.round(this.actionIntervalMs),
+      cameraTicksLeft: this.cameraTicksLeft,
+      queued: this.queuedActions.length,
+      movementHeld: this.movementHeld
+    }
+  }
+
+  summary() {
+    return {
+      id: this.id,
+      username: this.bot ? this.bot.username : null,
+      connected: !!(this.bot && this.bot.entity),
+      viewerReady: this.viewerReady,
+      instruction: this.scheduler ? this.scheduler.currentOf(this) : null,
+      framesRendered: this.framesRendered,
+      framesReused: this.framesReused
+    }
+  }
+
+  // Disconnect the bot and free its scene (shared textures stay loaded)
+  close() {
+    const bot = this.bot
+    this.bot = null
+    if (this.scheduler) {
+      this.scheduler.removeBot(this)
+      this.scheduler = null
+    }
+    this.viewerReady = false
+    this.queuedActions = []
+    this.cameraTarget = null
+    if (this.worldView && bot && this.worldView.removeListenersFromBot) {
+      this.worldView.removeListenersFromBot(bot)
+    }
+    if (this.viewer) {
+      disposeViewer(this.viewer)
+    }
+    this.viewer = null
+    this.worldView = null
+    if (bot) {
+      bot.end()
+    }
+  }
+}
+
+// ============ SHARED RENDERING ============
+
+// Create the headless WebGL context and THREE renderer on first use. headless-gl
+// contexts cannot move to worker threads, so all bots render on the main
+// thread; meshing runs in each viewer's workers and JPEG encoding on the
+// libuv pool, which keeps the serialized part down to render + readback.
+function getSharedRenderer() {
+  if (sharedRenderer) return sharedRenderer
+
+  console.log('[Viewer] Setting up shared server-side renderer with headless-gl...')
+  const THREE = require('three')
+  const width = VIEW_WIDTH
+  const height = VIEW_HEIGHT
+
+  // Create WebGL context using headless-gl
+  const glContext = gl(width, height, { preserveDrawingBuffer: true })
+
+  // Create a mock canvas element
+  const mockCanvas = {
+    width: width,
+    height: height,
+    clientWidth: width,
+    clientHeight: height,
+    style: {},
+    addEventListener: function() {},
+    removeEventListener: function() {},
+    getBoundingClientRect: function() {
+      return { left: 0, top: 0, width: width, height: height }
+    },
+    getContext: function(type) {
+      if (type === 'webgl' || type === 'experimental-webgl') {
+        return glContext
+      }
+      return null
+    }
+  }
+
+  // Attach canvas to context
+  glContext.canvas = mockCanvas
+
+  // Ensure drawing buffer dimensions are set
+  Object.defineProperty(glContext, 'drawingBufferWidth', {
+    get: function() { return width }
+  })
+  Object.defineProperty(glContext, 'drawingBufferHeight', {
+    get: function() { return height }
+  })
+
+  // Patch texImage2D to handle node-canvas Image objects
+  const originalTexImage2D = glContext.texImage2D.bind(glContext)
+  glContext.texImage2D = function(...args) {
+    // Handle the case where we're uploading an Image
+    if (args.length >= 6 && args[5] && typeof args[5] === 'object') {
+      const image = args[5]
+      // If it's a node-canvas Image, we need to get its raw pixel data
+      if (image.width && image.height && typeof image.src !== 'undefined') {
+        // Create a temporary canvas to extract pixel data
+        const tempCanvas = createCanvas(image.width, image.height)
+        const tempCtx = tempCanvas.getContext('2d')
+        tempCtx.drawImage(image, 0, 0)
+        const imageData = tempCtx.getImageData(0, 0, image.width, image.height)
+
+        // Upload using the ImageData instead
+        args[5] = imageData
+      }
+    }
+    return originalTexImage2D(...args)
+  }
+
+  // Mock document object for THREE.js
+  if (typeof document === 'undefined') {
+    global.document = {
+      createElement: function(tag) {
+        if (tag === 'canvas') {
+          return mockCanvas
         }
+        if (tag === 'img') {
+          // Create a proper image element for texture loading
+          // Use node-canvas Image which works with headless-gl
+          const { Image } = require('canvas')
+          const img = new Image()
+
+          // Override to handle both data URLs and file paths
+          const originalSrcSetter = Object.getOwnPropertyDescriptor(Image.prototype, 'src').set
+          Object.defineProperty(img, 'src', {
+            set: function(value) {
+              // Call original setter
+              if (originalSrcSetter) {
+                originalSrcSetter.call(this, value)
+              }
+
+              // Also trigger onload for data URLs
+              if (value && value.startsWith('data:')) {
+                setTimeout(() => {
+                  if (this.onload) this.onload()
+                }, 0)
+              }
+            },
+            get: function() {
+              return this._src || ''
+            }
+          })
+
+          return img
+        }
+        return {
+          style: {},
+          addEventListener: function() {},
+          removeEventListener: function() {}
+        }
+      },
+      createElementNS: function(ns, tag) {
+        return this.createElement(tag)
       }
-    })
-    console.log('[Viewer] Textures found:', textureCount, ', with images:', loadedTextures)
-    
-    // Set camera position and look at the world
-    serverViewer.camera.position.set(botPos.x, botPos.y + 1.6, botPos.z)
-    const yaw = bot.entity.yaw || 0
-    const pitch = bot.entity.pitch || 0  
-    serverViewer.camera.rotation.set(pitch, yaw, 0, 'YXZ')
-    
-    console.log('[Viewer] Camera positioned at bot location')
-    
-    // Give chunks time to load and textures to upload to GPU
-    console.log('[Viewer] Waiting for chunks and textures to load and upload to GPU...')
-    await new Promise(resolve => setTimeout(resolve, 5000))  // Longer wait for texture upload
-    
-    // Debug: check what's in the scene
-    console.log('[Viewer] Scene children count:', serverViewer.scene.children.length)
-    console.log('[Viewer] Scene children types:', serverViewer.scene.children.map(c => c.type).join(', '))
-    
-    // Do a test render
-    viewerRenderer.render(serverViewer.scene, serverViewer.camera)
-    console.log('[Viewer] Test render complete')
-    
-    // Check if any meshes rendered and their materials
-    let meshCount = 0
-    let meshWithTexture = 0
-    serverViewer.scene.traverse(obj => {
-      if (obj.isMesh) {
-        meshCount++
-        if (obj.material && obj.material.map) meshWithTexture++
+    }
+  }
+
+  sharedRenderer = new THREE.WebGLRenderer({
+    canvas: mockCanvas,
+    context: glContext,
+    antialias: false,
+    alpha: false,
+    preserveDrawingBuffer: true
+  })
+  sharedRenderer.setSize(width, height)
+
+  // Set clear color to sky blue instead of black for debugging
+  sharedRenderer.setClearColor(0x87CEEB, 1.0)  // Sky blue
+
+  console.log('[Viewer] ✓ Shared renderer created with sky blue background')
+  return sharedRenderer
+}
+
+// Stop the mesher workers a single bot does not need
+function trimMesherWorkers(viewer) {
+  const workers = viewer.world && viewer.world.workers
+  if (Array.isArray(workers) && MESHER_WORKERS_PER_BOT > 0 && workers.length > MESHER_WORKERS_PER_BOT) {
+    workers.splice(MESHER_WORKERS_PER_BOT).forEach(worker => worker.terminate())
+  }
+}
+
+// Reuse the texture atlas and block states of the first viewer of a version.
+// The first viewer loads them as usual (we record the block states it posts
+// to its workers); later viewers skip the load and get the shared material,
+// so the atlas is decoded and uploaded to the GPU once per process.
+function shareWorldAssets(viewer, version) {
+  const world = viewer.world
+  if (!world || !Array.isArray(world.workers) || world.workers.length === 0) return false
+
+  const shared = sharedWorldAssets.get(version)
+  if (shared && shared.blockStates) {
+    world.material = shared.material
+    world.updateTexturesData = function () {
+      for (const worker of this.workers) {
+        worker.postMessage({ type: 'blockStates', json: shared.blockStates })
       }
-    })
-    console.log('[Viewer] Total meshes in scene:', meshCount)
-    console.log('[Viewer] Meshes with textures:', meshWithTexture)
-    
-    // Check if scene has bounding box (is it visible?)
-    const bbox = new THREE.Box3().setFromObject(serverViewer.scene)
-    console.log('[Viewer] Scene bounding box:', {
-      min: {x: bbox.min.x.toFixed(1), y: bbox.min.y.toFixed(1), z: bbox.min.z.toFixed(1)},
-      max: {x: bbox.max.x.toFixed(1), y: bbox.max.y.toFixed(1), z: bbox.max.z.toFixed(1)}
-    })
-    
-    viewerReady = true
-    console.log('[Viewer] ✓✓✓ Server-side viewer FULLY INITIALIZED ✓✓✓')
+    }
     return true
-    
-  } catch (err) {
-    console.error('[Viewer] ✗ Server-side viewer init failed:', err.message)
-    console.error('[Viewer] Stack:', err.stack)
-    viewerReady = false
-    return false
   }
+
+  if (!shared) {
+    const entry = { material: world.material, blockStates: null }
+    sharedWorldAssets.set(version, entry)
+    const worker = world.workers[0]
+    const post = worker.postMessage.bind(worker)
+    worker.postMessage = (message, ...rest) => {
+      if (message && message.type === 'blockStates' && !entry.blockStates) {
+        entry.blockStates = message.json
+      }
+      return post(message, ...rest)
+    }
+  }
+  return false
 }
 
-// Old initViewer function removed - using initServerSideViewer instead
+// Free a bot's chunk meshes and workers; the shared material and cached meshes are left alone
+function disposeViewer(viewer) {
+  const world = viewer.world
+  if (!world) return
+  chunkMeshCache.detach(world)
+  if (world.sectionMeshs) {
+    for (const mesh of Object.values(world.sectionMeshs)) {
+      viewer.scene.remove(mesh)
+      if (mesh.geometry) mesh.geometry.dispose()
+    }
+    world.sectionMeshs = {}
+  }
+  if (Array.isArray(world.workers)) {
+    world.workers.forEach(worker => worker.terminate())
+    world.workers = []
+  }
+}
 
-async function captureScreenshot() {
-  // Return black image if not ready
-  if (!viewerReady || !serverViewer || !viewerRenderer || !bot) {
-    console.log('[Viewer] Not ready for screenshot - returning black image')
-    const canvas = createCanvas(640, 360)
+function readPixels(glContext, width, height) {
+  // Use headless-gl's pixels() method
+  if (typeof glContext.pixels === 'function') {
+    // headless-gl specific method - returns pixels in correct format
+    return glContext.pixels(0, 0, width, height)
+  }
+  // Fallback to standard readPixels
+  const pixels = new Uint8Array(width * height * 4)
+  glContext.readPixels(0, 0, width, height, glContext.RGBA, glContext.UNSIGNED_BYTE, pixels)
+  return pixels
+}
+
+function encodeJpeg(canvas, quality) {
+  return new Promise((resolve, reject) => {
+    canvas.toBuffer((err, buffer) => err ? reject(err) : resolve(buffer), 'image/jpeg', { quality })
+  })
+}
+
+// JPEG of a captured frame at the requested quality and size, encoded at
+// most once per format. Encoding runs on the libuv thread pool, so other bots
+// keep rendering while it compresses.
+function frameJpeg(frame, quality = JPEG_QUALITY, width = VIEW_WIDTH, height = VIEW_HEIGHT) {
+  if (!frame) return Promise.resolve(blackFrame())
+  const key = `${quality}:${width}x${height}`
+  if (!frame.jpegs.has(key)) {
+    let canvas = frame.canvas
+    if (width !== canvas.width || height !== canvas.height) {
+      canvas = createCanvas(width, height)
+      const ctx = canvas.getContext('2d')
+      ctx.imageSmoothingEnabled = true
+      ctx.drawImage(frame.canvas, 0, 0, width, height)
+    }
+    frame.jpegs.set(key, encodeJpeg(canvas, quality))
+  }
+  return frame.jpegs.get(key)
+}
+
+// Multi-resolution views cut from the same render canvas (see
+// observation_views.py): { overview: scale, crops: { name: [l, t, r, b] } }.
+// Returns { name: base64 JPEG }, all encoded in parallel.
+async function encodeViews(canvas, spec, quality = JPEG_QUALITY) {
+  const jobs = []
+  if (spec.overview) {
+    const width = Math.max(1, Math.round(canvas.width * spec.overview))
+    const height = Math.max(1, Math.round(canvas.height * spec.overview))
+    const overview = createCanvas(width, height)
+    const ctx = overview.getContext('2d')
+    ctx.imageSmoothingEnabled = true
+    ctx.drawImage(canvas, 0, 0, width, height)
+    jobs.push(['overview', overview])
+  }
+  for (const [name, box] of Object.entries(spec.crops || {})) {
+    const [left, top, right, bottom] = box
+    const crop = createCanvas(right - left, bottom - top)
+    crop.getContext('2d').drawImage(canvas, left, top, right - left, bottom - top, 0, 0, right - left, bottom - top)
+    jobs.push([name, crop])
+  }
+  const images = await Promise.all(jobs.map(([, view]) => encodeJpeg(view, quality)))
+  const views = {}
+  jobs.forEach(([name], i) => { views[name] = images[i].toString('base64') })
+  return views
+}
+
+let blackJpeg = null
+function blackFrame() {
+  if (!blackJpeg) {
+    const canvas = createCanvas(VIEW_WIDTH, VIEW_HEIGHT)
     const ctx = canvas.getContext('2d')
     ctx.fillStyle = 'black'
-    ctx.fillRect(0, 0, 640, 360)
-    return canvas.toBuffer('image/jpeg')
+    ctx.fillRect(0, 0, VIEW_WIDTH, VIEW_HEIGHT)
+    blackJpeg = canvas.toBuffer('image/jpeg')
   }
-  
-  try {
-    // Update world view center to bot's position
-    if (bot.entity && viewerWorldView) {
-      const Vec3 = require('vec3').Vec3
-      const botPos = bot.entity.position
-      const center = new Vec3(botPos.x, botPos.y, botPos.z)
-      
-      // Update world view center (loads new chunks as bot moves)
-      viewerWorldView.updatePosition(center)
-      
-      // Update camera position to bot's eye level
-      serverViewer.camera.position.set(botPos.x, botPos.y + 1.6, botPos.z)
-      
-      // Update camera rotation based on bot's yaw and pitch
-      const yaw = bot.entity.yaw
-      const pitch = bot.entity.pitch
-      serverViewer.camera.rotation.set(pitch, yaw, 0, 'YXZ')
-    }
-    
-    // Render the current frame
-    viewerRenderer.render(serverViewer.scene, serverViewer.camera)
-    
-    // Get WebGL context
-    const glContext = viewerRenderer.getContext()
-    const width = 640
-    const height = 360
-    
-    // Use headless-gl's pixels() method
-    let pixels
-    if (typeof glContext.pixels === 'function') {
-      // headless-gl specific method - returns pixels in correct format
-      pixels = glContext.pixels(0, 0, width, height)
+  return blackJpeg
+}
+
+// ============ MINECRAFT-STYLE HUD OVERLAY ============
+function drawHud(ctx, bot, width, height) {
+  // 1. CROSSHAIR (center, white with black outline for visibility)
+  const centerX = width / 2
+  const centerY = height / 2
+  const crosshairSize = 10
+
+  // Black outline
+  ctx.strokeStyle = 'rgba(0, 0, 0, 0.9)'
+  ctx.lineWidth = 4
+  ctx.beginPath()
+  ctx.moveTo(centerX - crosshairSize, centerY)
+  ctx.lineTo(centerX + crosshairSize, centerY)
+  ctx.moveTo(centerX, centerY - crosshairSize)
+  ctx.lineTo(centerX, centerY + crosshairSize)
+  ctx.stroke()
+
+  // White crosshair
+  ctx.strokeStyle = 'rgba(255, 255, 255, 1.0)'
+  ctx.lineWidth = 2
+  ctx.beginPath()
+  ctx.moveTo(centerX - crosshairSize, centerY)
+  ctx.lineTo(centerX + crosshairSize, centerY)
+  ctx.moveTo(centerX, centerY - crosshairSize)
+  ctx.lineTo(centerX, centerY + crosshairSize)
+  ctx.stroke()
+
+  // 2. HOTBAR (bottom center - Minecraft style)
+  const hotbarSlot = bot.quickBarSlot || 0
+  const slotSize = 40
+  const hotbarWidth = slotSize * 9
+  const hotbarX = (width - hotbarWidth) / 2
+  const hotbarY = height - 50
+
+  // Draw hotbar background (dark gray with border)
+  ctx.fillStyle = 'rgba(30, 30, 30, 0.8)'
+  ctx.fillRect(hotbarX - 2, hotbarY - 2, hotbarWidth + 4, slotSize + 4)
+
+  // Draw slot grid
+  for (let i = 0; i < 9; i++) {
+    const slotX = hotbarX + i * slotSize
+
+    // Slot background
+    if (i === hotbarSlot) {
+      ctx.fillStyle = 'rgba(255, 255, 255, 0.3)'  // Highlight selected
     } else {
-      // Fallback to standard readPixels
-      pixels = new Uint8Array(width * height * 4)
-      glContext.readPixels(0, 0, width, height, glContext.RGBA, glContext.UNSIGNED_BYTE, pixels)
-    }
-    
-    // Check if we got any data (debug - only log occasionally)
-    const shouldLog = Math.random() < 0.1  // Log 10% of the time
-    let nonZero = 0
-    let sampleVals = []
-    for (let i = 0; i < Math.min(100, pixels.length); i++) {
-      if (pixels[i] !== 0) nonZero++
-      if (i < 20) sampleVals.push(pixels[i])
-    }
-    
-    if (shouldLog) {
-      console.log('[Viewer] DEBUG: nonZero=', nonZero, '/100, sample:', sampleVals)
-    }
-    
-    if (nonZero === 0 && shouldLog) {
-      console.log('[Viewer] WARNING: First 100 pixels are all zero - image will be black')
-    }
-    
-    // Create canvas and convert from RGBA to RGB
-    const canvas = createCanvas(width, height)
-    const ctx = canvas.getContext('2d')
-    const imageData = ctx.createImageData(width, height)
-    
-    // headless-gl returns pixels bottom-up, need to flip Y
-    for (let y = 0; y < height; y++) {
-      const srcRow = height - 1 - y  // Flip Y coordinate
-      for (let x = 0; x < width; x++) {
-        const srcIdx = (srcRow * width + x) * 4
-        const dstIdx = (y * width + x) * 4
-        
-        // Copy RGBA channels
-        imageData.data[dstIdx] = pixels[srcIdx]      // R
-        imageData.data[dstIdx + 1] = pixels[srcIdx + 1]  // G
-        imageData.data[dstIdx + 2] = pixels[srcIdx + 2]  // B
-        imageData.data[dstIdx + 3] = 255  // A (always opaque)
-      }
+      ctx.fillStyle = 'rgba(60, 60, 60, 0.6)'
     }
-    
-    ctx.putImageData(imageData, 0, 0)
-    
-    // ============ MINECRAFT-STYLE HUD OVERLAY ============
-    
-    // 1. CROSSHAIR (center, white with black outline for visibility)
-    const centerX = width / 2
-    const centerY = height / 2
-    const crosshairSize = 10
-    
-    // Black outline
-    ctx.strokeStyle = 'rgba(0, 0, 0, 0.9)'
-    ctx.lineWidth = 4
-    ctx.beginPath()
-    ctx.moveTo(centerX - crosshairSize, centerY)
-    ctx.lineTo(centerX + crosshairSize, centerY)
-    ctx.moveTo(centerX, centerY - crosshairSize)
-    ctx.lineTo(centerX, centerY + crosshairSize)
-    ctx.stroke()
-    
-    // White crosshair
-    ctx.strokeStyle = 'rgba(255, 255, 255, 1.0)'
-    ctx.lineWidth = 2
-    ctx.beginPath()
-    ctx.moveTo(centerX - crosshairSize, centerY)
-    ctx.lineTo(centerX + crosshairSize, centerY)
-    ctx.moveTo(centerX, centerY - crosshairSize)
-    ctx.lineTo(centerX, centerY + crosshairSize)
-    ctx.stroke()
-    
-    // 2. HOTBAR (bottom center - Minecraft style)
-    const hotbarSlot = bot.quickBarSlot || 0
-    const slotSize = 40
-    const hotbarWidth = slotSize * 9
-    const hotbarX = (width - hotbarWidth) / 2
-    const hotbarY = height - 50
-    
-    // Draw hotbar background (dark gray with border)
-    ctx.fillStyle = 'rgba(30, 30, 30, 0.8)'
-    ctx.fillRect(hotbarX - 2, hotbarY - 2, hotbarWidth + 4, slotSize + 4)
-    
-    // Draw slot grid
-    for (let i = 0; i < 9; i++) {
-      const slotX = hotbarX + i * slotSize
-      
-      // Slot background
-      if (i === hotbarSlot) {
-        ctx.fillStyle = 'rgba(255, 255, 255, 0.3)'  // Highlight selected
-      } else {
-        ctx.fillStyle = 'rgba(60, 60, 60, 0.6)'
-      }
-      ctx.fillRect(slotX, hotbarY, slotSize, slotSize)
-      
-      // Slot border
-      ctx.strokeStyle = i === hotbarSlot ? 'rgba(255, 255, 255, 1.0)' : 'rgba(139, 139, 139, 0.8)'
-      ctx.lineWidth = i === hotbarSlot ? 3 : 1
-      ctx.strokeRect(slotX, hotbarY, slotSize, slotSize)
-      
-      // Draw item name if exists
-      const hotbarItem = bot.inventory.slots[36 + i]  // Hotbar starts at slot 36
-      if (hotbarItem) {
+    ctx.fillRect(slotX, hotbarY, slotSize, slotSize)
+
+    // Slot border
+    ctx.strokeStyle = i === hotbarSlot ? 'rgba(255, 255, 255, 1.0)' : 'rgba(139, 139, 139, 0.8)'
+    ctx.lineWidth = i === hotbarSlot ? 3 : 1
+    ctx.strokeRect(slotX, hotbarY, slotSize, slotSize)
+
+    // Draw item name if exists
+    const hotbarItem = bot.inventory.slots[36 + i]  // Hotbar starts at slot 36
+    if (hotbarItem) {
+      ctx.fillStyle = 'white'
+      ctx.font = '10px monospace'
+      const itemName = hotbarItem.name.replace('minecraft:', '').substring(0, 6)
+      ctx.fillText(itemName, slotX + 2, hotbarY + slotSize - 3)
+
+      // Draw count if > 1
+      if (hotbarItem.count > 1) {
         ctx.fillStyle = 'white'
-        ctx.font = '10px monospace'
-        const itemName = hotbarItem.name.replace('minecraft:', '').substring(0, 6)
-        ctx.fillText(itemName, slotX + 2, hotbarY + slotSize - 3)
-        
-        // Draw count if > 1
-        if (hotbarItem.count > 1) {
-          ctx.fillStyle = 'white'
-          ctx.font = 'bold 12px monospace'
-          ctx.fillText(hotbarItem.count.toString(), slotX + slotSize - 15, hotbarY + 15)
-        }
+        ctx.font = 'bold 12px monospace'
+        ctx.fillText(hotbarItem.count.toString(), slotX + slotSize - 15, hotbarY + 15)
       }
     }
-    
-    // 3. HEALTH BAR (bottom left - Minecraft hearts style)
-    const heartY = height - 60
-    const maxHearts = 10
-    const heartWidth = 9
-    const heartSpacing = 8
-    
-    ctx.font = '10px monospace'
-    ctx.fillStyle = 'white'
-    ctx.fillText('❤', 5, heartY - 5)  // Label
-    
-    const hearts = Math.ceil(bot.health / 2)  // 20 health = 10 hearts
-    for (let i = 0; i < maxHearts; i++) {
-      const heartX = 20 + i * (heartWidth + heartSpacing)
-      
-      if (i < hearts) {
-        ctx.fillStyle = 'rgba(255, 0, 0, 0.9)'  // Filled heart
-      } else {
-        ctx.fillStyle = 'rgba(100, 0, 0, 0.5)'  // Empty heart
-      }
-      ctx.fillRect(heartX, heartY - 8, heartWidth, 8)
-    }
-    
-    // 4. FOOD BAR (bottom right - Minecraft drumsticks style)
-    const foodY = height - 60
-    const maxFood = 10
-    const foodWidth = 9
-    const foodSpacing = 8
-    
-    ctx.font = '10px monospace'
+  }
+
+  // 3. HEALTH BAR (bottom left - Minecraft hearts style)
+  const heartY = height - 60
+  const maxHearts = 10
+  const heartWidth = 9
+  const heartSpacing = 8
+
+  ctx.font = '10px monospace'
+  ctx.fillStyle = 'white'
+  ctx.fillText('❤', 5, heartY - 5)  // Label
+
+  const hearts = Math.ceil(bot.health / 2)  // 20 health = 10 hearts
+  for (let i = 0; i < maxHearts; i++) {
+    const heartX = 20 + i * (heartWidth + heartSpacing)
+
+    if (i < hearts) {
+      ctx.fillStyle = 'rgba(255, 0, 0, 0.9)'  // Filled heart
+    } else {
+      ctx.fillStyle = 'rgba(100, 0, 0, 0.5)'  // Empty heart
+    }
+    ctx.fillRect(heartX, heartY - 8, heartWidth, 8)
+  }
+
+  // 4. FOOD BAR (bottom right - Minecraft drumsticks style)
+  const foodY = height - 60
+  const maxFood = 10
+  const foodWidth = 9
+  const foodSpacing = 8
+
+  ctx.font = '10px monospace'
+  ctx.fillStyle = 'white'
+  ctx.fillText('🍗', width - 115, foodY - 5)  // Label
+
+  const foodUnits = Math.ceil(bot.food / 2)  // 20 food = 10 units
+  for (let i = 0; i < maxFood; i++) {
+    const foodX = width - 100 + i * (foodWidth + foodSpacing)
+
+    if (i < foodUnits) {
+      ctx.fillStyle = 'rgba(160, 82, 45, 0.9)'  // Filled food
+    } else {
+      ctx.fillStyle = 'rgba(80, 40, 20, 0.5)'  // Empty food
+    }
+    ctx.fillRect(foodX, foodY - 8, foodWidth, 8)
+  }
+
+  // 5. POSITION/INFO OVERLAY (top left - for debugging)
+  if (bot.entity) {
+    ctx.font = '12px monospace'
+    ctx.fillStyle = 'rgba(0, 0, 0, 0.7)'
+    ctx.fillRect(5, 5, 200, 60)
+
     ctx.fillStyle = 'white'
-    ctx.fillText('🍗', width - 115, foodY - 5)  // Label
-    
-    const foodUnits = Math.ceil(bot.food / 2)  // 20 food = 10 units
-    for (let i = 0; i < maxFood; i++) {
-      const foodX = width - 100 + i * (foodWidth + foodSpacing)
-      
-      if (i < foodUnits) {
-        ctx.fillStyle = 'rgba(160, 82, 45, 0.9)'  // Filled food
-      } else {
-        ctx.fillStyle = 'rgba(80, 40, 20, 0.5)'  // Empty food
-      }
-      ctx.fillRect(foodX, foodY - 8, foodWidth, 8)
-    }
-    
-    // 5. POSITION/INFO OVERLAY (top left - for debugging)
-    if (bot.entity) {
-      ctx.font = '12px monospace'
-      ctx.fillStyle = 'rgba(0, 0, 0, 0.7)'
-      ctx.fillRect(5, 5, 200, 60)
-      
-      ctx.fillStyle = 'white'
-      const pos = bot.entity.position
-      ctx.fillText(`Pos: ${pos.x.toFixed(1)}, ${pos.y.toFixed(1)}, ${pos.z.toFixed(1)}`, 10, 20)
-      ctx.fillText(`Health: ${bot.health}/20`, 10, 35)
-      ctx.fillText(`Food: ${bot.food}/20`, 10, 50)
-    }
-    
-    console.log('[Viewer] Screenshot captured successfully')
-    return canvas.toBuffer('image/jpeg', { quality: 0.9 })
-    
-  } catch (err) {
-    console.error('[Viewer] Screenshot error:', err.message)
-    console.error('[Viewer] Stack:', err.stack)
-    
-    // Return black image on error
-    const canvas = createCanvas(640, 360)
-    const ctx = canvas.getContext('2d')
-    ctx.fillStyle = 'black'
-    ctx.fillRect(0, 0, 640, 360)
-    return canvas.toBuffer('image/jpeg')
+    const pos = bot.entity.position
+    ctx.fillText(`Pos: ${pos.x.toFixed(1)}, ${pos.y.toFixed(1)}, ${pos.z.toFixed(1)}`, 10, 20)
+    ctx.fillText(`Health: ${bot.health}/20`, 10, 35)
+    ctx.fillText(`Food: ${bot.food}/20`, 10, 50)
   }
 }
 
-// Get current observation (screenshot + state)
-async function getObservation() {
-  if (!bot) return null
-  
-  const obs = {
-    // Position
-    position: bot.entity ? {
-      x: bot.entity.position.x,
-      y: bot.entity.position.y,
-      z: bot.entity.position.z
-    } : null,
-    
-    // Rotation (yaw, pitch)
-    yaw: bot.entity ? bot.entity.yaw : 0,
-    pitch: bot.entity ? bot.entity.pitch : 0,
-    
-    // Health/Food
-    health: bot.health || 0,
-    food: bot.food || 0,
-    
-    // Inventory (simplified)
-    inventory: bot.inventory.items().map(item => ({
-      name: item.name,
-      count: item.count,
-      slot: item.slot
-    })),
-    
-    // Nearby entities
-    entities: Object.values(bot.entities).filter(e => 
-      e.position && bot.entity && 
-      e.position.distanceTo(bot.entity.position) < 32
-    ).map(e => ({
-      type: e.name,
-      position: { x: e.position.x, y: e.position.y, z: e.position.z },
-      distance: bot.entity ? e.position.distanceTo(bot.entity.position) : null
-    })),
-    
-    // Time
-    time: bot.time.timeOfDay || 0,
-    
-    // Game mode
-    gameMode: bot.game.gameMode || 'survival'
-  }
-  
-  return obs
+// Decode packed action records into compound actions
+function decodeBinaryActions(buffer) {
+  const actions = []
+  for (let offset = 0; offset + ACTION_RECORD_BYTES <= buffer.length; offset += ACTION_RECORD_BYTES) {
+    const mask = buffer.readUInt32LE(offset)
+    const buttons = {}
+    BUTTON_NAMES.forEach((name, i) => {
+      if (mask & (1 << i)) buttons[name] = 1
+    })
+    actions.push({
+      type: 'compound',
+      camera: [buffer.readInt16LE(offset + 4) / CAMERA_SCALE, buffer.readInt16LE(offset + 6) / CAMERA_SCALE],
+      buttons
+    })
+  }
+  return actions
+}
+
+// ============ ROUTING ============
+
+// Bot addressed by a request: /bots/<id>/..., ?bot=<id>, X-Bot-Id or body.botId
+function botIdOf(req) {
+  return req.params.botId || req.query.bot || req.get('X-Bot-Id') ||
+    (req.body && typeof req.body === 'object' && !Buffer.isBuffer(req.body) && req.body.botId) ||
+    DEFAULT_BOT
 }
 
-// Execute action (MineStudio-like)
-async function executeAction(action) {
-  if (!bot) {
-    return { success: false, error: 'Bot not initialized' }
+function isHostedBot(username) {
+  for (const session of sessions.values()) {
+    if (session.bot && session.bot.username === username) return true
   }
+  return false
+}
 
-  try {
-    // Handle different action types
-    const { type, ...params } = action
+// A typo'd or closed bot id must not look healthy to the agent
+function unknownBot(req, res) {
+  return res.status(404).json({ success: false, error: `Unknown bot '${botIdOf(req)}'` })
+}
 
-    switch (type) {
-      case 'forward':
-        bot.setControlState('forward', params.value || true)
-        setTimeout(() => bot.setControlState('forward', false), params.duration || 100)
-        break
-      
-      case 'back':
-        bot.setControlState('back', params.value || true)
-        setTimeout(() => bot.setControlState('back', false), params.duration || 100)
-        break
-      
-      case 'left':
-        bot.setControlState('left', params.value || true)
-        setTimeout(() => bot.setControlState('left', false), params.duration || 100)
-        break
-      
-      case 'right':
-        bot.setControlState('right', params.value || true)
-        setTimeout(() => bot.setControlState('right', false), params.duration || 100)
-        break
-      
-      case 'jump':
-        bot.setControlState('jump', true)
-        setTimeout(() => bot.setControlState('jump', false), params.duration || 100)
-        break
-      
-      case 'sneak':
-        bot.setControlState('sneak', params.value || true)
-        break
-      
-      case 'sprint':
-        bot.setControlState('sprint', params.value || true)
-        break
-      
-      case 'attack':
-        if (bot.entity && bot.nearestEntity) {
-          await bot.attack(bot.nearestEntity())
-        }
-        break
-      
-      case 'use':
-        bot.activateItem()
-        break
-      
-      case 'look':
-        if (params.yaw !== undefined) bot.look(params.yaw, params.pitch || 0, true)
-        break
-      
-      case 'chat':
-        bot.chat(params.message || '')
-        break
-      
-      case 'noop':
-        // Do nothing
-        break
-      
-      default:
-        return { success: false, error: `Unknown action type: ${type}` }
+function sessionOf(req, create = false) {
+  const id = String(botIdOf(req))
+  let session = sessions.get(id)
+  if (!session && create) {
+    session = new BotSession(id)
+    sessions.set(id, session)
+  }
+  return session || null
+}
+
+// Process-wide endpoint: every hosted bot plus memory usage
+app.get('/bots', (req, res) => {
+  const memory = process.memoryUsage()
+  res.json({
+    success: true,
+    bots: [...sessions.values()].map(session => session.summary()),
+    sharedRenderer: sharedRenderer !== null,
+    sharedVersions: [...sharedWorldAssets.keys()],
+    chunkCache: chunkMeshCache.stats(),
+    memoryMB: {
+      rss: Math.round(memory.rss / 1048576),
+      heapUsed: Math.round(memory.heapUsed / 1048576),
+      external: Math.round(memory.external / 1048576)
     }
+  })
+})
 
-    return { success: true }
-  } catch (error) {
-    return { success: false, error: error.message }
+// Instruction queues of every world: queue depth, counters and dispatch latency
+app.get('/instructions', (req, res) => {
+  const worlds = {}
+  for (const [world, scheduler] of schedulers) {
+    worlds[world] = { ...scheduler.stats(), pending: scheduler.pending(20) }
   }
-}
+  res.json({ success: true, worlds })
+})
 
-// API Endpoints
+const router = express.Router({ mergeParams: true })
 
-app.post('/init', async (req, res) => {
+router.post('/init', async (req, res) => {
   try {
     const config = req.body
-    createBot(config)
-    res.json({ success: true, message: 'Bot initialized' })
+    const session = sessionOf(req, true)
+    session.createBot(config)
+    res.json({ success: true, message: 'Bot initialized', botId: session.id, bots: sessions.size })
   } catch (error) {
     res.status(500).json({ success: false, error: error.message })
   }
 })
 
-app.get('/observation', async (req, res) => {
+router.get('/observation', async (req, res) => {
   try {
-    const obs = await getObservation()
-    res.json({ success: true, observation: obs })
+    const session = sessionOf(req)
+    res.json({ success: true, observation: session ? session.getObservation() : null })
   } catch (error) {
     res.status(500).json({ success: false, error: error.message })
   }
 })
 
-app.post('/action', async (req, res) => {
+router.post('/action', async (req, res) => {
   try {
-    const action = req.body
-    const result = await executeAction(action)
-    const obs = await getObservation()
-    res.json({ ...result, observation: obs })
+    const session = sessionOf(req)
+    if (!session) {
+      return res.json({ success: false, error: 'Bot not initialized', observation: null })
+    }
+    const result = await session.executeAction(req.body)
+    res.json({ ...result, observation: session.getObservation() })
   } catch (error) {
     res.status(500).json({ success: false, error: error.message })
   }
 })
 
-app.post('/reset', async (req, res) => {
+// Compact action path: body is one or more 8-byte records (see
+// ActionMapper.encode_binary); the first is applied now, the rest one per tick
+router.post('/action/binary', express.raw({ type: 'application/octet-stream', limit: '1mb' }), async (req, res) => {
   try {
+    const session = sessionOf(req)
+    if (!session || !session.bot) {
+      return res.json({ success: false, error: 'Bot not initialized' })
+    }
+    const actions = decodeBinaryActions(req.body)
+    if (actions.length === 0) {
+      return res.status(400).json({ success: false, error: 'Empty action payload' })
+    }
+    await session.executeChunk(actions)
+    res.json({ success: true, queued: session.queuedActions.length, observation: session.getObservation() })
+  } catch (error) {
+    res.status(500).json({ success: false, error: error.message })
+  }
+})
+
+router.post('/reset', async (req, res) => {
+  try {
+    const session = sessionOf(req, true)
     // Respawn or recreate bot
-    if (bot) {
-      bot.chat('/kill @s')
+    if (session.bot) {
+      session.bot.chat('/kill @s')
       await new Promise(resolve => setTimeout(resolve, 1000))
     } else {
-      createBot(req.body || {})
+      const bot = session.createBot(req.body || {})
       await new Promise(resolve => {
         bot.once('spawn', resolve)
         setTimeout(resolve, 5000) // Timeout
       })
     }
-    const obs = await getObservation()
-    res.json({ success: true, observation: obs })
+    res.json({ success: true, observation: session.getObservation() })
   } catch (error) {
     res.status(500).json({ success: false, error: error.message })
   }
 })
 
-app.post('/close', async (req, res) => {
+// Disconnects only the addressed bot; the process keeps serving the others
+router.post('/close', async (req, res) => {
   try {
-    if (bot) {
-      bot.end()
-      bot = null
+    const session = sessionOf(req)
+    if (session) {
+      session.close()
+      sessions.delete(session.id)
     }
-    res.json({ success: true })
+    res.json({ success: true, remaining: sessions.size })
   } catch (error) {
     res.status(500).json({ success: false, error: error.message })
   }
 })
 
-app.get('/status', (req, res) => {
+router.get('/motion', (req, res) => {
+  const session = sessionOf(req)
+  if (!session) return unknownBot(req, res)
+  res.json({ success: true, ...session.motionStatus() })
+})
+
+router.get('/status', (req, res) => {
+  const session = sessionOf(req)
+  if (!session) return unknownBot(req, res)
+  const bot = session.bot
   res.json({
     success: true,
-    connected: bot && bot.entity !== null,
-    username: bot ? bot.username : null
+    connected: !!(bot && bot.entity),
+    username: bot ? bot.username : null,
+    bots: sessions.size
   })
 })
 
 
-// Chat endpoints
-app.post('/chat/instructions', (req, res) => {
+// Chat endpoints. Polling /chat/instructions keeps the bot available to the
+// scheduler, which pushes assignments: `current` is this bot's instruction
+// (a new id means a new or preempting task, null means none/cancelled) and
+// `instructions` the world's queue in dispatch order.
+router.post('/chat/instructions', (req, res) => {
+  const session = sessionOf(req)
+  if (!session) return unknownBot(req, res)
+  const scheduler = session.scheduler
   res.json({
     success: true,
-    instructions: chatInstructions,
-    current: processingInstruction
+    instructions: scheduler ? scheduler.pending() : [],
+    current: scheduler ? scheduler.poll(session) : null
   })
 })
 
-app.post('/chat/start_instruction', (req, res) => {
-  if (chatInstructions.length > 0) {
-    processingInstruction = chatInstructions.shift()
-    res.json({ success: true, instruction: processingInstruction })
-  } else {
-    res.json({ success: true, instruction: null })
-  }
+// Kept for older clients: same assignment as /chat/instructions reports
+router.post('/chat/start_instruction', (req, res) => {
+  const session = sessionOf(req)
+  if (!session) return unknownBot(req, res)
+  const scheduler = session.scheduler
+  res.json({ success: true, instruction: scheduler ? scheduler.poll(session) : null })
 })
 
-app.post('/chat/clear_instruction', (req, res) => {
-  processingInstruction = null
+// The agent is done with its instruction; the bot takes the next queued one
+router.post('/chat/clear_instruction', (req, res) => {
+  const session = sessionOf(req)
+  if (!session) return unknownBot(req, res)
+  if (session.scheduler) session.scheduler.finish(session)
   res.json({ success: true })
 })
 
-// Screenshot endpoint
-app.post('/screenshot', async (req, res) => {
-  if (!bot) {
+// Screenshot endpoint. Body (all optional):
+//   since: <frameId>  - leave the images out if the frame has not changed
+//                       since that id (the client still has them)
+//   views: { overview, crops, full } - also return a low-resolution overview
+//                       and full-resolution crops of the same frame;
+//                       full: false skips the full-size image
+//   quality: 1-100     - JPEG quality (default 90)
+//   width, height      - scale the full-size image to this size (default 640x360)
+router.post('/screenshot', async (req, res) => {
+  const session = sessionOf(req)
+  if (!session || !session.bot) {
     return res.json({ success: false, error: 'Bot not initialized' })
   }
-  
+
   try {
-    const imageBuffer = await captureScreenshot()
-    const base64Image = imageBuffer.toString('base64')
-    
+    const { frame, changed, frameId } = session.captureScreenshot()
+    const body = req.body || {}
+    const since = body.since
+    // Changed relative to the client's frame when it says which one it has
+    const changedForClient = changed || (since !== undefined && since !== null && Number(since) !== frameId)
+    const clientHasFrame = !changedForClient && since !== undefined && since !== null
+    const spec = body.views
+    const quality = Number(body.quality) ? Math.min(100, Math.max(1, Number(body.quality))) / 100 : JPEG_QUALITY
+    const width = Math.min(VIEW_WIDTH, Math.max(16, Math.round(Number(body.width) || VIEW_WIDTH)))
+    const height = Math.min(VIEW_HEIGHT, Math.max(16, Math.round(Number(body.height) || VIEW_HEIGHT)))
+
+    let image = null
+    let views = null
+    if (!clientHasFrame) {
+      const [full, cut] = await Promise.all([
+        spec && spec.full === false ? null : frameJpeg(frame, quality, width, height),
+        spec && frame ? encodeViews(frame.canvas, spec, quality) : null
+      ])
+      image = full && full.toString('base64')
+      views = cut
+    }
+
     res.json({
       success: true,
-      image: base64Image,
+      image,
+      views,
+      changed: changedForClient,
+      frameId,
       format: 'jpeg',
-      width: 640,
-      height: 360,
-      viewerReady: viewerReady
+      width: frame ? width : VIEW_WIDTH,
+      height: frame ? height : VIEW_HEIGHT,
+      viewerReady: session.viewerReady
     })
   } catch (err) {
     res.json({ success: false, error: err.message })
@@ -828,18 +1348,21 @@ app.post('/screenshot', async (req, res) => {
 })
 
 // Viewer status endpoint
-app.get('/viewer/status', (req, res) => {
+router.get('/viewer/status', (req, res) => {
+  const session = sessionOf(req)
   res.json({
     success: true,
-    viewerReady: viewerReady,
-    serverViewer: serverViewer !== null,
-    viewerRenderer: viewerRenderer !== null,
-    botConnected: bot && bot.entity !== null
+    viewerReady: !!(session && session.viewerReady),
+    serverViewer: !!(session && session.viewer),
+    viewerRenderer: sharedRenderer !== null,
+    botConnected: !!(session && session.bot && session.bot.entity)
   })
 })
 
+app.use('/bots/:botId', router)
+app.use('/', router)
+
 const PORT = process.env.MINEFLAYER_PORT || 1111
 app.listen(PORT, () => {
   console.log(`[Bridge] Mineflayer bridge server running on port ${PORT}`)
 })
-
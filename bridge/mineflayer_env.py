@@ -3,14 +3,24 @@ Mineflayer Environment Wrapper
 Mimics MineStudio's MinecraftSim interface but uses Mineflayer + real Minecraft server
 """
 
+import base64
+import io
 import numpy as np
 import requests
 import time
 import subprocess
 import os
 import signal
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Sequence
 from pathlib import Path
+from PIL import Image
+
+from health_watchdog import Watchdog
+from observation_views import parse_view_spec, views_request
+
+# JPEG quality the bridge encodes frames at unless asked otherwise
+# (JPEG_QUALITY in mineflayer_bridge.js)
+DEFAULT_FRAME_QUALITY = 90
 
 
 class MineflayerEnv:
@@ -26,17 +36,53 @@ class MineflayerEnv:
         bot_username='AIBot',
         bridge_port=1111,
         obs_size=(360, 640),  # Height, Width - matching MineStudio
-        auto_start_bridge=True
+        auto_start_bridge=True,
+        spawn_wait=12.0,
+        watchdog=True,
+        heartbeat_interval=2.0,
+        failure_threshold=3,
+        binary_actions=False,
+        camera_smoothing=True,
+        hold_timeout=1.0,
+        bot_id=None,
+        views=None
     ):
         self.server_host = server_host
         self.server_port = server_port
         self.bot_username = bot_username
         self.bridge_port = bridge_port
         self.obs_size = obs_size
+        self.spawn_wait = spawn_wait  # Seconds to wait for spawn + viewer init
         
         self.bridge_url = f"http://localhost:{bridge_port}"
-        self.bridge_process = None
+        # One bridge process hosts many bots; each env addresses its own under
+        # /bots/<bot_id>. Without an id the bridge's 'default' bot is used.
+        self.bot_id = bot_id
+        self.bot_url = f"{self.bridge_url}/bots/{bot_id}" if bot_id else self.bridge_url
+        self.bridge_process = None  # Only set if this env spawned the bridge
+        self.auto_start_bridge = auto_start_bridge
         self.action_type = "env"  # Compatible with MineStudio
+        self.degraded_steps = 0
+        self.last_frame_degraded = False
+        # Render-on-demand: the bridge skips rendering (and sending) frames
+        # that have not changed since last_frame_id
+        self.last_frame_id = None
+        self.last_frame_changed = True
+        self._last_frame = None
+        # Multi-resolution views (spec string or parsed dict, see observation_views),
+        # cut by the bridge from the same render as the pov
+        self.views = parse_view_spec(views) if isinstance(views, str) else views
+        self.last_views = {}
+        # Frame format requested from the bridge (None = bridge default,
+        # DEFAULT_FRAME_QUALITY at 640x360); changed at runtime by the quality controller
+        self.frame_quality = None
+        self.frame_size = None
+        # Send compound actions as packed records to /action/binary instead of JSON
+        self.binary_actions = binary_actions
+        # Bridge-side motion: ease camera deltas over the ticks until the next
+        # action and hold movement keys until it arrives (or hold_timeout passes)
+        self.camera_smoothing = camera_smoothing
+        self.hold_timeout = hold_timeout
         
         if auto_start_bridge:
             self._start_bridge()
@@ -44,8 +90,30 @@ class MineflayerEnv:
         # Initialize bot
         self._init_bot()
         
+        # Restart the bridge in the background if it crashes or hangs
+        self.watchdog = None
+        if watchdog:
+            self.watchdog = Watchdog(
+                'bridge',
+                heartbeat=self._heartbeat,
+                restart=self._restart_bridge,
+                interval=heartbeat_interval,
+                failure_threshold=failure_threshold
+            )
+            self.watchdog.start()
+        
+    def _bridge_running(self) -> bool:
+        try:
+            return requests.get(f"{self.bridge_url}/bots", timeout=1).json().get('success', False)
+        except Exception:
+            return False
+    
     def _start_bridge(self):
-        """Start the Node.js bridge server"""
+        """Start the Node.js bridge server, or join the one already on bridge_port"""
+        if self._bridge_running():
+            print(f"[MineflayerEnv] Using running bridge on port {self.bridge_port}")
+            return
+        
         bridge_path = Path(__file__).parent / "mineflayer_bridge.js"
         if not bridge_path.exists():
             raise FileNotFoundError(f"Bridge script not found: {bridge_path}")
@@ -70,11 +138,15 @@ class MineflayerEnv:
         """Initialize the bot connection and wait for it to spawn"""
         try:
             response = requests.post(
-                f"{self.bridge_url}/init",
+                f"{self.bot_url}/init",
                 json={
                     'host': self.server_host,
                     'port': self.server_port,
-                    'username': self.bot_username
+                    'username': self.bot_username,
+                    'motion': {
+                        'cameraSmoothing': self.camera_smoothing,
+                        'holdTimeoutMs': int(self.hold_timeout * 1000)
+                    }
                 },
                 timeout=10
             )
@@ -84,10 +156,10 @@ class MineflayerEnv:
                 # Wait for bot to actually spawn and viewer to initialize
                 print(f"[MineflayerEnv] Waiting for bot to spawn and server-side viewer to initialize...")
                 print(f"[MineflayerEnv] This should take ~10-12 seconds (includes texture loading)...")
-                time.sleep(12)  # Wait for: spawn (2s) + chunks (3s) + viewer init (2s) + textures (5s)
+                time.sleep(self.spawn_wait)  # Default 12s: spawn (2s) + chunks (3s) + viewer init (2s) + textures (5s)
                 
                 # Verify bot is connected
-                status = requests.get(f"{self.bridge_url}/status", timeout=2).json()
+                status = requests.get(f"{self.bot_url}/status", timeout=2).json()
                 if status.get('connected'):
                     print(f"[MineflayerEnv] ✓ Bot connected and ready")
                 else:
@@ -95,7 +167,7 @@ class MineflayerEnv:
                 
                 # Check viewer status
                 try:
-                    viewer_status = requests.get(f"{self.bridge_url}/viewer/status", timeout=2).json()
+                    viewer_status = requests.get(f"{self.bot_url}/viewer/status", timeout=2).json()
                     if viewer_status.get('viewerReady'):
                         print(f"[MineflayerEnv] ✓ Viewer ready - screenshots will work")
                     else:
@@ -108,6 +180,51 @@ class MineflayerEnv:
         except Exception as e:
             print(f"[MineflayerEnv] Error initializing bot: {e}")
     
+    def _heartbeat(self) -> bool:
+        """
+        Bridge process alive and our bot connected. A kicked or disconnected
+        bot counts as a failure too (the Node process may still answer), so
+        the watchdog reconnects it via _restart_bridge.
+        """
+        if self.bridge_process and self.bridge_process.poll() is not None:
+            return False
+        response = requests.get(f"{self.bot_url}/status", timeout=2)
+        if response.status_code != 200:
+            return False
+        status = response.json()
+        return bool(status.get('success')) and bool(status.get('connected'))
+    
+    def _restart_bridge(self):
+        """Restart the Node bridge (if we own it) and reconnect the bot"""
+        if self.auto_start_bridge:
+            if self.bridge_process and self.bridge_process.poll() is None:
+                self.bridge_process.kill()
+                self.bridge_process.wait(timeout=5)
+            self.bridge_process = None
+            # Joins a bridge another env already brought back, otherwise spawns one
+            self._start_bridge()
+        self._init_bot()
+        if not self._heartbeat():
+            raise RuntimeError("bridge did not come back after restart")
+    
+    @property
+    def healthy(self) -> bool:
+        """False while the bridge is failing or being restarted"""
+        return self.watchdog.healthy if self.watchdog else True
+    
+    def health_stats(self) -> Dict[str, Any]:
+        """Watchdog counters plus degraded step count"""
+        stats = self.watchdog.stats() if self.watchdog else {}
+        stats['degraded_steps'] = self.degraded_steps
+        return stats
+    
+    def _record(self, ok: bool):
+        if self.watchdog:
+            if ok:
+                self.watchdog.record_success()
+            else:
+                self.watchdog.record_failure()
+    
     def reset(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
         Reset the environment
@@ -115,7 +232,7 @@ class MineflayerEnv:
         """
         try:
             response = requests.post(
-                f"{self.bridge_url}/reset",
+                f"{self.bot_url}/reset",
                 json={},
                 timeout=10
             )
@@ -138,12 +255,21 @@ class MineflayerEnv:
         Compatible with Gymnasium API
         """
         try:
-            response = requests.post(
-                f"{self.bridge_url}/action",
-                json=action,
-                timeout=5
-            )
+            if self.binary_actions and action.get('type') == 'compound':
+                response = requests.post(
+                    f"{self.bot_url}/action/binary",
+                    data=ActionMapper.pack_compound([action]),
+                    headers={'Content-Type': 'application/octet-stream'},
+                    timeout=5
+                )
+            else:
+                response = requests.post(
+                    f"{self.bot_url}/action",
+                    json=action,
+                    timeout=5
+                )
             data = response.json()
+            self._record(True)
             
             obs_dict = self._process_observation(data.get('observation', {}))
             reward = 0.0  # TODO: Implement reward logic
@@ -154,8 +280,11 @@ class MineflayerEnv:
             return obs_dict, reward, terminated, truncated, info
             
         except Exception as e:
-            print(f"[MineflayerEnv] Step error: {e}")
-            return self._empty_observation(), 0.0, False, False, {}
+            self._record(False)
+            self.degraded_steps += 1
+            if self.degraded_steps == 1 or self.degraded_steps % 100 == 0:
+                print(f"[MineflayerEnv] Step error: {e} (degraded steps: {self.degraded_steps})")
+            return self._empty_observation(), 0.0, False, False, {'degraded': True}
     
     def _process_observation(self, raw_obs: Dict) -> Dict[str, Any]:
         """
@@ -196,35 +325,95 @@ class MineflayerEnv:
         return {'type': 'noop'}
     
     def get_pov_image(self):
-        """Get POV image from bot (640x360 PIL Image)"""
+        """
+        Get POV image from bot (640x360 PIL Image, or frame_size when set)
+        
+        Sets last_frame_changed to False when the bridge reports nothing in
+        view changed since the previous call (the previous image is returned).
+        With views configured, last_views holds the overview/crops of the same
+        frame; with 'nofull' the overview is returned as the POV.
+        """
         try:
-            response = requests.post(f"{self.bridge_url}/screenshot", timeout=5)
+            body = {'since': self.last_frame_id} if self._last_frame is not None else {}
+            if self.views:
+                body['views'] = views_request(self.views)
+            if self.frame_quality:
+                body['quality'] = self.frame_quality
+            if self.frame_size:
+                body['width'], body['height'] = self.frame_size
+            response = requests.post(f"{self.bot_url}/screenshot", json=body, timeout=5)
             data = response.json()
             
+            self._record(True)
+            
             if data.get('success'):
-                import base64
-                from PIL import Image
-                import io
+                self.last_frame_changed = data.get('changed', True)
+                self.last_frame_id = data.get('frameId')
+                self.last_frame_degraded = False
+                if not data.get('image') and not data.get('views'):
+                    if self._last_frame is not None:
+                        return self._last_frame
+                    return Image.new('RGB', (640, 360), color='black')
                 
-                image_data = base64.b64decode(data['image'])
-                image = Image.open(io.BytesIO(image_data))
-                
-                if image.size != (640, 360):
-                    image = image.resize((640, 360))
+                self.last_views = {name: self._decode_image(encoded)
+                                   for name, encoded in (data.get('views') or {}).items()}
+                if data.get('image'):
+                    image = self._decode_image(data['image'])
+                    if image.size != (self.frame_size or (640, 360)):
+                        image = image.resize(self.frame_size or (640, 360))
+                else:
+                    image = self.last_views['overview']
                 
+                self._last_frame = image
                 return image
             else:
-                from PIL import Image
+                self._forget_frame()
+                self.last_frame_degraded = True
                 return Image.new('RGB', (640, 360), color='black')
         except Exception as e:
-            print(f"[MineflayerEnv] Screenshot error: {e}")
-            from PIL import Image
+            self._record(False)
+            self._forget_frame()
+            self.last_frame_degraded = True
+            if self.healthy:
+                print(f"[MineflayerEnv] Screenshot error: {e}")
             return Image.new('RGB', (640, 360), color='black')
 
+    def set_frame_format(self, quality: Optional[int] = None, size: Optional[Tuple[int, int]] = None):
+        """
+        Change the JPEG quality and/or size of the frames requested from the bridge
+        
+        Args:
+            quality: JPEG quality 1-100
+            size: (width, height) of the full-size image
+        """
+        if quality is not None:
+            self.frame_quality = int(quality)
+        if size is not None:
+            self.frame_size = (int(size[0]), int(size[1]))
+        # The cached frame has the old format - fetch a fresh one
+        self._forget_frame()
+
+    @staticmethod
+    def _decode_image(encoded: str) -> Image.Image:
+        return Image.open(io.BytesIO(base64.b64decode(encoded)))
+
+    def _forget_frame(self):
+        self.last_frame_id = None
+        self.last_frame_changed = True
+        self._last_frame = None
+        self.last_views = {}
+
     def get_chat_instructions(self):
-        """Get pending chat instructions"""
+        """
+        Poll the bridge's instruction scheduler (polling also keeps this bot
+        available for new assignments)
+
+        Returns:
+            {'pending': world queue in dispatch order, 'current': this bot's
+            assignment or None}, or None if the bridge is unreachable
+        """
         try:
-            response = requests.post(f"{self.bridge_url}/chat/instructions", timeout=2)
+            response = requests.post(f"{self.bot_url}/chat/instructions", timeout=2)
             data = response.json()
             return {
                 'pending': data.get('instructions', []),
@@ -235,9 +424,9 @@ class MineflayerEnv:
             return None
 
     def start_chat_instruction(self):
-        """Mark next instruction as being processed"""
+        """This bot's current assignment (the scheduler assigns on poll)"""
         try:
-            response = requests.post(f"{self.bridge_url}/chat/start_instruction", timeout=2)
+            response = requests.post(f"{self.bot_url}/chat/start_instruction", timeout=2)
             data = response.json()
             return data.get('instruction') if data.get('success') else None
         except Exception as e:
@@ -245,38 +434,153 @@ class MineflayerEnv:
             return None
 
     def clear_chat_instruction(self):
-        """Clear current instruction"""
+        """Finish the current instruction; the bridge assigns the next queued one"""
         try:
-            response = requests.post(f"{self.bridge_url}/chat/clear_instruction", timeout=2)
+            response = requests.post(f"{self.bot_url}/chat/clear_instruction", timeout=2)
             return response.json().get('success', False)
         except:
             return False
 
     def close(self):
         """Clean up resources"""
+        if getattr(self, 'watchdog', None):
+            self.watchdog.stop()
+        remaining = 0
         try:
-            requests.post(f"{self.bridge_url}/close", timeout=2)
+            response = requests.post(f"{self.bot_url}/close", timeout=2)
+            remaining = response.json().get('remaining', 0)
         except:
             pass
         
-        if self.bridge_process:
+        # Other envs' bots still live in the bridge we spawned - leave it running
+        if self.bridge_process and remaining:
+            print(f"[MineflayerEnv] Leaving bridge running for {remaining} other bot(s)")
+        elif self.bridge_process:
             self.bridge_process.terminate()
             try:
                 self.bridge_process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 self.bridge_process.kill()
             print("[MineflayerEnv] Bridge server stopped")
+        self.bridge_process = None
     
     def __del__(self):
         self.close()
 
 
+# VPT button order (Buttons.ALL); bit i of a packed action is BUTTON_NAMES[i]
+BUTTON_NAMES = [
+    'attack', 'back', 'forward', 'jump', 'left', 'right', 'sneak', 'sprint', 'use',
+    'drop', 'inventory',
+    'hotbar.1', 'hotbar.2', 'hotbar.3', 'hotbar.4', 'hotbar.5',
+    'hotbar.6', 'hotbar.7', 'hotbar.8', 'hotbar.9',
+]
+BUTTON_INDEX = {name: i for i, name in enumerate(BUTTON_NAMES)}
+
+# Wire format of /action/binary: one 8-byte record per action, camera in
+# hundredths of a degree
+ACTION_WIRE_DTYPE = np.dtype([('buttons', '<u4'), ('pitch', '<i2'), ('yaw', '<i2')])
+CAMERA_SCALE = 100
+
+
+def round_camera(camera) -> np.ndarray:
+    """
+    Camera deltas to whole degrees, rounded to nearest (ties to even). Every
+    action path (JSON, batched, binary) uses this, so a VPT action turns the
+    camera by the same amount whichever way it reaches the bridge.
+    """
+    return np.rint(np.asarray(camera, dtype=np.float64)).astype(np.int64)
+
+
 class ActionMapper:
     """
     Maps VPT-style actions from JarvisVLA to Mineflayer API calls
     VPT actions come from action_tokenizer.decode() in agent_wrapper.py
     """
     
+    @staticmethod
+    def stack(vpt_actions: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Stack VPT actions into (N, len(BUTTON_NAMES)) button and (N, 2) camera arrays
+        
+        Buttons may be arrays in BUTTON_NAMES order, dicts or Buttons objects.
+        """
+        n = len(vpt_actions)
+        buttons = np.zeros((n, len(BUTTON_NAMES)), dtype=np.uint8)
+        camera = np.zeros((n, 2), dtype=np.float32)
+        for i, action in enumerate(vpt_actions):
+            cam = np.asarray(action.get('camera', (0, 0)), dtype=np.float32).reshape(-1)
+            camera[i, :min(2, cam.size)] = cam[:2]
+            
+            pressed = action.get('buttons', {})
+            if hasattr(pressed, '__dict__') and not isinstance(pressed, np.ndarray):
+                pressed = pressed.__dict__
+            if isinstance(pressed, dict):
+                for key, val in pressed.items():
+                    idx = BUTTON_INDEX.get(key)
+                    if idx is not None:
+                        buttons[i, idx] = 1 if np.any(val) else 0
+            else:
+                arr = np.asarray(pressed).reshape(-1)[:len(BUTTON_NAMES)]
+                buttons[i, :arr.size] = arr != 0
+        return buttons, camera
+    
+    @staticmethod
+    def batch_jarvis_to_mineflayer(buttons: np.ndarray, camera: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Convert N stacked VPT actions to Mineflayer compound actions in one pass
+        
+        Args:
+            buttons: (N, len(BUTTON_NAMES)) array, nonzero = pressed
+            camera: (N, 2) array of [pitch_delta, yaw_delta] in degrees
+            
+        Returns:
+            List of {'type': 'compound', 'camera': [pitch, yaw], 'buttons': {name: 1}}
+            with only pressed buttons listed (the bridge releases the rest)
+        """
+        cameras = round_camera(camera).reshape(-1, 2).tolist()
+        rows, cols = np.nonzero(np.asarray(buttons).reshape(len(cameras), -1))
+        pressed = [{} for _ in cameras]
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            pressed[row][BUTTON_NAMES[col]] = 1
+        return [
+            {'type': 'compound', 'camera': cam, 'buttons': btn}
+            for cam, btn in zip(cameras, pressed)
+        ]
+    
+    @staticmethod
+    def encode_binary(buttons: np.ndarray, camera: np.ndarray) -> bytes:
+        """
+        Pack N actions into ACTION_WIRE_DTYPE records for /action/binary
+        
+        Args:
+            buttons: (N, len(BUTTON_NAMES)) array, nonzero = pressed
+            camera: (N, 2) array of [pitch_delta, yaw_delta] in degrees
+        """
+        buttons = np.asarray(buttons).reshape(-1, len(BUTTON_NAMES)) != 0
+        camera = np.asarray(camera, dtype=np.float64).reshape(-1, 2)
+        bits = np.left_shift(np.uint32(1), np.arange(len(BUTTON_NAMES), dtype=np.uint32))
+        records = np.empty(len(buttons), dtype=ACTION_WIRE_DTYPE)
+        records['buttons'] = (buttons * bits).sum(axis=1, dtype=np.uint32)
+        scaled = np.clip(round_camera(camera) * CAMERA_SCALE, -32768, 32767).astype(np.int16)
+        records['pitch'] = scaled[:, 0]
+        records['yaw'] = scaled[:, 1]
+        return records.tobytes()
+    
+    @staticmethod
+    def decode_binary(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        """Inverse of encode_binary: (buttons uint8 (N, 20), camera float32 (N, 2))"""
+        records = np.frombuffer(data, dtype=ACTION_WIRE_DTYPE)
+        bits = np.arange(len(BUTTON_NAMES), dtype=np.uint32)
+        buttons = ((records['buttons'][:, None] >> bits) & 1).astype(np.uint8)
+        camera = np.stack([records['pitch'], records['yaw']], axis=1).astype(np.float32) / CAMERA_SCALE
+        return buttons, camera
+    
+    @staticmethod
+    def pack_compound(actions: Sequence[Dict[str, Any]]) -> bytes:
+        """Binary-encode Mineflayer compound actions (as produced by the mappers)"""
+        return ActionMapper.encode_binary(*ActionMapper.stack(actions))
+    
     @staticmethod
     def jarvis_to_mineflayer(vpt_action: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -299,13 +603,11 @@ class ActionMapper:
         buttons = vpt_action.get('buttons', {})
         
         # Convert camera to Python list
-        if isinstance(camera, np.ndarray):
-            camera = [int(x) for x in camera.tolist()]
-        elif isinstance(camera, (int, np.integer)):
+        if isinstance(camera, (np.ndarray, list, tuple)):
+            camera = round_camera(camera).reshape(-1).tolist()
+        elif isinstance(camera, (int, float, np.integer, np.floating)):
             # Single value - split into [pitch, yaw]
-            camera = [int(camera), 0]
-        elif isinstance(camera, list):
-            camera = [int(x) for x in camera]
+            camera = [int(round_camera(camera)), 0]
         
         # Convert Buttons object to dict and handle numpy types
         if hasattr(buttons, '__dict__'):
@@ -0,0 +1,97 @@
+"""
+Multi-resolution observations
+A low-resolution overview of the whole frame plus full-resolution crops of
+the regions that need detail (crosshair, inventory/crafting GUI, hotbar).
+Used by MineflayerEnv (the bridge cuts the views from its render canvas)
+and MineRLEnv (cut from the simulator's POV array), so both expose the same
+obs['views'].
+
+Spec strings (--views on the servers):
+
+  overview=0.5,crosshair,gui     half-size overview + two crops, full pov kept
+  overview=0.25,crosshair,nofull pov becomes the overview (smaller model input)
+"""
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+# Regions as fractions of the frame (left, top, right, bottom); at 640x360
+# these are the 128x128 crosshair area, the 352x332 GUI window (GUI scale 2)
+# and the hotbar with the health/food bars above it
+VIEW_REGIONS = {
+    'crosshair': (0.4, 0.32222, 0.6, 0.67778),
+    'gui': (0.225, 0.03889, 0.775, 0.96111),
+    'hotbar': (0.2, 0.8, 0.8, 1.0),
+}
+
+
+def parse_view_spec(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse a --views string
+
+    Returns:
+        {'overview': scale or None, 'crops': [region names], 'full': bool},
+        or None for an empty spec
+    """
+    if not text:
+        return None
+    spec = {'overview': None, 'crops': [], 'full': True}
+    for token in text.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        if token.startswith('overview'):
+            _, _, scale = token.partition('=')
+            spec['overview'] = float(scale) if scale else 0.5
+            if not 0 < spec['overview'] <= 1:
+                raise ValueError(f"Overview scale must be in (0, 1], got {spec['overview']}")
+        elif token == 'nofull':
+            spec['full'] = False
+        elif token in VIEW_REGIONS:
+            spec['crops'].append(token)
+        else:
+            raise ValueError(f"Unknown view '{token}' (expected overview[=scale], nofull or one of {sorted(VIEW_REGIONS)})")
+    if not spec['full'] and not spec['overview']:
+        raise ValueError("'nofull' needs an overview to use as the pov")
+    return spec
+
+
+def region_box(name: str, width: int, height: int):
+    """Pixel box (left, top, right, bottom) of a named region"""
+    left, top, right, bottom = VIEW_REGIONS[name]
+    return (round(left * width), round(top * height), round(right * width), round(bottom * height))
+
+
+def views_request(spec: Dict[str, Any], width: int = 640, height: int = 360) -> Dict[str, Any]:
+    """/screenshot 'views' payload for the Mineflayer bridge (pixel boxes)"""
+    return {
+        'overview': spec.get('overview'),
+        'crops': {name: list(region_box(name, width, height)) for name in spec.get('crops', [])},
+        'full': spec.get('full', True),
+    }
+
+
+def make_views(frame, spec: Dict[str, Any]) -> Dict[str, Image.Image]:
+    """
+    Cut the views of `spec` out of one frame
+
+    Args:
+        frame: (H, W, 3) uint8 array or PIL image
+        spec: Parsed view spec (see parse_view_spec)
+    Returns:
+        {'overview': Image, '<region>': Image, ...}
+    """
+    array = np.asarray(frame)
+    height, width = array.shape[:2]
+    views = {}
+    if spec.get('overview'):
+        image = frame if isinstance(frame, Image.Image) else Image.fromarray(array)
+        size = (max(1, round(width * spec['overview'])), max(1, round(height * spec['overview'])))
+        # BOX averages every source pixel once, like an area downsample
+        views['overview'] = image.resize(size, Image.BOX)
+    for name in spec.get('crops', []):
+        left, top, right, bottom = region_box(name, width, height)
+        views[name] = Image.fromarray(np.ascontiguousarray(array[top:bottom, left:right]))
+    return views
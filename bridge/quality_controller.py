@@ -0,0 +1,220 @@
+"""
+Adaptive Quality Controller
+Holds the agent loop to a latency SLO by trading observation quality and
+request size for speed at runtime, instead of hand-tuning flags per
+deployment.
+
+The controller keeps a rolling window of step latencies (capture ->
+inference -> action, excluding the loop's own pacing sleep). When the p95
+is above the SLO (by more than the hysteresis margin) it moves one knob a
+step towards its cheap bound; when the p95 is comfortably below the SLO it
+moves the most recently degraded knob back towards its configured value.
+After every change it waits for `cooldown` seconds and a fresh window of
+samples before deciding again. Every change is logged.
+
+Knobs are degraded in KNOB_ORDER (the ones whose loss hurts least first:
+JPEG quality, capture scale, history frames, then longer action chunks) and
+restored in reverse. fps is deliberately not a knob: the measured latency
+excludes the pacing sleep, so a lower fps could never bring the p95 down.
+Bounds spec (--quality-bounds on the servers), each value being the cheapest
+setting allowed:
+
+  jpeg_quality=50,scale=0.5,history=0,chunk_len=4
+
+chunk_len has no default bound: longer action chunks change how the agent
+acts, not just what it sees, so the knob only exists when a bound is given.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_BOUNDS = {
+    'jpeg_quality': 50,
+    'scale': 0.5,
+    'history': 0,
+}
+
+# Step sizes towards the cheap bound
+KNOB_STEPS = {
+    'jpeg_quality': 15,
+    'scale': 0.25,
+    'history': 1,
+    'chunk_len': 1,
+}
+
+# Knobs where a larger value is cheaper (fewer requests per action)
+HIGHER_IS_CHEAPER = {'chunk_len'}
+
+KNOB_ORDER = ['jpeg_quality', 'scale', 'history', 'chunk_len']
+
+
+def parse_bounds(text: Optional[str]) -> Dict[str, float]:
+    """Parse a --quality-bounds string into {knob: cheapest value} (DEFAULT_BOUNDS filled in)"""
+    bounds = dict(DEFAULT_BOUNDS)
+    for token in (text or '').split(','):
+        token = token.strip()
+        if not token:
+            continue
+        name, _, value = token.partition('=')
+        if name not in KNOB_STEPS or not value:
+            raise ValueError(f"Bad quality bound '{token}' (expected one of {sorted(KNOB_STEPS)}=value)")
+        bounds[name] = float(value) if name == 'scale' else int(value)
+    return bounds
+
+
+class Knob:
+    """
+    One runtime setting. `value` starts at the configured (best) setting and
+    moves by `step` towards `cheapest`, which may be above it (chunk_len) or
+    below it (jpeg_quality, scale, history).
+    """
+
+    def __init__(self, name: str, value, cheapest, step, apply: Callable[[Any], None]):
+        self.name = name
+        self.best = value
+        self.value = value
+        self.cheapest = cheapest
+        self.step = abs(step)
+        self.apply = apply
+
+    @property
+    def degraded(self) -> bool:
+        return self.value != self.best
+
+    def _move(self, towards) -> bool:
+        if self.value == towards:
+            return False
+        delta = self.step if towards > self.value else -self.step
+        value = self.value + delta
+        # Clamp to the target (never step past the bound or the configured value)
+        if (delta > 0 and value > towards) or (delta < 0 and value < towards):
+            value = towards
+        if isinstance(self.step, float):
+            value = round(value, 3)
+        self.value = value
+        self.apply(value)
+        return True
+
+    def degrade(self) -> bool:
+        return self._move(self.cheapest)
+
+    def restore(self) -> bool:
+        return self._move(self.best)
+
+
+def build_knobs(bounds: Dict[str, float], current: Dict[str, Any],
+                appliers: Dict[str, Callable[[Any], None]]) -> List[Knob]:
+    """
+    Knobs (in KNOB_ORDER) for the settings a server can change at runtime
+
+    Args:
+        bounds: {knob: cheapest value} (see parse_bounds)
+        current: {knob: configured value}
+        appliers: {knob: callback applying a new value}; knobs without one, or
+            without a bound, are skipped
+    """
+    knobs = []
+    for name in KNOB_ORDER:
+        if name not in appliers or current.get(name) is None or bounds.get(name) is None:
+            continue
+        value = current[name]
+        # A bound on the wrong side of the configured value just pins the knob
+        if name in HIGHER_IS_CHEAPER:
+            cheapest = max(bounds[name], value)
+        else:
+            cheapest = min(bounds[name], value)
+        knobs.append(Knob(name, value, cheapest, KNOB_STEPS[name], appliers[name]))
+    return knobs
+
+
+class QualityController:
+    """Rolling-p95 feedback loop over a list of knobs"""
+
+    def __init__(
+        self,
+        slo_ms: float,
+        knobs: List[Knob],
+        window: int = 50,
+        hysteresis: float = 0.2,
+        cooldown: float = 5.0,
+        log: Callable[[str], None] = print,
+    ):
+        """
+        Args:
+            slo_ms: Target p95 step latency in milliseconds
+            knobs: Knobs in degradation order
+            window: Step latencies per decision (the rolling p95 window)
+            hysteresis: Degrade above slo*(1+h), restore below slo*(1-h)
+            cooldown: Minimum seconds between two changes
+            log: Where change messages go (print or a logger method)
+        """
+        # Knobs whose bound equals their configured value can never move
+        self.knobs = [knob for knob in knobs if knob.best != knob.cheapest]
+        self.slo_ms = slo_ms
+        self.window = window
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.log = log
+        self.samples: List[float] = []
+        self.changes: List[Dict[str, Any]] = []
+        self._last_change = 0.0
+        self._last_p95 = None
+
+    def p95_ms(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+
+    def record(self, latency_s: float) -> Optional[Dict[str, Any]]:
+        """
+        Add one step latency and adjust a knob if needed
+
+        Returns:
+            The change made ({'knob', 'old', 'new', 'p95_ms', ...}) or None
+        """
+        self.samples.append(latency_s)
+        if len(self.samples) > self.window:
+            del self.samples[0]
+        now = time.monotonic()
+        if len(self.samples) < self.window or now - self._last_change < self.cooldown:
+            return None
+
+        p95 = self._last_p95 = self.p95_ms()
+        if p95 > self.slo_ms * (1 + self.hysteresis):
+            knob = next((k for k in self.knobs if k.value != k.cheapest), None)
+            direction = 'degrade'
+        elif p95 < self.slo_ms * (1 - self.hysteresis):
+            knob = next((k for k in reversed(self.knobs) if k.degraded), None)
+            direction = 'restore'
+        else:
+            return None
+        if knob is None:
+            return None
+
+        old = knob.value
+        moved = knob.degrade() if direction == 'degrade' else knob.restore()
+        if not moved:
+            return None
+        change = {'time': time.time(), 'knob': knob.name, 'old': old, 'new': knob.value,
+                  'direction': direction, 'p95_ms': round(p95, 1), 'slo_ms': self.slo_ms}
+        self.changes.append(change)
+        self.log(f"[Quality] p95 {p95:.0f}ms vs SLO {self.slo_ms:.0f}ms: {direction} "
+                 f"{knob.name} {old} -> {knob.value}")
+        # Judge the new setting on its own samples
+        self.samples.clear()
+        self._last_change = now
+        return change
+
+    def settings(self) -> Dict[str, Any]:
+        return {knob.name: knob.value for knob in self.knobs}
+
+    def stats(self) -> Dict[str, Any]:
+        # Samples are cleared after a change; report the p95 that triggered it until new ones fill up
+        p95 = self.p95_ms() if len(self.samples) >= self.window else self._last_p95
+        return {
+            'slo_ms': self.slo_ms,
+            'p95_ms': round(p95, 1) if p95 is not None else None,
+            'settings': self.settings(),
+            'changes': len(self.changes),
+        }
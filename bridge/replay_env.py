@@ -0,0 +1,366 @@
+"""
+Replay Environment
+Deterministic, in-process stand-in for MineflayerEnv and MineRLEnv that
+serves frames and states from a recorded session as fast as they are asked
+for, optionally with injected latency. Lets the full server stacks
+(server_mineflayer.py, minerl_server/server_minerl.py) be profiled and
+regression-tested in seconds without Node, Java, MineStudio or a live bridge.
+
+Recordings are agent sessions (session_*.jsonl written by MinecraftAIServer,
+whose entries point at the saved step JPEGs), directories of JPEGs, or
+synthetic solid-colour frames. Instruction changes in a session log are
+replayed as chat instruction assignments.
+
+Latency specs (milliseconds):
+  const:50            always 50ms
+  uniform:20,80       uniform between 20 and 80ms
+  normal:60,15        normal(mean, std), clipped at 0
+  lognormal:4.0,0.5   exp(normal(mu, sigma))
+  exp:60              exponential with the given mean
+
+  python bridge/server_mineflayer.py --replay-session agent_logs/session_X.jsonl \\
+      --policy random --fps 1000 --replay-step-latency normal:5,1
+"""
+
+import io
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from observation_views import make_views, parse_view_spec
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Turn a latency spec into a sampler returning seconds"""
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(',') if v]
+
+    if kind == 'const':
+        sample = lambda: values[0]
+    elif kind == 'uniform':
+        sample = lambda: random.uniform(values[0], values[1])
+    elif kind == 'normal':
+        sample = lambda: max(0.0, random.gauss(values[0], values[1]))
+    elif kind == 'lognormal':
+        sample = lambda: random.lognormvariate(values[0], values[1])
+    elif kind == 'exp':
+        sample = lambda: random.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    else:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    return lambda: sample() / 1000.0
+
+
+class SessionRecording:
+    """
+    Frames and states from a recorded agent session, looped forever
+    """
+
+    def __init__(self, frames: List[bytes], states: Optional[List[Dict[str, Any]]] = None):
+        if not frames:
+            raise ValueError("Recording has no frames")
+        self.frames = frames
+        self.states = states or [{} for _ in frames]
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def load(cls, path, limit: Optional[int] = None) -> 'SessionRecording':
+        """
+        Load a recording from a session JSONL file or a directory of JPEGs
+
+        Args:
+            path: session_*.jsonl file, or directory containing *.jpg files
+            limit: Maximum number of frames to load
+        """
+        path = Path(path)
+        frames, states = [], []
+
+        if path.is_dir():
+            for jpg in sorted(path.glob('*.jpg'))[:limit]:
+                frames.append(jpg.read_bytes())
+                states.append({})
+        else:
+            with open(path) as f:
+                for line in f:
+                    if limit and len(frames) >= limit:
+                        break
+                    entry = json.loads(line)
+                    pov = Path(entry.get('pov_saved') or '')
+                    if not pov.is_file():
+                        # Logs may have been moved - look next to the session file
+                        pov = path.parent / pov.name
+                    if not pov.is_file():
+                        continue
+                    frames.append(pov.read_bytes())
+                    states.append(entry)
+
+        return cls(frames, states)
+
+    @classmethod
+    def synthetic(cls, count: int = 1, size=(640, 360)) -> 'SessionRecording':
+        """Solid-colour frames for when no recording is available"""
+        frames = []
+        for i in range(count):
+            buffer = io.BytesIO()
+            shade = 40 + (i * 37) % 180
+            Image.new('RGB', size, color=(shade, 120, 200)).save(buffer, 'JPEG', quality=90)
+            frames.append(buffer.getvalue())
+        return cls(frames)
+
+    def frame(self, index: int) -> bytes:
+        return self.frames[index % len(self.frames)]
+
+    def state(self, index: int) -> Dict[str, Any]:
+        return self.states[index % len(self.states)]
+
+    def observation(self, index: int) -> Dict[str, Any]:
+        """Bridge-format observation for a step"""
+        state = self.state(index)
+        return {
+            'position': state.get('position') or {'x': 0.0, 'y': 64.0, 'z': 0.0},
+            'yaw': 0.0,
+            'pitch': 0.0,
+            'health': state.get('health', 20),
+            'food': 20,
+            'inventory': [],
+            'entities': [],
+            'time': 0,
+            'gameMode': 'survival',
+        }
+
+
+class ReplayEnv:
+    """
+    Recorded-session environment with the MineflayerEnv or MineRLEnv interface
+
+    obs_format='mineflayer' mirrors MineflayerEnv: the POV comes from
+    get_pov_image() (with last_frame_changed / last_views), chat instructions
+    are polled, and health/watchdog attributes are always healthy.
+    obs_format='minerl' mirrors MineRLEnv: every observation carries the POV
+    and the MineRL-style position/rotation/inventory keys.
+    """
+
+    def __init__(
+        self,
+        recording=None,
+        obs_format: str = 'mineflayer',
+        step_latency: Optional[str] = None,
+        frame_latency: Optional[str] = None,
+        reset_latency: Optional[str] = None,
+        episode_length: Optional[int] = None,
+        views=None,
+        obs_size=(360, 640),
+        frame_limit: Optional[int] = None,
+        cache_frames: int = 256,
+    ):
+        """
+        Args:
+            recording: SessionRecording, path to a session_*.jsonl or JPEG
+                directory, or None / 'synthetic' for synthetic frames
+            obs_format: 'mineflayer' or 'minerl'
+            step_latency: Latency spec added to every step() (e.g. 'normal:5,1')
+            frame_latency: Latency spec added to every get_pov_image()
+            reset_latency: Latency spec added to every reset()
+            episode_length: Steps until an episode is truncated (None = never)
+            views: Multi-resolution view spec (string or parsed dict)
+            obs_size: (height, width) frames are resized to if they differ
+            frame_limit: Maximum number of recorded frames to load
+            cache_frames: Keep decoded frames of recordings up to this length
+                (0 = decode every time)
+        """
+        if obs_format not in ('mineflayer', 'minerl'):
+            raise ValueError(f"Unknown obs_format '{obs_format}' (expected 'mineflayer' or 'minerl')")
+        if recording is None or recording == 'synthetic':
+            recording = SessionRecording.synthetic(count=8)
+        elif not isinstance(recording, SessionRecording):
+            recording = SessionRecording.load(recording, limit=frame_limit)
+        self.recording = recording
+        self.obs_format = obs_format
+        self.obs_size = obs_size
+        self.episode_length = episode_length
+        self.views = parse_view_spec(views) if isinstance(views, str) else views
+        self._step_latency = parse_latency(step_latency) if step_latency else None
+        self._frame_latency = parse_latency(frame_latency) if frame_latency else None
+        self._reset_latency = parse_latency(reset_latency) if reset_latency else None
+        self._decoded = {} if len(recording) <= cache_frames else None
+        self._blank_pov = np.zeros((*obs_size, 3), dtype=np.uint8)
+
+        # MineflayerEnv attributes read by MinecraftAIServer
+        self.action_type = 'env'
+        self.healthy = True
+        self.degraded_steps = 0
+        self.last_frame_degraded = False
+        self.last_frame_id = None
+        self.last_frame_changed = True
+        self.last_views = {}
+
+        self.index = 0
+        self.episode_steps = 0
+        self.steps = 0
+        self.frames_served = 0
+        self.commands: List[str] = []
+        self._last_frame_index = None
+        self._current_chat = None
+        self._chat_id = 0
+        self._instruction = None
+
+    def _wait(self, sampler):
+        if sampler:
+            delay = sampler()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _image(self, index: int) -> Image.Image:
+        """Decoded frame (cached for short recordings)"""
+        key = index % len(self.recording)
+        if self._decoded is not None and key in self._decoded:
+            return self._decoded[key]
+        image = Image.open(io.BytesIO(self.recording.frame(key))).convert('RGB')
+        height, width = self.obs_size
+        if image.size != (width, height):
+            image = image.resize((width, height))
+        if self._decoded is not None:
+            self._decoded[key] = image
+        return image
+
+    def _pov(self, index: int) -> Tuple[Image.Image, Dict[str, Image.Image]]:
+        """POV and views of a frame, as the real envs would return them"""
+        image = self._image(index)
+        if not self.views:
+            return image, {}
+        views = make_views(image, self.views)
+        return (image if self.views['full'] else views['overview']), views
+
+    def _queue_instruction(self, index: int):
+        """Replay instruction changes of the session log as scheduler assignments"""
+        instruction = self.recording.state(index).get('instruction')
+        if instruction and instruction != self._instruction:
+            self._instruction = instruction
+            self._chat_id += 1
+            self._current_chat = {'id': self._chat_id, 'username': 'replay', 'message': instruction, 'priority': 0}
+
+    def _observation(self) -> Dict[str, Any]:
+        raw = self.recording.observation(self.index)
+        if self.obs_format == 'mineflayer':
+            return {
+                'pov': self._blank_pov,
+                'inventory': raw['inventory'],
+                'position': raw['position'],
+                'yaw': raw['yaw'],
+                'pitch': raw['pitch'],
+                'health': raw['health'],
+                'food': raw['food'],
+                'entities': raw['entities'],
+            }
+        pov, views = self._pov(self.index)
+        obs = {
+            'pov': pov,
+            'inventory': {},
+            'equipped_items': {},
+            'position': raw['position'],
+            'rotation': {'pitch': raw['pitch'], 'yaw': raw['yaw']},
+            'health': raw['health'],
+            'food': raw['food'],
+        }
+        if self.views:
+            obs['views'] = views
+        return obs
+
+    def reset(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Reset to the start of the recording
+        Returns: (observation, info)
+        """
+        self._wait(self._reset_latency)
+        self.index = 0
+        self.episode_steps = 0
+        self._last_frame_index = None
+        self._queue_instruction(0)
+        return self._observation(), self.recording.observation(0)
+
+    def step(self, action: Dict[str, Any]) -> Tuple[Dict[str, Any], float, bool, bool, Dict[str, Any]]:
+        """
+        Advance one recorded frame (the action is accepted and ignored)
+        Returns: (obs, reward, terminated, truncated, info)
+        """
+        self._wait(self._step_latency)
+        self.index += 1
+        self.steps += 1
+        self.episode_steps += 1
+        self._queue_instruction(self.index)
+        truncated = bool(self.episode_length and self.episode_steps >= self.episode_length)
+        return self._observation(), 0.0, False, truncated, self.recording.observation(self.index)
+
+    def get_pov_image(self) -> Image.Image:
+        """
+        Current recorded frame as a PIL image
+
+        Like the bridge, frames identical to the previous one (same recorded
+        JPEG) are reported with last_frame_changed = False.
+        """
+        self._wait(self._frame_latency)
+        key = self.index % len(self.recording)
+        previous = self._last_frame_index
+        self.last_frame_changed = (previous is None or
+                                   self.recording.frame(previous) != self.recording.frame(key))
+        if self.last_frame_changed:
+            self.last_frame_id = (self.last_frame_id or 0) + 1
+        self._last_frame_index = key
+        self.frames_served += 1
+        image, self.last_views = self._pov(key)
+        return image
+
+    def set_frame_format(self, quality: Optional[int] = None, size: Optional[Tuple[int, int]] = None):
+        """
+        Resize served frames to `size` (width, height); quality is accepted and
+        ignored (recorded frames are already encoded)
+        """
+        if size is not None and (size[1], size[0]) != self.obs_size:
+            self.obs_size = (int(size[1]), int(size[0]))
+            self._decoded = {} if self._decoded is not None else None
+            self._blank_pov = np.zeros((*self.obs_size, 3), dtype=np.uint8)
+        self._last_frame_index = None
+
+    def noop_action(self) -> Dict[str, Any]:
+        """Return a no-op action"""
+        return {'type': 'noop'}
+
+    def health_stats(self) -> Dict[str, Any]:
+        """Replay counters (in place of the watchdog counters)"""
+        return {'degraded_steps': self.degraded_steps, 'steps': self.steps, 'frames_served': self.frames_served}
+
+    def get_chat_instructions(self):
+        """Instruction changes from the session log, as the current assignment"""
+        return {'pending': [], 'current': self._current_chat}
+
+    def start_chat_instruction(self):
+        """Current assignment (kept for older callers)"""
+        return self._current_chat
+
+    def clear_chat_instruction(self):
+        """Finish the current instruction"""
+        self._current_chat = None
+        return True
+
+    def send_command(self, command: str):
+        """Record a Minecraft command (MineRLEnv interface)"""
+        self.commands.append(command)
+
+    def close(self):
+        """Nothing to release"""
+        self._decoded = {} if self._decoded is not None else None
+
+    @property
+    def action_space(self):
+        return None
+
+    @property
+    def observation_space(self):
+        return None
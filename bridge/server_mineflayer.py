@@ -13,8 +13,11 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-from mineflayer_env import MineflayerEnv
+from mineflayer_env import DEFAULT_FRAME_QUALITY, MineflayerEnv
+from replay_env import ReplayEnv
 from vllm_agent_adapter import VLLMAgentAdapter
+from local_policies import LocalPolicy, make_policy
+from quality_controller import QualityController, build_knobs, parse_bounds
 
 
 class MinecraftAIServer:
@@ -28,6 +31,17 @@ class MinecraftAIServer:
         mc_server_host='localhost',
         mc_server_port=25565,
         bot_username='JarvisAI',
+        bridge_port=1111,
+        auto_start_bridge=True,
+        spawn_wait=12.0,
+        binary_actions=False,
+        camera_smoothing=True,
+        hold_timeout=1.0,
+        bot_id=None,
+        views=None,
+        replay_session=None,
+        replay_step_latency=None,
+        replay_frame_latency=None,
         
         # VLLM config
         vllm_base_url=None,
@@ -37,13 +51,28 @@ class MinecraftAIServer:
         instruction="Explore and survive in Minecraft",
         temperature=0.7,
         history_num=0,
+        cached_history=False,
         instruction_type='normal',
         action_chunk_len=1,
+        max_tokens_per_action=32,
+        action_end_token=None,
+        request_timeout=10.0,
+        degraded_policy='noop',
+        routing='sticky',
+        reuse_unchanged=0,
+        policy=None,
+        policy_log=None,
+        seed=None,
         
         # Loop config
         max_steps=None,
         step_delay=0.05,  # 20 fps
-        verbos=False
+        latency_slo=None,
+        quality_bounds=None,
+        quality_window=50,
+        quality_cooldown=5.0,
+        verbos=False,
+        log_dir='/workspace/Herobine/bridge/agent_logs'
     ):
         self.mc_server_host = mc_server_host
         self.mc_server_port = mc_server_port
@@ -51,21 +80,44 @@ class MinecraftAIServer:
         self.instruction = instruction
         self.max_steps = max_steps
         self.step_delay = step_delay
+        # Repeat the last action instead of querying VLLM for up to this many
+        # consecutive frames the bridge reports as unchanged
+        self.reuse_unchanged = reuse_unchanged
+        self.reused_actions = 0
         self.verbos = verbos
         
         # Setup logging directory
-        self.log_dir = Path('/workspace/Herobine/bridge/agent_logs')
-        self.log_dir.mkdir(exist_ok=True)
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(exist_ok=True, parents=True)
         self.session_log = self.log_dir / f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
         self.step_log_counter = 0
         
         # Initialize environment
-        print(f"[Server] Connecting bot to Minecraft server at {mc_server_host}:{mc_server_port}")
-        self.env = MineflayerEnv(
-            server_host=mc_server_host,
-            server_port=mc_server_port,
-            bot_username=bot_username
-        )
+        if replay_session:
+            # Recorded frames served in-process: no bridge or Minecraft server needed
+            print(f"[Server] Replaying session {replay_session}")
+            self.env = ReplayEnv(
+                replay_session,
+                obs_format='mineflayer',
+                step_latency=replay_step_latency,
+                frame_latency=replay_frame_latency,
+                views=views
+            )
+        else:
+            print(f"[Server] Connecting bot to Minecraft server at {mc_server_host}:{mc_server_port}")
+            self.env = MineflayerEnv(
+                server_host=mc_server_host,
+                server_port=mc_server_port,
+                bot_username=bot_username,
+                bridge_port=bridge_port,
+                auto_start_bridge=auto_start_bridge,
+                spawn_wait=spawn_wait,
+                binary_actions=binary_actions,
+                camera_smoothing=camera_smoothing,
+                hold_timeout=hold_timeout,
+                bot_id=bot_id,
+                views=views
+            )
         
         # Initialize agent
         if vllm_base_url and checkpoint_path:
@@ -75,15 +127,63 @@ class MinecraftAIServer:
                 base_url=vllm_base_url,
                 temperature=temperature,
                 history_num=history_num,
+                cached_history=cached_history,
                 instruction_type=instruction_type,
-                action_chunk_len=action_chunk_len
+                action_chunk_len=action_chunk_len,
+                max_tokens_per_action=max_tokens_per_action,
+                action_end_token=action_end_token,
+                request_timeout=request_timeout,
+                degraded_policy=degraded_policy,
+                routing=routing,
+                agent_key=f"{bot_username}@{mc_server_host}:{mc_server_port}"
             )
             self.agent.set_instruction(instruction)
+        elif policy:
+            print(f"[Server] No VLLM config provided, using local '{policy}' policy")
+            self.agent = make_policy(policy, seed=seed, replay_path=policy_log)
+            self.agent.set_instruction(instruction)
         else:
-            print("[Server] No VLLM config provided, using random agent")
+            print("[Server] No VLLM config provided, taking noop actions (see --policy)")
             self.agent = None
+        # Local policies run far faster than inference; saving every input
+        # frame would dominate the loop when they are used as load generators
+        self.save_inputs = not isinstance(self.agent, LocalPolicy)
+        
+        # Trade frame quality, history and chunking for step latency
+        self.quality = None
+        if latency_slo:
+            self.quality = QualityController(
+                latency_slo,
+                self._quality_knobs(parse_bounds(quality_bounds)),
+                window=quality_window,
+                cooldown=quality_cooldown
+            )
+            print(f"[Server] Holding p95 step latency to {latency_slo:.0f}ms by adjusting "
+                  f"{', '.join(knob.name for knob in self.quality.knobs) or 'nothing (bounds leave no room)'}")
         
         self.running = False
+    
+    def _quality_knobs(self, bounds):
+        """
+        Runtime knobs this server can turn, starting from the env's current
+        frame format (the bridge default, DEFAULT_FRAME_QUALITY at obs_size,
+        unless set) and the agent's configuration
+        """
+        quality = getattr(self.env, 'frame_quality', None) or DEFAULT_FRAME_QUALITY
+        height, width = self.env.obs_size
+        width, height = getattr(self.env, 'frame_size', None) or (width, height)
+        current = {'jpeg_quality': quality, 'scale': 1.0}
+        appliers = {
+            'jpeg_quality': lambda quality: self.env.set_frame_format(quality=quality),
+            'scale': lambda scale: self.env.set_frame_format(size=(round(width * scale), round(height * scale))),
+        }
+        if getattr(self.agent, 'history', None) is not None and hasattr(self.agent, 'set_history_num'):
+            current['history'] = self.agent.history.capacity
+            appliers['history'] = self.agent.set_history_num
+        if hasattr(self.agent, 'set_action_chunk_len'):
+            current['chunk_len'] = self.agent.action_chunk_len
+            appliers['chunk_len'] = self.agent.set_action_chunk_len
+        return build_knobs(bounds, current, appliers)
         
     def run(self):
         """Main loop with chat-based instruction handling"""
@@ -93,7 +193,10 @@ class MinecraftAIServer:
         print(f"[Server] Default instruction: {self.instruction}")
         print(f"[Server] Listening for chat commands...")
         print(f"[Server] Type messages in Minecraft chat to control JarvisAI")
-        print(f"[Server] Type 'reset' to clear AI state")
+        print(f"[Server] Prefix with '!' or '!!' to raise priority (may preempt), "
+              f"'@{self.bot_username} ...' to target this bot")
+        print(f"[Server] Type 'reset' to cancel your instructions, "
+              f"'@{self.bot_username} reset' to stop this bot")
         print(f"[Server] Players can join: {self.mc_server_host}:{self.mc_server_port}")
         print("[Server] Press Ctrl+C to stop")
         
@@ -101,7 +204,10 @@ class MinecraftAIServer:
         obs, info = self.env.reset()
         
         step_count = 0
+        last_action = None
+        unchanged_streak = 0
         current_instruction = self.instruction
+        assignment_id = None
         last_chat_check = time.time()
         chat_check_interval = 1.0  # Check chat every second
         
@@ -110,49 +216,57 @@ class MinecraftAIServer:
                 if self.max_steps and step_count >= self.max_steps:
                     print(f"[Server] Reached max steps ({self.max_steps})")
                     break
+                step_start = time.perf_counter()
                 
                 # Check for chat messages
                 if time.time() - last_chat_check >= chat_check_interval:
                     chat_data = self.env.get_chat_instructions()
                     if chat_data:
-                        pending = chat_data.get('pending', [])
-                        
-                        # Handle reset
-                        for msg in pending:
-                            if msg['message'].lower().strip() == 'reset':
-                                print(f"[Server] Reset from {msg['username']}")
-                                if self.agent:
-                                    self.agent.reset()
-                                self.env.clear_chat_instruction()
+                        # The bridge's scheduler pushes assignments: a new id is a
+                        # new (possibly preempting) task, None means it was cancelled
+                        current = chat_data.get('current')
+                        current_id = current.get('id') if current else None
+                        if current_id != assignment_id:
+                            assignment_id = current_id
+                            if current:
+                                current_instruction = current['message']
+                                print(f"[Server] New task from {current['username']}: {current_instruction}")
+                            else:
                                 current_instruction = self.instruction
-                                print(f"[Server] AI state cleared")
-                                break
-                        
-                        # Get new instruction
-                        if not chat_data.get('current') and pending:
-                            new_instr = self.env.start_chat_instruction()
-                            if new_instr:
-                                current_instruction = new_instr['message']
-                                print(f"[Server] New task from {new_instr['username']}: {current_instruction}")
-                                if self.agent:
-                                    self.agent.set_instruction(current_instruction)
+                                print(f"[Server] Task cancelled, back to: {current_instruction}")
+                            if self.agent:
+                                self.agent.reset()
+                                self.agent.set_instruction(current_instruction)
+                            last_action = None
                     
                     last_chat_check = time.time()
                 
                 # Get POV image
                 pov_image = self.env.get_pov_image()
                 obs['pov'] = pov_image
+                if self.env.views:
+                    obs['views'] = self.env.last_views
                 
-                # Get action from agent
-                if self.agent:
+                # Get action from agent (skip inference on black frames while
+                # the bridge is down or being restarted by the watchdog)
+                degraded = self.env.last_frame_degraded or not self.env.healthy
+                unchanged_streak = 0 if self.env.last_frame_changed else unchanged_streak + 1
+                if degraded:
+                    action = self.env.noop_action()
+                elif last_action is not None and 0 < unchanged_streak <= self.reuse_unchanged:
+                    # Nothing in view changed - the model would see the same frame again
+                    action = last_action
+                    self.reused_actions += 1
+                elif self.agent:
                     try:
                         # Log input to agent
                         pov_path = self.log_dir / f"step_{step_count:05d}_input.jpg"
-                        if pov_image:
+                        if pov_image and self.save_inputs:
                             pov_image.save(pov_path, 'JPEG')
                         
                         # Get action
                         action = self.agent.get_action(obs, verbos=self.verbos)
+                        last_action = action
                         
                         # Log request/response
                         log_entry = {
@@ -161,7 +275,7 @@ class MinecraftAIServer:
                             'instruction': current_instruction,
                             'health': obs.get('health', 0),
                             'position': obs.get('position'),
-                            'pov_saved': str(pov_path),
+                            'pov_saved': str(pov_path) if self.save_inputs else None,
                             'action': str(action),
                             'action_type': action.get('type') if isinstance(action, dict) else None
                         }
@@ -190,6 +304,9 @@ class MinecraftAIServer:
                         self.agent.reset()
                 
                 step_count += 1
+                # Capture -> inference -> action, without the pacing sleep
+                if self.quality and not degraded:
+                    self.quality.record(time.perf_counter() - step_start)
                 time.sleep(self.step_delay)
                 
                 # Status every 100 steps
@@ -198,6 +315,16 @@ class MinecraftAIServer:
                     pos = obs.get('position') or {}
                     task_preview = current_instruction[:40] + "..." if len(current_instruction) > 40 else current_instruction
                     print(f"[Server] Step {step_count} | Health: {health} | Pos: ({pos.get('x',0):.1f}, {pos.get('y',0):.1f}, {pos.get('z',0):.1f}) | Task: {task_preview}")
+                    if not self.env.healthy or self.env.degraded_steps:
+                        print(f"[Server] Bridge health: {self.env.health_stats()}")
+                    if self.agent and self.agent.fallback_actions:
+                        print(f"[Server] Inference health: {self.agent.stats()}")
+                    elif isinstance(self.agent, LocalPolicy):
+                        print(f"[Server] Policy: {self.agent.stats()}")
+                    if self.reused_actions:
+                        print(f"[Server] Reused last action on {self.reused_actions} unchanged frames")
+                    if self.quality:
+                        print(f"[Server] Quality: {self.quality.stats()}")
         
         except KeyboardInterrupt:
             print("\n[Server] Shutting down...")
@@ -228,10 +355,35 @@ def main():
                         help='Minecraft server port')
     parser.add_argument('--bot-username', type=str, default='JarvisAI',
                         help='Bot username in-game')
+    parser.add_argument('--bridge-port', type=int, default=1111,
+                        help='Port of the Mineflayer bridge HTTP server')
+    parser.add_argument('--binary-actions', action='store_true',
+                        help='Send compound actions to the bridge as packed binary records')
+    parser.add_argument('--no-camera-smoothing', action='store_true',
+                        help='Apply camera deltas instantly instead of easing them over server ticks')
+    parser.add_argument('--hold-timeout', type=float, default=1.0,
+                        help='Seconds movement keys stay held without a new action')
+    parser.add_argument('--bot-id', type=str, default=None,
+                        help='Bot slot in a shared bridge (default: bot username); '
+                             'servers with distinct ids can share one --bridge-port')
+    parser.add_argument('--replay-session', type=str, default=None,
+                        help="Serve frames from a recorded session_*.jsonl, JPEG directory or "
+                             "'synthetic' in-process instead of connecting to the bridge")
+    parser.add_argument('--replay-step-latency', type=str, default=None,
+                        help="Latency injected into replayed steps, e.g. 'normal:5,1' (ms)")
+    parser.add_argument('--replay-frame-latency', type=str, default=None,
+                        help="Latency injected into replayed screenshots, e.g. 'const:8' (ms)")
+    parser.add_argument('--views', type=str, default=None,
+                        help="Multi-resolution observation views cut from the same render, e.g. "
+                             "'overview=0.5,crosshair,gui' (add 'nofull' to feed the overview to the model)")
     
     # VLLM config
     parser.add_argument('--vllm-url', type=str, default=None,
-                        help='VLLM server base URL (e.g., http://localhost:8000/v1)')
+                        help='VLLM server base URL (e.g., http://localhost:8000/v1); '
+                             'comma-separate several URLs to load-balance across replicas')
+    parser.add_argument('--routing', type=str, default='sticky',
+                        choices=['sticky', 'least_outstanding', 'latency'],
+                        help='How requests are spread over multiple VLLM replicas')
     parser.add_argument('--checkpoint', type=str, default=None,
                         help='Path to model checkpoint')
     
@@ -242,19 +394,56 @@ def main():
                         help='Sampling temperature')
     parser.add_argument('--history-num', type=int, default=0,
                         help='Number of history frames')
+    parser.add_argument('--cached-history', action='store_true',
+                        help='Keep history frames pre-encoded instead of re-encoding them each step '
+                             '(sends history as flat parts in the current turn, not as '
+                             'JarvisVLA\'s own user/assistant turns)')
     parser.add_argument('--instruction-type', type=str, default='normal',
                         choices=['normal', 'recipe', 'simple'],
                         help='Instruction type')
     parser.add_argument('--action-chunk-len', type=int, default=1,
                         help='Number of actions to generate at once')
+    parser.add_argument('--max-tokens-per-action', type=int, default=32,
+                        help='Generation budget per action (bounds worst-case step latency)')
+    parser.add_argument('--action-end-token', type=str, default=None,
+                        help='Token that ends one action group (default: from action tokenizer)')
+    parser.add_argument('--request-timeout', type=float, default=10.0,
+                        help='Timeout in seconds for each VLLM request')
+    parser.add_argument('--degraded-policy', type=str, default='noop',
+                        choices=['noop', 'repeat', 'scripted'],
+                        help='Action to take while VLLM is unavailable')
+    parser.add_argument('--reuse-unchanged', type=int, default=0,
+                        help='Repeat the last action for up to N consecutive unchanged frames '
+                             'instead of running inference (0 = always infer)')
+    
+    parser.add_argument('--policy', type=str, default=None, choices=['random', 'explore', 'replay'],
+                        help='Local policy to run when no VLLM is configured '
+                             '(default: noop actions)')
+    parser.add_argument('--policy-log', type=str, default=None,
+                        help='Session log (or directory of them) for --policy replay')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='RNG seed for the random/explore policies')
     
     # Loop config
     parser.add_argument('--max-steps', type=int, default=None,
                         help='Maximum number of steps (None for infinite)')
     parser.add_argument('--fps', type=int, default=20,
                         help='Actions per second')
+    parser.add_argument('--latency-slo', type=float, default=None,
+                        help='Target p95 step latency in ms; adjusts frame quality, history '
+                             'and action chunking at runtime to hold it (default: off)')
+    parser.add_argument('--quality-bounds', type=str, default=None,
+                        help='Cheapest settings the latency SLO may go to, e.g. '
+                             'jpeg_quality=50,scale=0.5,history=0,chunk_len=4 '
+                             '(chunk_len is only adjusted when given)')
+    parser.add_argument('--quality-window', type=int, default=50,
+                        help='Steps in the rolling p95 window')
+    parser.add_argument('--quality-cooldown', type=float, default=5.0,
+                        help='Minimum seconds between two quality changes')
     parser.add_argument('--verbos', action='store_true',
                         help='Verbose output')
+    parser.add_argument('--log-dir', type=str, default='/workspace/Herobine/bridge/agent_logs',
+                        help='Directory for step images and session logs')
     
     args = parser.parse_args()
     
@@ -263,16 +452,40 @@ def main():
         mc_server_host=args.mc_host,
         mc_server_port=args.mc_port,
         bot_username=args.bot_username,
+        bridge_port=args.bridge_port,
+        binary_actions=args.binary_actions,
+        camera_smoothing=not args.no_camera_smoothing,
+        hold_timeout=args.hold_timeout,
+        bot_id=args.bot_id or args.bot_username,
+        views=args.views,
+        replay_session=args.replay_session,
+        replay_step_latency=args.replay_step_latency,
+        replay_frame_latency=args.replay_frame_latency,
         vllm_base_url=args.vllm_url,
         checkpoint_path=args.checkpoint,
         instruction=args.instruction,
         temperature=args.temperature,
         history_num=args.history_num,
+        cached_history=args.cached_history,
         instruction_type=args.instruction_type,
         action_chunk_len=args.action_chunk_len,
+        max_tokens_per_action=args.max_tokens_per_action,
+        action_end_token=args.action_end_token,
+        request_timeout=args.request_timeout,
+        degraded_policy=args.degraded_policy,
+        routing=args.routing,
+        reuse_unchanged=args.reuse_unchanged,
+        policy=args.policy,
+        policy_log=args.policy_log,
+        seed=args.seed,
         max_steps=args.max_steps,
         step_delay=1.0/args.fps,
-        verbos=args.verbos
+        latency_slo=args.latency_slo,
+        quality_bounds=args.quality_bounds,
+        quality_window=args.quality_window,
+        quality_cooldown=args.quality_cooldown,
+        verbos=args.verbos,
+        log_dir=args.log_dir
     )
     
     # Register signal handlers
@@ -0,0 +1,69 @@
+"""
+Tests for the prompt layout and frame history in vllm_client.py
+Run with: python bridge/test_vllm_client.py (or pytest)
+"""
+
+from vllm_client import FrameHistory, layout_messages
+
+
+def image(url):
+    return {'type': 'image_url', 'image_url': {'url': url}}
+
+
+def text(value):
+    return {'type': 'text', 'text': value}
+
+
+def test_single_turn_layout():
+    messages = [{'role': 'user', 'content': [image('now'), text('chop a tree')]}]
+    laid_out = layout_messages(messages, 'system', [image('h1'), text('act1')])
+    assert laid_out == [
+        {'role': 'system', 'content': 'system'},
+        {'role': 'user', 'content': [text('chop a tree'), image('h1'), text('act1'), image('now')]},
+    ]
+
+
+def test_single_turn_keeps_agent_system_prompt():
+    messages = [{'role': 'user', 'content': 'chop a tree'}, {'role': 'system', 'content': 'agent'}]
+    laid_out = layout_messages(messages, 'fallback')
+    assert laid_out == [
+        {'role': 'system', 'content': 'agent'},
+        {'role': 'user', 'content': [text('chop a tree')]},
+    ]
+
+
+def test_multi_turn_layout_is_unchanged():
+    messages = [
+        {'role': 'system', 'content': 'agent'},
+        {'role': 'user', 'content': [text('chop a tree'), image('t1')]},
+        {'role': 'assistant', 'content': 'act1'},
+        {'role': 'user', 'content': [text('chop a tree'), image('t2'), text('observe')]},
+    ]
+    assert layout_messages(messages, 'fallback') == messages
+    laid_out = layout_messages(messages, 'fallback', [image('h1')])
+    assert laid_out[:3] == messages[:3]
+    assert laid_out[3] == {'role': 'user', 'content': [text('chop a tree'), image('h1'), image('t2'), text('observe')]}
+
+
+def test_layout_does_not_modify_input():
+    content = [image('now'), text('chop a tree')]
+    messages = [{'role': 'user', 'content': content}]
+    layout_messages(messages, 'system', [image('h1')])
+    assert messages == [{'role': 'user', 'content': [image('now'), text('chop a tree')]}]
+
+
+def test_frame_history_resize_keeps_latest():
+    history = FrameHistory(3)
+    for i in range(5):
+        history.push([image(f'f{i}')], f'a{i}')
+    history.resize(2)
+    assert history.parts() == [image('f3'), text('a3'), image('f4'), text('a4')]
+    history.resize(0)
+    assert history.parts() == []
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Trajectory Index
+Columnar index over session_*.jsonl logs written by MinecraftAIServer, so
+questions like "all steps where health dropped while doing task X" or
+"positions visited" don't require re-parsing every log.
+
+Layout (one directory per ingested chunk, one .npy file per column, so a
+query only memory-maps the columns it needs):
+
+  index/state.json             vocabularies + how far each log was ingested
+  index/chunks/00000/x.npy     ...
+  index/chunks/00000/health_delta.npy
+
+Ingestion is incremental: each log's byte offset is remembered and only
+complete new lines are read, so `ingest` (or `watch`) can run while
+sessions are still being written.
+
+  python bridge/trajectory_index.py ingest bridge/agent_logs --index traj_index
+  python bridge/trajectory_index.py watch bridge/agent_logs --index traj_index --interval 10
+  python bridge/trajectory_index.py query --index traj_index --instruction "chop" --health-drop
+  python bridge/trajectory_index.py query --index traj_index --bbox -50,-50,50,50 --positions
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+COLUMNS = {
+    'session': np.int32,
+    'step': np.int32,
+    'timestamp': np.float64,
+    'instruction': np.int32,
+    'health': np.float32,
+    'health_delta': np.float32,
+    'x': np.float32,
+    'y': np.float32,
+    'z': np.float32,
+    'action_type': np.int16,
+}
+
+
+def _parse_time(value) -> float:
+    """ISO timestamp or unix seconds -> unix seconds (0 if unparseable)"""
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TrajectoryIndex:
+    """
+    Append-only columnar index of agent steps
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.chunks_dir = self.path / 'chunks'
+        self.state_path = self.path / 'state.json'
+        if self.state_path.exists():
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        else:
+            self.state = {'sessions': [], 'instructions': [], 'action_types': [],
+                          'files': {}, 'chunks': [], 'rows': 0, 'next_chunk': 0}
+        if 'next_chunk' not in self.state:
+            # Indexes written before the counter existed
+            self.state['next_chunk'] = max((int(chunk['name']) + 1 for chunk in self.state['chunks']), default=0)
+
+    # -- ingestion ---------------------------------------------------------
+
+    @staticmethod
+    def _vocab(vocab: List[str], value) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        try:
+            return vocab.index(value)
+        except ValueError:
+            vocab.append(value)
+            return len(vocab) - 1
+
+    def _save_state(self):
+        tmp = self.state_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    def _new_chunk_dir(self) -> Path:
+        """
+        Fresh chunk directory. Names come from a counter that only grows, so a
+        name is never reused after compact() - directories state still lists
+        are never touched.
+        """
+        referenced = {chunk['name'] for chunk in self.state['chunks']}
+        while True:
+            name = f"{self.state['next_chunk']:05d}"
+            self.state['next_chunk'] += 1
+            chunk_dir = self.chunks_dir / name
+            if name in referenced:
+                continue
+            if chunk_dir.exists():
+                # Leftover from an interrupted ingest/compact that never committed state
+                shutil.rmtree(chunk_dir)
+            chunk_dir.mkdir(parents=True)
+            return chunk_dir
+
+    def ingest(self, inputs: List[str]) -> int:
+        """
+        Index the complete lines appended to each log since the last ingest
+
+        Args:
+            inputs: Session JSONL files and/or directories containing them
+
+        Returns:
+            Number of rows added
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        columns = {name: [] for name in COLUMNS}
+
+        logs = []
+        for item in inputs:
+            path = Path(item)
+            logs.extend(sorted(path.glob('session_*.jsonl')) if path.is_dir() else [path])
+
+        for log in logs:
+            key = str(log.resolve())
+            progress = self.state['files'].setdefault(key, {'offset': 0, 'last_health': None})
+            try:
+                size = log.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size < progress['offset']:
+                # Truncated/rewritten log - start over (old rows stay in the index)
+                progress.update(offset=0, last_health=None)
+            if size == progress['offset']:
+                continue
+
+            session_id = self._vocab(self.state['sessions'], log.name)
+            with open(log, 'rb') as f:
+                f.seek(progress['offset'])
+                data = f.read()
+            # Only whole lines; a partially written last line is picked up next time
+            end = data.rfind(b'\n') + 1
+            last_health = progress['last_health']
+            for line in data[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                health = float(entry.get('health') or 0)
+                position = entry.get('position') or {}
+                columns['session'].append(session_id)
+                columns['step'].append(int(entry.get('step', -1)))
+                columns['timestamp'].append(_parse_time(entry.get('timestamp')))
+                columns['instruction'].append(self._vocab(self.state['instructions'], entry.get('instruction')))
+                columns['health'].append(health)
+                columns['health_delta'].append(health - last_health if last_health is not None else 0.0)
+                columns['x'].append(float(position.get('x', 0)))
+                columns['y'].append(float(position.get('y', 0)))
+                columns['z'].append(float(position.get('z', 0)))
+                columns['action_type'].append(self._vocab(self.state['action_types'], entry.get('action_type')))
+                last_health = health
+            progress['offset'] += end
+            progress['last_health'] = last_health
+
+        added = len(columns['step'])
+        if added:
+            chunk_dir = self._new_chunk_dir()
+            for column, dtype in COLUMNS.items():
+                np.save(chunk_dir / f"{column}.npy", np.asarray(columns[column], dtype=dtype))
+            self.state['chunks'].append({'name': chunk_dir.name, 'rows': added})
+            self.state['rows'] += added
+        self._save_state()
+        return added
+
+    def compact(self):
+        """Merge all chunks into one (many small chunks accumulate under `watch`)"""
+        if len(self.state['chunks']) <= 1:
+            return
+        merged = {column: self.column(column) for column in COLUMNS}
+        chunk_dir = self._new_chunk_dir()
+        for column, values in merged.items():
+            np.save(chunk_dir / f"{column}.npy", np.ascontiguousarray(values))
+        old = [chunk['name'] for chunk in self.state['chunks']]
+        self.state['chunks'] = [{'name': chunk_dir.name, 'rows': self.state['rows']}]
+        self._save_state()
+        for chunk in old:
+            shutil.rmtree(self.chunks_dir / chunk, ignore_errors=True)
+
+    # -- queries -----------------------------------------------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """One column across all chunks (memory-mapped per chunk)"""
+        parts = [np.load(self.chunks_dir / chunk['name'] / f"{name}.npy", mmap_mode='r')
+                 for chunk in self.state['chunks']]
+        if not parts:
+            return np.zeros(0, dtype=COLUMNS[name])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _matching_ids(self, vocab: str, pattern: Optional[str], exact: bool = False) -> np.ndarray:
+        values = self.state[vocab]
+        if exact:
+            return np.array([i for i, v in enumerate(values) if v == pattern], dtype=np.int64)
+        pattern = pattern.lower()
+        return np.array([i for i, v in enumerate(values) if pattern in v.lower()], dtype=np.int64)
+
+    def query(
+        self,
+        instruction: Optional[str] = None,
+        session: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        bbox: Optional[List[float]] = None,
+        action_type: Optional[str] = None,
+        health_drop: bool = False,
+    ) -> np.ndarray:
+        """
+        Row numbers matching every given predicate
+
+        Args:
+            instruction: Case-insensitive substring of the instruction
+            session: Substring of the session log name
+            since/until: Unix time bounds (inclusive)
+            bbox: [x1, z1, x2, z2] or [x1, y1, z1, x2, y2, z2]
+            action_type: Exact action type ('compound', 'noop', ...)
+            health_drop: Only steps where health fell since the previous step
+        """
+        mask = np.ones(self.state['rows'], dtype=bool)
+        if instruction is not None:
+            mask &= np.isin(self.column('instruction'), self._matching_ids('instructions', instruction))
+        if session is not None:
+            mask &= np.isin(self.column('session'), self._matching_ids('sessions', session))
+        if action_type is not None:
+            mask &= np.isin(self.column('action_type'), self._matching_ids('action_types', action_type, exact=True))
+        if since is not None:
+            mask &= self.column('timestamp') >= since
+        if until is not None:
+            mask &= self.column('timestamp') <= until
+        if bbox:
+            axes = ('x', 'z') if len(bbox) == 4 else ('x', 'y', 'z')
+            lows, highs = bbox[:len(axes)], bbox[len(axes):]
+            for axis, low, high in zip(axes, lows, highs):
+                values = self.column(axis)
+                mask &= (values >= min(low, high)) & (values <= max(low, high))
+        if health_drop:
+            mask &= self.column('health_delta') < 0
+        return np.flatnonzero(mask)
+
+    def rows(self, indices: np.ndarray) -> List[Dict]:
+        """Materialize rows as dicts with vocabulary values decoded"""
+        data = {column: self.column(column)[indices] for column in COLUMNS}
+        decoded = []
+        for i in range(len(indices)):
+            row = {column: data[column][i].item() for column in COLUMNS}
+            row['session'] = self.state['sessions'][row['session']]
+            row['instruction'] = self.state['instructions'][row['instruction']] if row['instruction'] >= 0 else None
+            row['action_type'] = self.state['action_types'][row['action_type']] if row['action_type'] >= 0 else None
+            decoded.append(row)
+        return decoded
+
+    def positions(self, indices: np.ndarray) -> np.ndarray:
+        """Distinct block positions (floored x, y, z) among the given rows"""
+        coords = np.stack([np.floor(self.column(axis)[indices]) for axis in ('x', 'y', 'z')], axis=1)
+        return np.unique(coords.astype(np.int32), axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar index and queries over agent session logs')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('ingest', 'watch'):
+        p = sub.add_parser(name, help='Index new log lines' + (' continuously' if name == 'watch' else ''))
+        p.add_argument('inputs', nargs='+', help='Session JSONL files or directories')
+        p.add_argument('--index', type=str, default='traj_index', help='Index directory')
+        if name == 'watch':
+            p.add_argument('--interval', type=float, default=10.0, help='Seconds between ingests')
+            p.add_argument('--compact-every', type=int, default=50,
+                           help='Merge chunks once this many have accumulated')
+
+    p = sub.add_parser('compact', help='Merge all chunks into one')
+    p.add_argument('--index', type=str, default='traj_index', help='Index directory')
+
+    p = sub.add_parser('query', help='Find steps matching predicates')
+    p.add_argument('--index', type=str, default='traj_index', help='Index directory')
+    p.add_argument('--instruction', type=str, default=None, help='Substring of the instruction')
+    p.add_argument('--session', type=str, default=None, help='Substring of the session file name')
+    p.add_argument('--since', type=str, default=None, help='Start time (ISO or unix seconds)')
+    p.add_argument('--until', type=str, default=None, help='End time (ISO or unix seconds)')
+    p.add_argument('--bbox', type=str, default=None, help='x1,z1,x2,z2 or x1,y1,z1,x2,y2,z2')
+    p.add_argument('--action-type', type=str, default=None, help='Exact action type')
+    p.add_argument('--health-drop', action='store_true', help='Only steps where health decreased')
+    p.add_argument('--positions', action='store_true', help='Print distinct visited block positions')
+    p.add_argument('--count', action='store_true', help='Only print the number of matches')
+    p.add_argument('--limit', type=int, default=50, help='Maximum rows to print')
+    p.add_argument('--json', action='store_true', help='Print rows as JSON lines')
+    args = parser.parse_args()
+
+    index = TrajectoryIndex(args.index)
+
+    if args.command == 'ingest':
+        added = index.ingest(args.inputs)
+        print(f"[Index] Added {added} rows ({index.state['rows']} total, {len(index.state['chunks'])} chunks)")
+    elif args.command == 'watch':
+        print(f"[Index] Watching {', '.join(args.inputs)} every {args.interval}s (Ctrl+C to stop)")
+        try:
+            while True:
+                added = index.ingest(args.inputs)
+                if added:
+                    print(f"[Index] +{added} rows ({index.state['rows']} total)")
+                if len(index.state['chunks']) >= args.compact_every:
+                    index.compact()
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'compact':
+        index.compact()
+        print(f"[Index] Compacted to {len(index.state['chunks'])} chunk(s), {index.state['rows']} rows")
+    elif args.command == 'query':
+        bbox = [float(v) for v in args.bbox.split(',')] if args.bbox else None
+        if bbox and len(bbox) not in (4, 6):
+            parser.error('--bbox takes 4 (x,z) or 6 (x,y,z) numbers')
+        matches = index.query(
+            instruction=args.instruction,
+            session=args.session,
+            since=_parse_time(args.since) if args.since else None,
+            until=_parse_time(args.until) if args.until else None,
+            bbox=bbox,
+            action_type=args.action_type,
+            health_drop=args.health_drop,
+        )
+        if args.count:
+            print(len(matches))
+        elif args.positions:
+            for x, y, z in index.positions(matches):
+                print(f"{x} {y} {z}")
+        else:
+            for row in index.rows(matches[:args.limit]):
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    print(f"{row['session']:<32} step {row['step']:>6}  hp {row['health']:>4.1f} "
+                          f"({row['health_delta']:+.1f})  pos ({row['x']:.1f}, {row['y']:.1f}, {row['z']:.1f})  "
+                          f"{row['action_type']}  {row['instruction']}")
+            if len(matches) > args.limit:
+                print(f"... {len(matches) - args.limit} more (use --limit)")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,27 @@ Wraps JarvisVLA's VLLM_AGENT to work with Mineflayer
 """
 
 import sys
+import time
+import uuid
 from pathlib import Path
 
 # Add JarvisVLA to path (it's one level up from bridge directory)
 sys.path.insert(0, str(Path(__file__).parent.parent / "JarvisVLA"))
 
-from jarvisvla.evaluate import agent_wrapper
 from mineflayer_env import ActionMapper
+from vllm_client import CircuitBreaker, EndpointPool, FrameHistory, VLLMClient, parse_endpoints
+
+
+# Fallback used by the 'scripted' degraded policy: slowly pan the camera so
+# the bot keeps looking around (and frames keep changing) without moving
+SCRIPTED_FALLBACK = [
+    {'type': 'compound', 'camera': [0, 5], 'buttons': {}},
+    {'type': 'compound', 'camera': [0, 5], 'buttons': {}},
+    {'type': 'compound', 'camera': [0, -5], 'buttons': {}},
+    {'type': 'compound', 'camera': [0, -5], 'buttons': {}},
+]
+
+DEGRADED_POLICIES = ('noop', 'repeat', 'scripted')
 
 
 class VLLMAgentAdapter:
@@ -24,41 +38,151 @@ class VLLMAgentAdapter:
         base_url: str,
         temperature: float = 0.7,
         history_num: int = 0,
+        cached_history: bool = False,
         instruction_type: str = 'normal',
-        action_chunk_len: int = 1
+        action_chunk_len: int = 1,
+        system_prompt: str = None,
+        max_tokens_per_action: int = 32,
+        action_end_token: str = None,
+        stream_actions: bool = True,
+        request_timeout: float = 10.0,
+        degraded_policy: str = 'noop',
+        breaker_threshold: int = 3,
+        breaker_max_backoff: float = 30.0,
+        error_log_interval: float = 10.0,
+        routing: str = 'sticky',
+        agent_key: str = None
     ):
         """
         Initialize VLLM agent
         
         Args:
             checkpoint_path: Path to model checkpoint
-            base_url: URL of VLLM server
+            base_url: URL of VLLM server, or several comma-separated URLs to
+                load-balance across replicas
             temperature: Sampling temperature
             history_num: Number of history frames
+            cached_history: Keep history frames pre-encoded in a ring buffer
+                instead of letting VLLM_AGENT re-encode them every step. This
+                changes the prompt: history is sent as flat image + action
+                text parts inside the current user turn, not as JarvisVLA's
+                own user/assistant turns, so only enable it for a model/prompt
+                this has been checked with
             instruction_type: Type of instruction ('normal', 'recipe', 'simple')
             action_chunk_len: Number of actions to generate at once
+            system_prompt: Stable system prompt placed first in every request
+                (only used if the agent does not send its own)
+            max_tokens_per_action: Generation budget per action in the chunk
+            action_end_token: Token closing one action group; defaults to the
+                action tokenizer's end token when it exposes one
+            stream_actions: Stream generation and return as soon as the whole
+                action chunk has arrived
+            request_timeout: Per-request timeout in seconds
+            degraded_policy: Action to return while VLLM is failing or the
+                circuit is open ('noop', 'repeat' last action, 'scripted')
+            breaker_threshold: Consecutive failures before the circuit opens
+            breaker_max_backoff: Maximum seconds between probes of a dead endpoint
+            error_log_interval: Minimum seconds between logged inference errors
+            routing: How requests are spread over multiple replicas
+                ('sticky', 'least_outstanding', 'latency')
+            agent_key: Routing key for sticky routing (random if not given)
         """
+        if degraded_policy not in DEGRADED_POLICIES:
+            raise ValueError(f"degraded_policy must be one of {DEGRADED_POLICIES}")
+        # Imported here so that importing this module (e.g. from helper
+        # scripts) doesn't pay for JarvisVLA's torch/transformers stack
+        from jarvisvla.evaluate import agent_wrapper
+        
+        # By default VLLM_AGENT builds its own history turns (the prompt the
+        # model was trained with). With cached_history it is managed here so
+        # past frames are reused as already-encoded parts - see FrameHistory
+        # for the (different) layout that produces.
+        self.history = FrameHistory(history_num) if cached_history and history_num > 0 else None
+        
+        endpoints = parse_endpoints(base_url)
         self.agent = agent_wrapper.VLLM_AGENT(
             checkpoint_path=checkpoint_path,
-            base_url=base_url,
+            base_url=endpoints[0],
             temperature=temperature,
-            history_num=history_num,
+            history_num=0 if self.history else history_num,
             instruction_type=instruction_type,
             action_chunk_len=action_chunk_len
         )
         
+        # Stop hammering the endpoint when it is down: fail fast while open,
+        # probe again with exponential backoff. With several replicas the pool
+        # keeps one breaker per replica and routes around open ones.
+        self.pool = None
+        self.breaker = None
+        client = self.agent.client
+        if len(endpoints) > 1:
+            self.pool = EndpointPool(
+                endpoints,
+                routing=routing,
+                failure_threshold=breaker_threshold,
+                max_backoff=breaker_max_backoff
+            )
+            client = self.pool.bind(agent_key or uuid.uuid4().hex)
+            print(f"[VLLMAgentAdapter] Load-balancing over {len(endpoints)} endpoints ({routing} routing)")
+        else:
+            self.breaker = CircuitBreaker(failure_threshold=breaker_threshold, max_backoff=breaker_max_backoff)
+        
+        # Route the agent's requests through our client so every step shares
+        # the same prompt prefix (system -> instruction -> history -> image)
+        # and hits vLLM's prefix cache. Generation is capped to a per-action
+        # token budget and cut off at the end of the last action group so a
+        # runaway generation can't stall the loop.
+        if action_end_token is None:
+            action_end_token = getattr(getattr(self.agent, 'action_tokenizer', None), 'act_end_token', None)
+        self.agent.client = VLLMClient(
+            client,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens_per_action * action_chunk_len,
+            action_end=action_end_token,
+            action_groups=action_chunk_len,
+            stream=stream_actions,
+            timeout=request_timeout,
+            history=self.history,
+            breaker=self.breaker
+        )
+        
         self.action_mapper = ActionMapper()
         self.current_instruction = None
+        self.max_tokens_per_action = max_tokens_per_action
+        self.action_chunk_len = action_chunk_len
+        
+        self.degraded_policy = degraded_policy
+        self.error_log_interval = error_log_interval
+        self.last_action = None
+        self.fallback_actions = 0
+        self._scripted_index = 0
+        self._last_error_log = 0.0
+        self._suppressed_errors = 0
         
     def reset(self):
         """Reset agent state"""
         self.agent.reset()
+        if self.history:
+            self.history.clear()
         self.current_instruction = None
     
     def set_instruction(self, instruction: str):
         """Set the current task instruction"""
         self.current_instruction = instruction
     
+    def set_history_num(self, history_num: int):
+        """Change the number of cached history frames sent per request (runtime knob)"""
+        if self.history:
+            self.history.resize(history_num)
+    
+    def set_action_chunk_len(self, action_chunk_len: int):
+        """Change the number of actions generated per request (runtime knob)"""
+        self.action_chunk_len = action_chunk_len
+        if hasattr(self.agent, 'action_chunk_len'):
+            self.agent.action_chunk_len = action_chunk_len
+        self.agent.client.action_groups = action_chunk_len
+        self.agent.client.max_tokens = self.max_tokens_per_action * action_chunk_len
+    
     def get_action(self, observation: dict, need_crafting_table: bool = False, verbos: bool = False) -> dict:
         """
         Get action from VLLM agent based on current observation
@@ -81,15 +205,48 @@ class VLLMAgentAdapter:
         
         # Get action from VLLM agent
         # agent.forward expects: (observations, instructions, verbos, need_crafting_table)
-        jarvis_action = self.agent.forward(
-            observations=[pov_image],
-            instructions=[self.current_instruction],
-            verbos=verbos,
-            need_crafting_table=need_crafting_table
-        )
+        try:
+            jarvis_action = self.agent.forward(
+                observations=[pov_image],
+                instructions=[self.current_instruction],
+                verbos=verbos,
+                need_crafting_table=need_crafting_table
+            )
+        except Exception as e:
+            self._log_error(e)
+            return self._fallback_action()
         
         # Convert JarvisVLA action to Mineflayer action
         mineflayer_action = self.action_mapper.jarvis_to_mineflayer(jarvis_action)
+        self.last_action = mineflayer_action
         
         return mineflayer_action
+    
+    def _fallback_action(self) -> dict:
+        """Action to take while inference is unavailable, per degraded_policy"""
+        self.fallback_actions += 1
+        if self.degraded_policy == 'repeat' and self.last_action is not None:
+            return self.last_action
+        if self.degraded_policy == 'scripted':
+            action = SCRIPTED_FALLBACK[self._scripted_index % len(SCRIPTED_FALLBACK)]
+            self._scripted_index += 1
+            return action
+        return {'type': 'noop'}
+    
+    def _log_error(self, error: Exception):
+        """Log inference errors at most once per error_log_interval"""
+        now = time.time()
+        if now - self._last_error_log < self.error_log_interval:
+            self._suppressed_errors += 1
+            return
+        suppressed = f" ({self._suppressed_errors} similar errors suppressed)" if self._suppressed_errors else ""
+        print(f"[VLLMAgentAdapter] Inference error: {error}{suppressed} - using '{self.degraded_policy}' fallback")
+        self._last_error_log = now
+        self._suppressed_errors = 0
+    
+    def stats(self) -> dict:
+        """Circuit breaker (or per-endpoint) state and fallback counters"""
+        if self.pool:
+            return {'endpoints': self.pool.stats(), 'fallback_actions': self.fallback_actions}
+        return dict(self.breaker.stats(), fallback_actions=self.fallback_actions)
 
@@ -0,0 +1,599 @@
+"""
+vLLM Client Wrapper
+Stands in for the OpenAI client inside JarvisVLA's VLLM_AGENT so that we
+control how chat requests are laid out before they reach the vLLM server
+"""
+
+import hashlib
+import random
+import threading
+import time
+import urllib.request
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with exponential backoff and half-open probing
+
+    closed    - requests flow; ``failure_threshold`` consecutive failures open it
+    open      - requests are rejected until the backoff expires
+    half_open - a single probe request is let through; success closes the
+                circuit, failure re-opens it with double the backoff
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        jitter: float = 0.1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+        self.state = 'closed'
+        self.failures = 0
+        self.backoff = base_backoff
+        self.open_until = 0.0
+        self.opened_count = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == 'closed':
+            return True
+        if self.state == 'open':
+            if time.time() < self.open_until:
+                self.rejected += 1
+                return False
+            self.state = 'half_open'
+            self._probe_in_flight = False
+        # half_open: only one probe at a time
+        if self._probe_in_flight:
+            self.rejected += 1
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        if self.state != 'closed':
+            print(f"[CircuitBreaker] Endpoint recovered - circuit closed")
+        self.state = 'closed'
+        self.failures = 0
+        self.backoff = self.base_backoff
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open':
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self._open()
+        elif self.state == 'closed' and self.failures >= self.failure_threshold:
+            self.backoff = self.base_backoff
+            self._open()
+
+    def _open(self):
+        delay = self.backoff * (1 + random.uniform(-self.jitter, self.jitter))
+        self.state = 'open'
+        self.open_until = time.time() + delay
+        self.opened_count += 1
+        self._probe_in_flight = False
+        print(f"[CircuitBreaker] Circuit open after {self.failures} failures - next probe in {delay:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened': self.opened_count,
+            'rejected': self.rejected,
+            'backoff_s': self.backoff,
+        }
+
+
+def _content_parts(content) -> List[Dict[str, Any]]:
+    """Normalize message content (str or list of parts) to a list of parts"""
+    if content is None:
+        return []
+    if isinstance(content, str):
+        return [{'type': 'text', 'text': content}]
+    return list(content)
+
+
+def _is_image_part(part: Dict[str, Any]) -> bool:
+    return part.get('type') in ('image_url', 'image', 'input_image')
+
+
+def layout_messages(
+    messages: List[Dict[str, Any]],
+    system_prompt: Optional[str] = None,
+    history_parts: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Re-order chat messages so every request shares the longest possible prefix
+
+    vLLM's automatic prefix caching only reuses KV blocks for an identical
+    leading token sequence. The layout produced here is:
+
+        system prompt -> instruction text -> history -> current image
+
+    This re-ordering only applies to requests with a single user turn (the
+    agent's own history is off): its text parts go first, then
+    ``history_parts``, then its image parts. Multi-turn requests are left as
+    the agent built them - earlier turns already carry the instruction, and
+    moving it would change what the model sees - except that
+    ``history_parts`` still go before the last turn's images. The system
+    prompt always comes first.
+
+    Args:
+        messages: Messages as built by VLLM_AGENT
+        system_prompt: System prompt to use if the agent did not send one
+        history_parts: Pre-encoded history content inserted before the current image
+
+    Returns:
+        New list of messages (input is not modified)
+    """
+    system_msgs = [m for m in messages if m.get('role') == 'system']
+    other_msgs = [m for m in messages if m.get('role') != 'system']
+
+    if not system_msgs and system_prompt:
+        system_msgs = [{'role': 'system', 'content': system_prompt}]
+
+    last_user = None
+    for i in range(len(other_msgs) - 1, -1, -1):
+        if other_msgs[i].get('role') == 'user':
+            last_user = i
+            break
+
+    laid_out = list(other_msgs)
+    if last_user is not None:
+        parts = _content_parts(other_msgs[last_user].get('content'))
+        image_parts = [p for p in parts if _is_image_part(p)]
+        user_turns = sum(1 for m in other_msgs if m.get('role') == 'user')
+        if user_turns == 1:
+            text_parts = [p for p in parts if not _is_image_part(p)]
+            content = text_parts + list(history_parts or []) + image_parts
+        else:
+            # Keep the turn's own order; only slot the history in before its first image
+            first_image = next((i for i, p in enumerate(parts) if _is_image_part(p)), len(parts))
+            content = parts[:first_image] + list(history_parts or []) + parts[first_image:]
+        laid_out[last_user] = dict(other_msgs[last_user], content=content)
+
+    return system_msgs + laid_out
+
+
+class FrameHistory:
+    """
+    Fixed-capacity ring buffer of past frames and the actions taken on them
+
+    Frames are stored as the already-encoded image content parts the agent
+    sent (base64 data URLs), so history frames are never re-encoded. Memory is
+    bounded by ``capacity`` slots that are reused as the buffer wraps.
+
+    Layout note: parts() is spliced into the current user turn as flat
+    [image, action text, image, action text, ...] parts. That is not the
+    user/assistant turn structure VLLM_AGENT builds for its own history, so
+    it is only used when VLLMAgentAdapter is created with cached_history.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(0, int(capacity))
+        self._frames = [None] * self.capacity
+        self._actions = [None] * self.capacity
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        """Drop all history (slots are kept allocated)"""
+        for i in range(self.capacity):
+            self._frames[i] = None
+            self._actions[i] = None
+        self._next = 0
+        self._size = 0
+
+    def resize(self, capacity: int):
+        """Change the capacity at runtime, keeping the most recent entries"""
+        capacity = max(0, int(capacity))
+        if capacity == self.capacity:
+            return
+        start = (self._next - self._size) % self.capacity if self.capacity else 0
+        entries = [((start + i) % self.capacity) for i in range(self._size)][-capacity:] if capacity else []
+        frames = [self._frames[i] for i in entries]
+        actions = [self._actions[i] for i in entries]
+        self.capacity = capacity
+        self._frames = frames + [None] * (capacity - len(frames))
+        self._actions = actions + [None] * (capacity - len(actions))
+        self._size = len(frames)
+        self._next = self._size % capacity if capacity else 0
+
+    def push(self, frame_parts: List[Dict[str, Any]], action_text: str):
+        """Record the image parts of one step and the model output for it"""
+        if self.capacity == 0 or not frame_parts:
+            return
+        self._frames[self._next] = frame_parts
+        self._actions[self._next] = action_text or ''
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def parts(self) -> List[Dict[str, Any]]:
+        """History as content parts, oldest first: frame, then the action taken"""
+        parts = []
+        start = (self._next - self._size) % self.capacity if self.capacity else 0
+        for i in range(self._size):
+            idx = (start + i) % self.capacity
+            parts.extend(self._frames[idx])
+            parts.append({'type': 'text', 'text': self._actions[idx]})
+        return parts
+
+
+class VLLMClient:
+    """
+    Drop-in replacement for the OpenAI client used by VLLM_AGENT
+
+    Only the surface VLLM_AGENT touches is exposed: ``models`` and
+    ``chat.completions.create``. Requests are rewritten with
+    ``layout_messages``, capped to a token budget and forwarded to the
+    wrapped client.
+
+    When the action tokenizer's end-of-action token is known, generation
+    stops as soon as ``action_groups`` complete action groups have been
+    produced: via a server-side stop sequence for a single group, or by
+    streaming and closing the stream early for action chunks.
+    """
+
+    def __init__(
+        self,
+        client,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        action_end: Optional[str] = None,
+        action_groups: int = 1,
+        stream: bool = True,
+        timeout: Optional[float] = None,
+        history: Optional[FrameHistory] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Args:
+            client: The agent's original OpenAI client
+            system_prompt: Stable system prompt placed at the head of every request
+            max_tokens: Hard cap on generated tokens per request
+            action_end: Token/string that closes one action group
+            action_groups: Number of action groups expected per request
+            stream: Stream responses and return once all groups have arrived
+            timeout: Per-request timeout in seconds
+            history: Ring buffer of past frames/actions to include in each request
+            breaker: Circuit breaker guarding the endpoint (None = always send)
+        """
+        self._client = client
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.action_end = action_end
+        self.action_groups = action_groups
+        self.stream = stream
+        self.timeout = timeout
+        self.history = history
+        self.breaker = breaker
+        self.models = client.models
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create_chat_completion)
+        )
+
+    def _apply_limits(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply token budget, stop sequences and timeout to request kwargs"""
+        kwargs = dict(kwargs)
+        if self.max_tokens:
+            kwargs['max_tokens'] = min(kwargs.get('max_tokens') or self.max_tokens, self.max_tokens)
+        if self.timeout:
+            kwargs.setdefault('timeout', self.timeout)
+        if self.action_end:
+            # Keep the end token in the output so the action tokenizer can parse the group
+            extra_body = dict(kwargs.get('extra_body') or {})
+            extra_body['include_stop_str_in_output'] = True
+            kwargs['extra_body'] = extra_body
+            if self.action_groups <= 1:
+                stop = kwargs.get('stop') or []
+                if isinstance(stop, str):
+                    stop = [stop]
+                kwargs['stop'] = list(stop) + [self.action_end]
+        return kwargs
+
+    def create_chat_completion(self, messages: List[Dict[str, Any]], **kwargs):
+        """Forward a chat completion request with a cache-friendly layout"""
+        history_parts = self.history.parts() if self.history else None
+        messages = layout_messages(messages, self.system_prompt, history_parts)
+        kwargs = self._apply_limits(kwargs)
+
+        if self.breaker and not self.breaker.allow_request():
+            raise CircuitOpenError(f"vLLM circuit open, retry in {self.breaker.open_until - time.time():.1f}s")
+        try:
+            if self.stream and self.action_end and self.action_groups > 1 and (kwargs.get('n') or 1) == 1:
+                response = self._stream_actions(messages, kwargs)
+            else:
+                response = self._client.chat.completions.create(messages=messages, **kwargs)
+        except Exception:
+            if self.breaker:
+                self.breaker.record_failure()
+            raise
+        if self.breaker:
+            self.breaker.record_success()
+
+        if self.history is not None:
+            self.history.push(self._current_frame(messages), response.choices[0].message.content)
+        return response
+
+    @staticmethod
+    def _current_frame(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Image parts of the current frame (trailing images of the last message)"""
+        parts = _content_parts(messages[-1].get('content')) if messages else []
+        frame = []
+        for part in reversed(parts):
+            if not _is_image_part(part):
+                break
+            frame.insert(0, part)
+        return frame
+
+    def _stream_actions(self, messages: List[Dict[str, Any]], kwargs: Dict[str, Any]):
+        """
+        Stream the completion and stop reading once every action group is complete
+
+        Returns a minimal ChatCompletion-shaped object (``choices[0].message.content``)
+        """
+        kwargs.pop('stream', None)
+        stream = self._client.chat.completions.create(messages=messages, stream=True, **kwargs)
+
+        text = ''
+        finish_reason = None
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta and choice.delta.content:
+                    text += choice.delta.content
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                    break
+                if text.count(self.action_end) >= self.action_groups:
+                    finish_reason = 'stop'
+                    break
+        finally:
+            # Closing the stream aborts the request server-side
+            stream.close()
+
+        message = SimpleNamespace(role='assistant', content=text)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason, logprobs=None)]
+        )
+
+
+def parse_endpoints(base_url: Union[str, Sequence[str]]) -> List[str]:
+    """Split a comma-separated URL string (or list) into endpoint URLs"""
+    if isinstance(base_url, str):
+        base_url = base_url.split(',')
+    return [url.strip().rstrip('/') for url in base_url if url and url.strip()]
+
+
+def _default_client_factory(url: str):
+    from openai import OpenAI
+    return OpenAI(api_key='EMPTY', base_url=url)
+
+
+class Endpoint:
+    """One vLLM replica: its client, breaker and load/latency statistics"""
+
+    def __init__(self, url: str, client, breaker: CircuitBreaker):
+        self.url = url
+        self.client = client
+        self.breaker = breaker
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.latency_ewma: Optional[float] = None
+
+    def available(self) -> bool:
+        """Healthy and not waiting out a circuit-breaker backoff"""
+        if not self.healthy:
+            return False
+        return self.breaker.state != 'open' or time.time() >= self.breaker.open_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'latency_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            'breaker': self.breaker.state,
+        }
+
+
+class _PooledStream:
+    """Wraps a streaming response so the endpoint stays busy until the stream is closed"""
+
+    def __init__(self, pool: 'EndpointPool', endpoint: Endpoint, stream, start: float):
+        self._pool = pool
+        self._endpoint = endpoint
+        self._stream = stream
+        self._start = start
+        self._done = False
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                yield chunk
+        except Exception:
+            self._finish(ok=False)
+            raise
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._finish(ok=True)
+
+    def _finish(self, ok: bool):
+        if not self._done:
+            self._done = True
+            self._pool._release(self._endpoint, time.time() - self._start, ok)
+
+
+class EndpointPool:
+    """
+    Client-side load balancer over several vLLM replicas
+
+    Exposes the same ``models`` / ``chat.completions.create`` surface as the
+    OpenAI client, so it can be handed to VLLMClient (or VLLM_AGENT) in place
+    of a single-endpoint client.
+
+    Routing policies:
+      sticky             - each agent key is pinned to one replica (rendezvous
+                           hashing), so its requests keep hitting a warm prefix
+                           cache; agents spread evenly over replicas without
+                           any coordination between processes
+      least_outstanding  - replica with the fewest in-flight requests
+      latency            - replica with the lowest latency EWMA x (in-flight + 1)
+
+    Replicas that fail health checks or trip their circuit breaker are skipped;
+    sticky keys fall through to their next-ranked replica and return once the
+    original recovers.
+    """
+
+    ROUTING_POLICIES = ('sticky', 'least_outstanding', 'latency')
+
+    def __init__(
+        self,
+        base_urls: Union[str, Sequence[str]],
+        routing: str = 'sticky',
+        health_interval: float = 5.0,
+        failure_threshold: int = 3,
+        max_backoff: float = 30.0,
+        latency_alpha: float = 0.2,
+        client_factory: Optional[Callable[[str], Any]] = None,
+    ):
+        """
+        Args:
+            base_urls: Endpoint URLs (list or comma-separated string, each ending in /v1)
+            routing: 'sticky', 'least_outstanding' or 'latency'
+            health_interval: Seconds between /health checks (0 disables the checker)
+            failure_threshold: Consecutive failures before a replica's circuit opens
+            max_backoff: Maximum seconds between probes of a failed replica
+            latency_alpha: Smoothing factor of the per-replica latency EWMA
+            client_factory: Builds the OpenAI client for a URL (for tests/mocks)
+        """
+        urls = parse_endpoints(base_urls)
+        if not urls:
+            raise ValueError("EndpointPool needs at least one endpoint URL")
+        if routing not in self.ROUTING_POLICIES:
+            raise ValueError(f"routing must be one of {self.ROUTING_POLICIES}")
+
+        factory = client_factory or _default_client_factory
+        self.endpoints = [
+            Endpoint(url, factory(url), CircuitBreaker(failure_threshold=failure_threshold, max_backoff=max_backoff))
+            for url in urls
+        ]
+        self.routing = routing
+        self.latency_alpha = latency_alpha
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_interval and len(self.endpoints) > 1:
+            self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+            self._health_thread.start()
+
+        self.models = self.endpoints[0].client.models
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_chat_completion))
+
+    def bind(self, key: str) -> SimpleNamespace:
+        """Client view whose requests are routed with ``key`` (one per agent)"""
+        return SimpleNamespace(
+            models=self.models,
+            chat=SimpleNamespace(completions=SimpleNamespace(
+                create=lambda **kwargs: self.create_chat_completion(key=key, **kwargs))),
+            pool=self,
+        )
+
+    def _rank(self, key: Optional[str]) -> List[Endpoint]:
+        """Candidate replicas in preference order for this request"""
+        if self.routing == 'sticky' and key is not None:
+            # Rendezvous (highest random weight) hashing: adding or removing a
+            # replica only moves the keys that belong to it
+            def weight(ep):
+                return hashlib.md5(f"{key}|{ep.url}".encode()).digest()
+            return sorted(self.endpoints, key=weight, reverse=True)
+        if self.routing == 'latency':
+            def cost(ep):
+                latency = ep.latency_ewma if ep.latency_ewma is not None else 0.0
+                return (latency * (ep.outstanding + 1), ep.outstanding)
+            return sorted(self.endpoints, key=cost)
+        return sorted(self.endpoints, key=lambda ep: (ep.outstanding, ep.requests))
+
+    def _acquire(self, key: Optional[str]) -> Endpoint:
+        with self._lock:
+            ranked = self._rank(key)
+            for endpoint in ranked:
+                if endpoint.available() and endpoint.breaker.allow_request():
+                    endpoint.outstanding += 1
+                    endpoint.requests += 1
+                    return endpoint
+        raise CircuitOpenError(f"No healthy vLLM endpoint among {len(self.endpoints)}")
+
+    def _release(self, endpoint: Endpoint, elapsed: float, ok: bool):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.breaker.record_success()
+                if endpoint.latency_ewma is None:
+                    endpoint.latency_ewma = elapsed
+                else:
+                    endpoint.latency_ewma += self.latency_alpha * (elapsed - endpoint.latency_ewma)
+            else:
+                endpoint.breaker.record_failure()
+
+    def create_chat_completion(self, key: Optional[str] = None, **kwargs):
+        """Send the request to the replica chosen by the routing policy"""
+        endpoint = self._acquire(key)
+        start = time.time()
+        try:
+            response = endpoint.client.chat.completions.create(**kwargs)
+        except Exception:
+            self._release(endpoint, time.time() - start, ok=False)
+            raise
+        if kwargs.get('stream'):
+            return _PooledStream(self, endpoint, response, start)
+        self._release(endpoint, time.time() - start, ok=True)
+        return response
+
+    def _check_health(self, endpoint: Endpoint) -> bool:
+        # vLLM serves /health at the server root, next to /v1
+        root = endpoint.url[:-len('/v1')] if endpoint.url.endswith('/v1') else endpoint.url
+        try:
+            with urllib.request.urlopen(f"{root}/health", timeout=2.0) as response:
+                return response.status == 200
+        except Exception:
+            return False
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            for endpoint in self.endpoints:
+                healthy = self._check_health(endpoint)
+                if healthy != endpoint.healthy:
+                    print(f"[EndpointPool] {endpoint.url} is {'healthy' if healthy else 'DOWN'}")
+                endpoint.healthy = healthy
+
+    def close(self):
+        """Stop the health checker"""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {endpoint.url: endpoint.stats() for endpoint in self.endpoints}
@@ -1,61 +1,413 @@
 #!/usr/bin/env python3
 """
 Script to download the JarvisVLA model from Hugging Face
+
+Files are downloaded in parallel into a shared content-addressed cache
+(blobs named by their sha256), verified against the repo manifest, and then
+hardlinked into the model directory. Interrupted downloads resume from the
+partial file; other checkouts/hosts pointing at the same cache reuse blobs
+instead of downloading them again.
+
+  python download_model.py
+  python download_model.py --workers 8 --cache-dir /shared/model-cache
+
+Offline: any directory with the same file layout can stand in for the Hub.
+
+  # Record a manifest for an existing checkout, then use it as a mirror
+  python download_model.py --write-manifest ./models/JarvisVLA-Qwen2-VL-7B
+  python download_model.py --mirror ./models/JarvisVLA-Qwen2-VL-7B --local-dir /tmp/model
 """
 
-from huggingface_hub import snapshot_download
+import argparse
+import hashlib
+import json
 import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+MODEL_NAME = "CraftJarvis/JarvisVLA-Qwen2-VL-7B"
+LOCAL_DIR = "./models/JarvisVLA-Qwen2-VL-7B"
+DEFAULT_CACHE_DIR = os.environ.get(
+    'HEROBINE_MODEL_CACHE', str(Path.home() / '.cache' / 'herobine' / 'blobs'))
+MANIFEST_NAME = 'manifest.json'
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class IntegrityError(Exception):
+    """Downloaded content does not match the manifest"""
+
+
+def sha256_file(path, hasher=None) -> str:
+    hasher = hasher or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def git_blob_sha1(path) -> str:
+    """Git object id of a file (what the Hub reports for non-LFS files)"""
+    hasher = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    return sha256_file(path, hasher)
+
+
+def build_manifest(directory: str):
+    """
+    Manifest of every file under `directory` (sizes and sha256)
+
+    Returns:
+        List of {'path', 'size', 'sha256'} dicts, sorted by path
+    """
+    root = Path(directory)
+    entries = []
+    for path in sorted(root.rglob('*')):
+        if path.is_file() and path.name != MANIFEST_NAME and '.cache' not in path.relative_to(root).parts:
+            entries.append({
+                'path': path.relative_to(root).as_posix(),
+                'size': path.stat().st_size,
+                'sha256': sha256_file(path),
+            })
+    return entries
+
+
+def fetch_hub_manifest(repo_id: str, revision: str = None):
+    """
+    Manifest of a Hub repo: LFS files carry a sha256, small files a git sha1
+    """
+    from huggingface_hub import HfApi
+
+    info = HfApi().model_info(repo_id, revision=revision, files_metadata=True)
+    entries = []
+    for sibling in info.siblings:
+        entry = {'path': sibling.rfilename, 'size': sibling.size}
+        if sibling.lfs:
+            lfs = sibling.lfs if isinstance(sibling.lfs, dict) else vars(sibling.lfs)
+            entry['sha256'] = lfs.get('sha256')
+            entry['size'] = lfs.get('size', sibling.size)
+        elif sibling.blob_id:
+            entry['git_sha1'] = sibling.blob_id
+        entries.append(entry)
+    return entries, info.sha
+
+
+def verify_file(path, entry) -> str:
+    """
+    Check size and checksum of `path` against its manifest entry
+
+    Returns:
+        The file's sha256 (used as its cache key)
+    """
+    size = os.path.getsize(path)
+    if entry.get('size') is not None and size != entry['size']:
+        raise IntegrityError(f"{entry['path']}: size {size} != expected {entry['size']}")
+    digest = sha256_file(path)
+    if entry.get('sha256') and digest != entry['sha256']:
+        raise IntegrityError(f"{entry['path']}: sha256 {digest} != expected {entry['sha256']}")
+    if entry.get('git_sha1') and not entry.get('sha256') and git_blob_sha1(path) != entry['git_sha1']:
+        raise IntegrityError(f"{entry['path']}: git sha1 mismatch")
+    return digest
+
+
+class ModelDownloader:
+    """
+    Parallel, resumable, verified download of a manifest into a blob cache
+    """
+
+    def __init__(
+        self,
+        local_dir: str,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        workers: int = 4,
+        repo_id: str = MODEL_NAME,
+        revision: str = None,
+        mirror: str = None,
+        verify: bool = True,
+    ):
+        """
+        Args:
+            local_dir: Model directory to populate (files are hardlinks into the cache)
+            cache_dir: Shared content-addressed blob cache
+            workers: Number of files downloaded concurrently
+            repo_id: Hugging Face repo to download from
+            revision: Branch, tag or commit (default: main)
+            mirror: Local directory to copy from instead of the Hub (offline)
+            verify: Check size and checksum of every file
+        """
+        self.local_dir = Path(local_dir)
+        self.cache_dir = Path(cache_dir)
+        self.workers = max(1, workers)
+        self.repo_id = repo_id
+        self.revision = revision
+        self.mirror = Path(mirror) if mirror else None
+        self.verify = verify
+
+        self.partial_dir = self.cache_dir / 'partial'
+        self.index_path = self.cache_dir / 'index.json'
+        self._lock = threading.Lock()
+        self._session = None
+        self.bytes_fetched = 0
+        self.bytes_reused = 0
+
+    def manifest(self):
+        """Manifest from the mirror (manifest.json, or hashed on the fly) or the Hub"""
+        if self.mirror:
+            manifest_path = self.mirror / MANIFEST_NAME
+            if manifest_path.exists():
+                with open(manifest_path) as f:
+                    return json.load(f)['files']
+            print(f"⚠️  No {MANIFEST_NAME} in mirror, hashing files (integrity is only checked for the copy)")
+            return build_manifest(self.mirror)
+        entries, commit = fetch_hub_manifest(self.repo_id, self.revision)
+        self.revision = self.revision or commit
+        return entries
+
+    # -- cache -------------------------------------------------------------
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.cache_dir / sha256[:2] / sha256
+
+    def _load_index(self):
+        # Maps git sha1 -> sha256 for small files whose sha256 the Hub doesn't report
+        if self.index_path.exists():
+            with open(self.index_path) as f:
+                return json.load(f)
+        return {}
+
+    def _remember(self, git_sha1: str, sha256: str):
+        with self._lock:
+            index = self._load_index()
+            index[git_sha1] = sha256
+            tmp = self.index_path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
 
-def download_jarvis_vla_model():
+    def _cached_blob(self, entry):
+        """Cached blob for this entry, or None (a blob failing its check is dropped and re-fetched)"""
+        sha256 = entry.get('sha256') or self._load_index().get(entry.get('git_sha1'))
+        if not sha256:
+            return None
+        blob = self._blob_path(sha256)
+        if not blob.exists():
+            return None
+        try:
+            size = blob.stat().st_size
+            if entry.get('size') is not None and size != entry['size']:
+                raise IntegrityError(f"{entry['path']}: cached size {size} != expected {entry['size']}")
+            if self.verify:
+                verify_file(blob, dict(entry, sha256=sha256))
+        except IntegrityError as e:
+            print(f"⚠️  {e}, re-fetching")
+            blob.unlink()
+            return None
+        return blob
+
+    # -- fetching ----------------------------------------------------------
+
+    def _open_source(self, entry, offset: int):
+        """File-like object positioned at `offset` for this entry's content"""
+        if self.mirror:
+            f = open(self.mirror / entry['path'], 'rb')
+            f.seek(offset)
+            return f
+
+        import requests
+        from huggingface_hub import hf_hub_url
+
+        if self._session is None:
+            self._session = requests.Session()
+            try:
+                from huggingface_hub import get_token
+                token = get_token()
+            except ImportError:
+                token = None
+            if token:
+                self._session.headers['Authorization'] = f"Bearer {token}"
+        url = hf_hub_url(self.repo_id, entry['path'], revision=self.revision)
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        response = self._session.get(url, headers=headers, stream=True, timeout=60, allow_redirects=True)
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            raise IOError(f"{entry['path']}: server ignored range request")
+        response.raw.decode_content = True
+        return response.raw
+
+    def _fetch(self, entry) -> Path:
+        """Download one file into the cache, resuming a partial download"""
+        partial = self.partial_dir / (entry['path'].replace('/', '__') + '.part')
+        offset = partial.stat().st_size if partial.exists() else 0
+        if entry.get('size') is not None and offset > entry['size']:
+            partial.unlink()
+            offset = 0
+        if offset:
+            print(f"  ↻ Resuming {entry['path']} at {offset / (1024 * 1024):.1f} MB")
+
+        if entry.get('size') is None or offset < entry['size']:
+            source = self._open_source(entry, offset)
+            try:
+                with open(partial, 'ab') as out:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        out.write(chunk)
+                        with self._lock:
+                            self.bytes_fetched += len(chunk)
+            finally:
+                source.close()
+
+        try:
+            sha256 = verify_file(partial, entry) if self.verify else sha256_file(partial)
+        except IntegrityError:
+            partial.unlink()
+            raise
+        blob = self._blob_path(sha256)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partial, blob)
+        os.chmod(blob, 0o444)
+        if entry.get('git_sha1'):
+            self._remember(entry['git_sha1'], sha256)
+        return blob
+
+    def _link(self, blob: Path, dest: Path):
+        """Hardlink the blob into the model directory (copy across filesystems)"""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            if os.path.samefile(blob, dest):
+                return
+            dest.unlink()
+        try:
+            os.link(blob, dest)
+        except OSError:
+            shutil.copyfile(blob, dest)
+
+    def _get(self, entry):
+        dest = self.local_dir / entry['path']
+        blob = self._cached_blob(entry)
+        if blob is not None:
+            with self._lock:
+                self.bytes_reused += blob.stat().st_size
+            status = 'cached'
+        else:
+            blob = self._fetch(entry)
+            status = 'downloaded'
+        self._link(blob, dest)
+        return entry, status
+
+    def run(self):
+        """
+        Download every file in the manifest
+
+        Returns:
+            (ok, list of (path, error) for files that failed)
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+
+        entries = self.manifest()
+        total = sum(e.get('size') or 0 for e in entries)
+        print(f"📋 {len(entries)} files, {total / (1024 ** 3):.2f} GB, {self.workers} workers")
+        print(f"🗄️  Cache: {self.cache_dir}")
+
+        start = time.time()
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._get, entry): entry for entry in entries}
+            for done, future in enumerate(as_completed(futures), 1):
+                entry = futures[future]
+                try:
+                    _, status = future.result()
+                    size_mb = (entry.get('size') or 0) / (1024 * 1024)
+                    print(f"  [{done}/{len(entries)}] {entry['path']}: {size_mb:.1f} MB ({status})")
+                except Exception as e:
+                    failures.append((entry['path'], str(e)))
+                    print(f"  [{done}/{len(entries)}] ❌ {entry['path']}: {e}")
+
+        elapsed = time.time() - start
+        rate = self.bytes_fetched / (1024 * 1024) / elapsed if elapsed > 0 else 0
+        print(f"📊 Fetched {self.bytes_fetched / (1024 ** 3):.2f} GB ({rate:.1f} MB/s), "
+              f"reused {self.bytes_reused / (1024 ** 3):.2f} GB from cache in {elapsed:.1f}s")
+        return not failures, failures
+
+
+def write_manifest(directory: str):
+    """Write manifest.json for a directory so it can be used as a --mirror"""
+    entries = build_manifest(directory)
+    path = Path(directory) / MANIFEST_NAME
+    with open(path, 'w') as f:
+        json.dump({'files': entries}, f, indent=2)
+    print(f"📝 Wrote manifest for {len(entries)} files to {path}")
+    return path
+
+
+def download_jarvis_vla_model(local_dir=LOCAL_DIR, **kwargs):
     """Download the complete JarvisVLA model"""
-    
-    model_name = "CraftJarvis/JarvisVLA-Qwen2-VL-7B"
-    local_dir = "./models/JarvisVLA-Qwen2-VL-7B"
-    
-    print(f"🚀 Downloading {model_name}...")
+
+    source = kwargs.get('mirror') or kwargs.get('repo_id') or MODEL_NAME
+    print(f"🚀 Downloading {source}...")
     print(f"📁 Local directory: {local_dir}")
-    
+
     try:
-        # Create local directory if it doesn't exist
-        os.makedirs(local_dir, exist_ok=True)
-        
-        # Download the model
-        snapshot_download(
-            repo_id=model_name,
-            local_dir=local_dir,
-            local_dir_use_symlinks=False,  # Use actual files instead of symlinks
-            resume_download=True,  # Resume if partially downloaded
-        )
-        
-        print(f"✅ Model downloaded successfully to {local_dir}")
-        print(f"📊 Model size: ~16.6 GB (as shown on Hugging Face)")
-        
-        # List downloaded files
-        print("\n📋 Downloaded files:")
-        for root, dirs, files in os.walk(local_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                size = os.path.getsize(file_path)
-                size_mb = size / (1024 * 1024)
-                print(f"  {file}: {size_mb:.1f} MB")
-        
-        return local_dir
-        
+        ok, failures = ModelDownloader(local_dir, **kwargs).run()
     except Exception as e:
         print(f"❌ Error downloading model: {e}")
         return None
 
+    if not ok:
+        print(f"❌ {len(failures)} files failed (re-run to resume):")
+        for path, error in failures:
+            print(f"  {path}: {error}")
+        return None
+
+    print(f"✅ Model downloaded and verified in {local_dir}")
+    return local_dir
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Download the JarvisVLA model')
+    parser.add_argument('--repo-id', type=str, default=MODEL_NAME,
+                        help='Hugging Face repo to download')
+    parser.add_argument('--revision', type=str, default=None,
+                        help='Branch, tag or commit (default: main)')
+    parser.add_argument('--local-dir', type=str, default=LOCAL_DIR,
+                        help='Where to place the model files')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                        help='Shared blob cache (env HEROBINE_MODEL_CACHE)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of files downloaded in parallel')
+    parser.add_argument('--mirror', type=str, default=None,
+                        help='Copy from this local directory instead of the Hub (offline)')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='Skip size/checksum verification')
+    parser.add_argument('--write-manifest', type=str, default=None, metavar='DIR',
+                        help='Write manifest.json for DIR (to use it as a mirror) and exit')
+    args = parser.parse_args()
+
+    if args.write_manifest:
+        write_manifest(args.write_manifest)
+        sys.exit(0)
+
     print("📥 JarvisVLA Model Downloader")
     print("=" * 40)
-    
-    model_path = download_jarvis_vla_model()
-    
+
+    model_path = download_jarvis_vla_model(
+        local_dir=args.local_dir,
+        cache_dir=args.cache_dir,
+        workers=args.workers,
+        repo_id=args.repo_id,
+        revision=args.revision,
+        mirror=args.mirror,
+        verify=not args.no_verify,
+    )
+
     if model_path:
         print(f"\n🎉 Download complete!")
         print(f"🚀 You can now serve the model with:")
         print(f"   CUDA_VISIBLE_DEVICES=0 vllm serve {model_path} --port 8000 --max-model-len 4096")
         print(f"\n📝 Or use the Hugging Face model name directly:")
-        print(f"   CUDA_VISIBLE_DEVICES=0 vllm serve CraftJarvis/JarvisVLA-Qwen2-VL-7B --port 8000 --max-model-len 4096")
+        print(f"   CUDA_VISIBLE_DEVICES=0 vllm serve {MODEL_NAME} --port 8000 --max-model-len 4096")
     else:
         print("❌ Download failed!")
+        sys.exit(1)
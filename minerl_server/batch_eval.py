@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Batch Evaluation Runner for JarvisVLA on MineRL
+Runs a task list across a pool of workers, each owning its own MineRL
+environment and agent, instead of one episode at a time from the console.
+
+Progress is checkpointed to results.jsonl after every episode; re-running
+with the same --output-dir skips episodes that already finished and retries
+those that ended in an error (the summary counts each episode's latest result).
+
+Task list formats:
+  .jsonl - one JSON object per line; the instruction is taken from
+           'instruction', 'task' or 'title' and the id from 'request_id',
+           'task_id' or 'id' (line number if none)
+  other  - one instruction per line ('#' comments ignored)
+
+Example:
+  python batch_eval.py --checkpoint /path/to/model --tasks tasks.jsonl \\
+      --workers 4 --max-steps 500 --output-dir eval_runs/run1
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def load_tasks(path: str):
+    """
+    Load tasks from a JSONL or plain-text task list
+
+    Returns:
+        List of {'task_id', 'instruction'} dicts
+    """
+    tasks = []
+    with open(path) as f:
+        lines = [line.strip() for line in f]
+
+    if path.endswith('.jsonl'):
+        for i, line in enumerate(lines):
+            if not line:
+                continue
+            entry = json.loads(line)
+            instruction = entry.get('instruction') or entry.get('task') or entry.get('title')
+            if not instruction:
+                logger.warning(f"Skipping line {i + 1}: no instruction field")
+                continue
+            task_id = entry.get('request_id') or entry.get('task_id') or entry.get('id') or f"task-{i + 1:04d}"
+            tasks.append({'task_id': str(task_id), 'instruction': instruction})
+    else:
+        for i, line in enumerate(lines):
+            if line and not line.startswith('#'):
+                tasks.append({'task_id': f"task-{i + 1:04d}", 'instruction': line})
+
+    return tasks
+
+
+def load_checkpoint(results_path: Path):
+    """Return the set of (task_id, repeat) recorded in results.jsonl without an error"""
+    done = set()
+    if results_path.exists():
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partial line from an interrupted run
+                    continue
+                key = (result['task_id'], result.get('repeat', 0))
+                if result.get('error'):
+                    # Crashed episode: run it again (a later success supersedes it)
+                    done.discard(key)
+                else:
+                    done.add(key)
+    return done
+
+
+def worker_main(worker_id: int, config: dict, task_queue, result_queue):
+    """
+    Worker process: build one env + agent, then run episodes until a None task arrives
+    """
+    from minerl_server.server_minerl import MineRLAgentServer
+
+    try:
+        server = MineRLAgentServer(
+            checkpoint_path=config['checkpoint'],
+            vllm_base_url=config['vllm_url'],
+            log_dir=str(Path(config['output_dir']) / f"worker_{worker_id}"),
+            fps=config['fps'],
+            temperature=config['temperature'],
+            interactive_realtime=False,
+            seed=config['seed'] + worker_id,
+            fast_reset=config['fast_reset'],
+            full_reset_every=config['full_reset_every'],
+            routing=config['routing'],
+            agent_key=f"batch-worker-{worker_id}",
+        )
+    except Exception as e:
+        logger.error(f"[Worker {worker_id}] Failed to start: {e}", exc_info=True)
+        result_queue.put(('worker_failed', worker_id, str(e)))
+        return
+
+    result_queue.put(('worker_ready', worker_id, None))
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            result = server.run_episode(task['instruction'], max_steps=config['max_steps'])
+            result.update(task_id=task['task_id'], repeat=task['repeat'], worker=worker_id)
+            result_queue.put(('result', worker_id, result))
+    finally:
+        server.close()
+        result_queue.put(('worker_done', worker_id, None))
+
+
+def summarize(results, wall_s: float):
+    """Aggregate statistics over all recorded episode results"""
+    n = len(results)
+    errors = [r for r in results if r.get('error')]
+    ok = [r for r in results if not r.get('error')]
+    by_task = {}
+    for r in results:
+        stats = by_task.setdefault(r['task_id'], {'instruction': r['instruction'], 'episodes': 0,
+                                                  'rewarded': 0, 'total_reward': 0.0})
+        stats['episodes'] += 1
+        stats['rewarded'] += int(r.get('total_reward', 0) > 0)
+        stats['total_reward'] += r.get('total_reward', 0.0)
+
+    return {
+        'episodes': n,
+        'errors': len(errors),
+        'success_rate': sum(r.get('total_reward', 0) > 0 for r in ok) / len(ok) if ok else 0.0,
+        'terminated_rate': sum(r.get('terminated', False) for r in ok) / len(ok) if ok else 0.0,
+        'mean_reward': sum(r.get('total_reward', 0.0) for r in ok) / len(ok) if ok else 0.0,
+        'mean_steps': sum(r.get('steps', 0) for r in ok) / len(ok) if ok else 0.0,
+        'mean_episode_s': sum(r.get('duration_s', 0.0) for r in ok) / len(ok) if ok else 0.0,
+        'wall_s_this_run': wall_s,
+        'per_task': by_task,
+    }
+
+
+def run_batch(args):
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results_path = output_dir / 'results.jsonl'
+
+    tasks = load_tasks(args.tasks)
+    done = load_checkpoint(results_path)
+    pending = [
+        dict(task, repeat=r)
+        for task in tasks for r in range(args.repeats)
+        if (task['task_id'], r) not in done
+    ]
+    logger.info(f"{len(tasks)} tasks x {args.repeats} repeats: "
+                f"{len(done)} already done, {len(pending)} to run on {args.workers} workers")
+
+    start = time.time()
+    if pending:
+        ctx = mp.get_context('spawn')  # MineRL/JVM state must not be forked
+        task_queue = ctx.Queue()
+        result_queue = ctx.Queue()
+        for task in pending:
+            task_queue.put(task)
+
+        n_workers = min(args.workers, len(pending))
+        for _ in range(n_workers):
+            task_queue.put(None)
+
+        config = {
+            'checkpoint': args.checkpoint,
+            'vllm_url': args.vllm_url,
+            'output_dir': str(output_dir),
+            'fps': args.fps,
+            'temperature': args.temperature,
+            'max_steps': args.max_steps,
+            'seed': args.seed,
+            'fast_reset': args.fast_reset,
+            'full_reset_every': args.full_reset_every,
+            'routing': args.routing,
+        }
+        workers = [
+            ctx.Process(target=worker_main, args=(i, config, task_queue, result_queue), daemon=True)
+            for i in range(n_workers)
+        ]
+        for w in workers:
+            w.start()
+
+        finished_workers = set()
+        completed = 0
+        with open(results_path, 'a') as results_file:
+            while len(finished_workers) < n_workers:
+                try:
+                    kind, worker_id, payload = result_queue.get(timeout=10)
+                except queue.Empty:
+                    # A worker that crashed hard (e.g. JVM abort) never reports back
+                    for i, w in enumerate(workers):
+                        if not w.is_alive() and i not in finished_workers:
+                            logger.error(f"Worker {i} exited unexpectedly (code {w.exitcode})")
+                            finished_workers.add(i)
+                    continue
+                if kind == 'result':
+                    results_file.write(json.dumps(payload) + '\n')
+                    results_file.flush()
+                    os.fsync(results_file.fileno())
+                    completed += 1
+                    logger.info(f"[{completed}/{len(pending)}] worker {worker_id} "
+                                f"{payload['task_id']}#{payload['repeat']}: "
+                                f"{payload['steps']} steps, reward={payload['total_reward']:.2f}"
+                                + (f", error={payload['error']}" if payload['error'] else ""))
+                elif kind == 'worker_ready':
+                    logger.info(f"Worker {worker_id} ready")
+                elif kind in ('worker_done', 'worker_failed'):
+                    finished_workers.add(worker_id)
+                    if kind == 'worker_failed':
+                        logger.error(f"Worker {worker_id} failed to start: {payload}")
+
+        for w in workers:
+            w.join(timeout=30)
+
+        if completed < len(pending):
+            logger.warning(f"{len(pending) - completed} episodes did not run; re-run to resume")
+
+    with open(results_path) as f:
+        # Latest result per episode, so retried errors are not counted twice
+        latest = {}
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            latest[(result['task_id'], result.get('repeat', 0))] = result
+        results = list(latest.values())
+
+    summary = summarize(results, time.time() - start)
+    with open(output_dir / 'summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    logger.info("=" * 60)
+    logger.info(f"Episodes: {summary['episodes']} ({summary['errors']} errors)")
+    logger.info(f"Success rate: {summary['success_rate']:.1%}, mean reward: {summary['mean_reward']:.3f}")
+    logger.info(f"Mean steps: {summary['mean_steps']:.1f}, mean episode time: {summary['mean_episode_s']:.1f}s")
+    logger.info(f"Summary written to {output_dir / 'summary.json'}")
+    logger.info("=" * 60)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Batch evaluation of JarvisVLA on MineRL across a worker pool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--checkpoint", type=str, required=True,
+                        help="Path to JarvisVLA checkpoint")
+    parser.add_argument("--tasks", type=str, required=True,
+                        help="Task list (.jsonl or one instruction per line)")
+    parser.add_argument("--vllm-url", type=str, default="http://localhost:8000/v1",
+                        help="VLLM server URL (comma-separated URLs load-balance across replicas)")
+    parser.add_argument("--routing", type=str, default="sticky",
+                        choices=["sticky", "least_outstanding", "latency"],
+                        help="How workers' requests are spread over VLLM replicas")
+    parser.add_argument("--output-dir", type=str, default="eval_runs/latest",
+                        help="Where results.jsonl, summary.json and worker logs go")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Number of parallel environment/agent workers")
+    parser.add_argument("--repeats", type=int, default=1,
+                        help="Episodes per task")
+    parser.add_argument("--max-steps", type=int, default=500,
+                        help="Maximum steps per episode")
+    parser.add_argument("--fps", type=int, default=0,
+                        help="Per-worker FPS cap (0 = uncapped)")
+    parser.add_argument("--temperature", type=float, default=0.7,
+                        help="VLLM sampling temperature")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Base world seed (worker i uses seed + i)")
+    parser.add_argument("--fast-reset", action="store_true",
+                        help="Reset by restoring player state instead of regenerating the world")
+    parser.add_argument("--full-reset-every", type=int, default=0,
+                        help="With --fast-reset, regenerate the world every N resets (0 = never)")
+    args = parser.parse_args()
+
+    run_batch(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Fast Episode Reset for MineRL
+Snapshots the player state after the first real reset, then restores it on
+later resets with in-game commands instead of regenerating/reloading the world.
+
+Imported lazily by MineRLEnv (only when fast_reset is enabled) because it
+depends on MineStudio.
+"""
+
+from typing import Dict, List, Optional
+
+from minestudio.simulator.callbacks import MinecraftCallback
+
+
+class SnapshotResetCallback(MinecraftCallback):
+    """
+    Teleport-and-clear reset
+
+    On the first reset the world is created normally and the player's
+    position, rotation and inventory are recorded. Every following reset
+    skips ``env.reset()`` and instead:
+
+      - removes all non-player entities (mobs, dropped items)
+      - clears the inventory and status effects
+      - restores health and hunger
+      - teleports back to the snapshot position/rotation
+      - resets time/weather (if configured) and gives back the starting inventory
+
+    Blocks the agent changed are NOT restored; use ``full_reset_every`` to
+    periodically regenerate the world and bound drift.
+    """
+
+    def __init__(
+        self,
+        full_reset_every: int = 0,
+        start_time: Optional[int] = None,
+        start_weather: Optional[str] = 'clear',
+        restore_inventory: bool = True,
+    ):
+        """
+        Args:
+            full_reset_every: Do a real world reset every N resets (0 = only the first)
+            start_time: World time to set on fast reset (None keeps current time)
+            start_weather: Weather to set on fast reset (None keeps current weather)
+            restore_inventory: Give back the inventory recorded in the snapshot
+        """
+        super().__init__()
+        self.full_reset_every = full_reset_every
+        self.start_time = start_time
+        self.start_weather = start_weather
+        self.restore_inventory = restore_inventory
+
+        self.snapshot: Optional[Dict] = None
+        self.resets = 0
+        self.fast_resets = 0
+        self.last_reset_fast = False
+        self._pending_full_reset = True
+
+    def before_reset(self, sim, reset_flag: bool) -> bool:
+        self.resets += 1
+        full_due = self.full_reset_every and (self.resets - 1) % self.full_reset_every == 0
+        if self.snapshot is None or full_due:
+            self._pending_full_reset = True
+            self.last_reset_fast = False
+            return reset_flag
+
+        for command in self.restore_commands():
+            sim.env.execute_cmd(command)
+        self.fast_resets += 1
+        self.last_reset_fast = True
+        self._pending_full_reset = False
+        return False
+
+    def after_reset(self, sim, obs, info):
+        if self._pending_full_reset:
+            self.snapshot = self._take_snapshot(info)
+            self._pending_full_reset = False
+        return obs, info
+
+    @staticmethod
+    def _take_snapshot(info: Dict) -> Dict:
+        location = info.get('location_stats', {})
+        inventory = []
+        for slot in (info.get('inventory') or {}).values():
+            item = slot.get('type') if isinstance(slot, dict) else None
+            quantity = int(slot.get('quantity', 0)) if isinstance(slot, dict) else 0
+            if item and item != 'none' and item != 'air' and quantity > 0:
+                inventory.append((item, quantity))
+        return {
+            'x': float(location.get('xpos', 0)),
+            'y': float(location.get('ypos', 0)),
+            'z': float(location.get('zpos', 0)),
+            'yaw': float(location.get('yaw', 0)),
+            'pitch': float(location.get('pitch', 0)),
+            'inventory': inventory,
+        }
+
+    def restore_commands(self) -> List[str]:
+        """Commands that bring the world back to the snapshot state"""
+        s = self.snapshot
+        commands = [
+            '/kill @e[type=!player]',
+            '/clear @p',
+            '/effect clear @p',
+            '/effect give @p minecraft:instant_health 1 10 true',
+            '/effect give @p minecraft:saturation 1 20 true',
+            f"/tp @p {s['x']:.3f} {s['y']:.3f} {s['z']:.3f} {s['yaw']:.2f} {s['pitch']:.2f}",
+        ]
+        if self.start_time is not None:
+            commands.append(f'/time set {self.start_time}')
+        if self.start_weather:
+            commands.append(f'/weather {self.start_weather}')
+        if self.restore_inventory:
+            for item, quantity in s['inventory']:
+                commands.append(f'/give @p minecraft:{item} {quantity}')
+        return commands
@@ -3,20 +3,42 @@ MineRL Environment Wrapper for JarvisVLA
 Provides proper first-person POV rendering with hands, HUD, and GUI support
 
 Note: JarvisVLA agent outputs actions directly compatible with MineRL's 
-action_type="agent" mode. No action mapping needed!
+action_type="agent" mode. No action mapping needed! Local policies send
+plain MineRL env actions instead (action_type="env").
 """
 
+import time
 import numpy as np
 from typing import Dict, Any, Tuple, Optional
 from PIL import Image
-import gymnasium as gym
 
-from minestudio.simulator import MinecraftSim
-from minestudio.simulator.callbacks import (
-    RecordCallback,
-    CommandsCallback,
-    RewardsCallback,
-)
+from bridge.observation_views import make_views, parse_view_spec
+
+
+# Minecraft runs at 20 ticks per second; one env step is one tick
+REALTIME_TICK_S = 0.05
+
+
+def count_tcp_connections(port: int) -> int:
+    """
+    Count established TCP connections whose local port is `port`
+
+    Reads /proc/net/tcp{,6} directly (Linux only) so it costs well under a
+    millisecond and needs no extra dependencies. Returns 0 if unavailable.
+    """
+    count = 0
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as f:
+                next(f)  # header
+                for line in f:
+                    fields = line.split()
+                    local_port = int(fields[1].rsplit(':', 1)[1], 16)
+                    if local_port == port and fields[3] == '01':  # 01 = ESTABLISHED
+                        count += 1
+        except (OSError, IndexError, ValueError, StopIteration):
+            continue
+    return count
 
 
 class MineRLEnv:
@@ -36,6 +58,12 @@ class MineRLEnv:
         callbacks=None,
         interactive_port: Optional[int] = None,  # Port for human interaction
         interactive_realtime: bool = True,
+        fast_reset: bool = False,
+        full_reset_every: int = 0,
+        spectator_aware: bool = False,
+        spectator_check_interval: float = 1.0,
+        views=None,
+        action_type: str = 'agent',
     ):
         """
         Initialize MineRL environment
@@ -47,11 +75,32 @@ class MineRLEnv:
             callbacks: List of MinecraftSim callbacks
             interactive_port: If set, enables interactive mode on this port
             interactive_realtime: If True, slows tick speed to real-time for humans
+            fast_reset: Restore a snapshot of the player state on reset instead
+                of regenerating the world (first reset is always a full one)
+            full_reset_every: With fast_reset, do a full world reset every N resets (0 = never)
+            spectator_aware: Run ticks uncapped and only throttle to real time
+                while a human interactor is connected (overrides interactive_realtime)
+            spectator_check_interval: Seconds between spectator connection checks
+            views: Multi-resolution views to add as obs['views'] (spec string
+                like 'overview=0.5,crosshair,gui' or parsed dict, see
+                bridge/observation_views.py); with 'nofull' the pov is the overview
+            action_type: 'agent' for JarvisVLA actions, 'env' for MineRL env
+                action dicts (button name -> 0/1, 'camera' -> [pitch, yaw])
         """
         # Default callbacks - minimal set to avoid initialization issues
         if callbacks is None:
             callbacks = []  # Use empty list for simplicity
         
+        self.snapshot_callback = None
+        if fast_reset:
+            from minerl_server.fast_reset import SnapshotResetCallback
+            self.snapshot_callback = SnapshotResetCallback(full_reset_every=full_reset_every)
+            callbacks = [self.snapshot_callback] + list(callbacks)
+        
+        # MineStudio pulls in the whole simulator stack (gymnasium, torch, ...),
+        # so it is only imported once an environment is actually created
+        from minestudio.simulator import MinecraftSim
+        
         # Create MineRL simulator
         # Start with 'env' type for initialization, will switch to 'agent' after setup
         self.env = MinecraftSim(
@@ -65,8 +114,16 @@ class MineRLEnv:
         self._last_obs = None
         self.interactive_port = interactive_port
         self.interactive_realtime = interactive_realtime
+        self.spectator_aware = spectator_aware and bool(interactive_port)
+        self.spectator_check_interval = spectator_check_interval
+        self._spectators = 0
+        self._last_spectator_check = 0.0
+        self._last_step_time = None
         self._interactive_enabled = False
-        self._action_type_switched = False
+        self.action_type = action_type
+        self._action_type_switched = action_type != 'agent'
+        self.last_reset_s = None
+        self.views = parse_view_spec(views) if isinstance(views, str) else views
         
     def reset(self) -> Tuple[Dict, Dict]:
         """
@@ -76,10 +133,16 @@ class MineRLEnv:
             observation: Dict with 'pov' (PIL Image) and other info
             info: Additional info dict
         """
+        reset_start = time.time()
         obs, info = self.env.reset()
         self._last_obs = obs
+        self.last_reset_s = time.time() - reset_start
+        if self.snapshot_callback:
+            kind = 'fast' if self.snapshot_callback.last_reset_fast else 'full'
+            print(f"[MineRLEnv] Reset ({kind}) took {self.last_reset_s:.1f}s")
         
-        # Enable interactive mode if port specified
+        # Enable interactive mode if port specified (once - a fast reset
+        # keeps the same server, so this is never redone)
         if self.interactive_port and not self._interactive_enabled:
             self.enable_interactive_mode()
         
@@ -103,9 +166,11 @@ class MineRLEnv:
         python3 -m minestudio.simulator.minerl.interactor <local_port> --ip localhost
         """
         try:
+            # In spectator-aware mode the simulator always runs uncapped and
+            # step() does the real-time pacing only while someone is watching
             self.env.make_interactive(
                 port=self.interactive_port,
-                realtime=self.interactive_realtime,
+                realtime=self.interactive_realtime and not self.spectator_aware,
                 max_players=10
             )
             self._interactive_enabled = True
@@ -128,6 +193,9 @@ class MineRLEnv:
             truncated: Whether episode was truncated
             info: Additional info
         """
+        if self.spectator_aware:
+            self._pace_for_spectators()
+        
         # JarvisVLA agent already outputs actions compatible with action_type='agent'
         # No conversion needed!
         obs, reward, terminated, truncated, info = self.env.step(action)
@@ -138,6 +206,36 @@ class MineRLEnv:
         
         return formatted_obs, reward, terminated, truncated, info
     
+    def spectators_connected(self) -> int:
+        """
+        Number of human interactors connected to the interactive port
+        
+        Re-checked at most every `spectator_check_interval` seconds.
+        """
+        if not self.interactive_port:
+            return 0
+        now = time.time()
+        if now - self._last_spectator_check >= self.spectator_check_interval:
+            spectators = count_tcp_connections(self.interactive_port)
+            if spectators != self._spectators:
+                if spectators:
+                    print(f"[MineRLEnv] {spectators} spectator(s) connected - throttling to real time")
+                else:
+                    print(f"[MineRLEnv] No spectators - running at full simulator speed")
+            self._spectators = spectators
+            self._last_spectator_check = now
+        return self._spectators
+    
+    def _pace_for_spectators(self):
+        """Sleep so ticks run at real time (20/s), but only while someone is watching"""
+        now = time.time()
+        if self.spectators_connected() and self._last_step_time is not None:
+            wait = self._last_step_time + REALTIME_TICK_S - now
+            if wait > 0:
+                time.sleep(wait)
+                now = time.time()
+        self._last_step_time = now
+    
     def _format_observation(self, obs: Dict, info: Dict) -> Dict:
         """
         Format observation to match expected format
@@ -157,6 +255,7 @@ class MineRLEnv:
             'rotation': {pitch, yaw},
             'health': int,
             'food': int,
+            'views': {name: PIL.Image} (only with views configured),
         }
         """
         # Extract POV - THIS WILL HAVE HANDS VISIBLE!
@@ -183,6 +282,12 @@ class MineRLEnv:
             'food': info.get('food_level', 20),
         }
         
+        # Overview and crops are cut from the same POV array (crops are slices)
+        if self.views:
+            formatted['views'] = make_views(pov_array, self.views)
+            if not self.views['full']:
+                formatted['pov'] = formatted['views']['overview']
+        
         return formatted
     
     def get_pov_image(self) -> Image.Image:
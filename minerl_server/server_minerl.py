@@ -8,18 +8,16 @@ to watch/interact with the agent in real-time.
 
 import time
 import sys
+import threading
 from pathlib import Path
 import logging
-from PIL import Image
 import numpy as np
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from minerl_server.minerl_env import MineRLEnv
-
-# Import JarvisVLA agent directly
-from jarvisvla.evaluate import agent_wrapper
+from bridge.quality_controller import QualityController, build_knobs, parse_bounds
 
 # Setup logging
 logging.basicConfig(
@@ -29,6 +27,32 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class LocalPolicyAgent:
+    """
+    Runs a bridge local policy (random / explore / replay) behind the
+    VLLM_AGENT.forward() interface, so the server loop can be driven and
+    profiled without torch, JarvisVLA or a vLLM endpoint. Actions are MineRL
+    env actions (the env is created with action_type='env').
+    """
+    
+    def __init__(self, policy):
+        from mineflayer_env import BUTTON_NAMES
+        self.policy = policy
+        self.button_names = BUTTON_NAMES
+    
+    def reset(self):
+        self.policy.reset()
+    
+    def forward(self, observations, instructions, verbos=False, need_crafting_table=False):
+        action = self.policy.get_action({}, verbos=verbos)
+        if action.get('type') != 'compound':
+            action = {'camera': [0, 0], 'buttons': {}}
+        buttons = action.get('buttons') or {}
+        env_action = {name: int(bool(buttons.get(name, 0))) for name in self.button_names}
+        env_action['camera'] = np.asarray(action.get('camera', [0, 0]), dtype=np.float32)
+        return env_action
+
+
 class MineRLAgentServer:
     """
     Main server that runs JarvisVLA agent in MineRL environment
@@ -37,33 +61,76 @@ class MineRLAgentServer:
     
     def __init__(
         self,
-        checkpoint_path: str,
+        checkpoint_path: str = None,
         vllm_base_url: str = "http://localhost:8000/v1",
         log_dir: str = "agent_logs_minerl",
         fps: int = 20,
         temperature: float = 0.7,
         interactive_port: int = None,
         interactive_realtime: bool = True,
+        seed: int = 0,
+        fast_reset: bool = False,
+        full_reset_every: int = 0,
+        auto_realtime: bool = False,
+        max_consecutive_failures: int = 3,
+        step_timeout: float = 60.0,
+        routing: str = 'sticky',
+        agent_key: str = None,
+        views: str = None,
+        replay_session: str = None,
+        replay_step_latency: str = None,
+        latency_slo: float = None,
+        quality_bounds: str = None,
+        policy: str = None,
+        policy_log: str = None,
     ):
         """
         Initialize MineRL agent server
         
         Args:
-            checkpoint_path: Path to JarvisVLA checkpoint
-            vllm_base_url: URL of VLLM server
+            checkpoint_path: Path to JarvisVLA checkpoint (not needed with policy)
+            vllm_base_url: URL of VLLM server (comma-separated URLs load-balance
+                across several replicas)
             log_dir: Directory to save screenshots and logs
-            fps: Target FPS for agent loop
+            fps: Target FPS for agent loop (0 = uncapped)
             temperature: VLLM sampling temperature
             interactive_port: If set, enables interactive mode on this port
             interactive_realtime: If True, slows tick speed to real-time
+            seed: World seed for the MineRL environment
+            fast_reset: Restore player state between episodes instead of
+                regenerating the world
+            full_reset_every: With fast_reset, regenerate the world every N
+                resets to bound world drift (0 = never)
+            auto_realtime: Run at full speed and only slow to real time while a
+                spectator is connected (requires interactive_port)
+            max_consecutive_failures: Simulator step failures in a row before
+                the environment is restarted
+            step_timeout: Seconds a single env step may take before the
+                simulator is considered hung and killed (0 = no watchdog)
+            routing: How requests are spread over multiple VLLM replicas
+                ('sticky', 'least_outstanding', 'latency')
+            agent_key: Sticky-routing key (defaults to one derived from the seed)
+            views: Multi-resolution view spec for obs['views'], e.g.
+                'overview=0.5,crosshair,gui' ('nofull' feeds the overview to the model)
+            replay_session: Serve frames from a recorded session (session_*.jsonl,
+                JPEG directory or 'synthetic') instead of starting Minecraft
+            replay_step_latency: Latency spec injected into replayed steps (ms)
+            latency_slo: Target p95 step latency in ms; scales down the POV sent
+                to the model to hold it
+            quality_bounds: Cheapest settings for latency_slo, e.g. 'scale=0.5'
+            policy: Run a local policy ('random', 'explore', 'replay') instead
+                of JarvisVLA - with replay_session the whole stack runs
+                without Java, MineStudio, torch or vLLM
+            policy_log: Session log for the replay policy
         """
         self.checkpoint_path = checkpoint_path
         self.vllm_base_url = vllm_base_url
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True, parents=True)
         self.fps = fps
-        self.step_delay = 1.0 / fps
+        self.step_delay = 1.0 / fps if fps else 0.0
         self.interactive_port = interactive_port
+        self.auto_realtime = auto_realtime and bool(interactive_port)
         
         # Initialize environment (THIS WILL USE REAL MINECRAFT CLIENT!)
         logger.info("Initializing MineRL environment...")
@@ -76,24 +143,64 @@ class MineRLAgentServer:
             logger.info(f"    Connect with: python3 -m minestudio.simulator.minerl.interactor {interactive_port}")
             logger.info(f"    (Use port forwarding if running on remote server)")
         
-        self.env = MineRLEnv(
+        self._env_kwargs = dict(
             obs_size=(360, 640),
             render_size=(360, 640),
+            seed=seed,
             interactive_port=interactive_port,
             interactive_realtime=interactive_realtime,
+            fast_reset=fast_reset,
+            full_reset_every=full_reset_every,
+            spectator_aware=self.auto_realtime,
+            views=views,
+            action_type='env' if policy else 'agent',
         )
+        self._env_class = MineRLEnv
+        if replay_session:
+            # Recorded frames in-process: profiles the server without Java/MineStudio
+            sys.path.insert(0, str(Path(__file__).parent.parent / "bridge"))
+            from replay_env import ReplayEnv
+            logger.info(f"  - Replaying session {replay_session} instead")
+            self._env_class = ReplayEnv
+            self._env_kwargs = dict(
+                recording=replay_session,
+                obs_format='minerl',
+                step_latency=replay_step_latency,
+                views=views,
+            )
+        self.env = self._env_class(**self._env_kwargs)
         logger.info("✓ MineRL environment ready!")
         
-        # Initialize agent (using JarvisVLA directly)
-        logger.info(f"Initializing JarvisVLA agent with {vllm_base_url}...")
-        self.agent = agent_wrapper.VLLM_AGENT(
-            checkpoint_path=checkpoint_path,
-            base_url=vllm_base_url,
-            temperature=temperature,
-            history_num=0,
-            action_chunk_len=1,
-            instruction_type='normal',
-        )
+        self.endpoint_pool = None
+        if policy:
+            sys.path.insert(0, str(Path(__file__).parent.parent / "bridge"))
+            from local_policies import make_policy
+            logger.info(f"Using local '{policy}' policy instead of JarvisVLA")
+            self.agent = LocalPolicyAgent(make_policy(policy, seed=seed, replay_path=policy_log))
+        else:
+            if not checkpoint_path:
+                raise ValueError("checkpoint_path is required unless a local policy is used")
+            # Initialize agent (using JarvisVLA directly)
+            # Imported lazily so `--help` and helper tools start without torch
+            from jarvisvla.evaluate import agent_wrapper
+            
+            from bridge.vllm_client import EndpointPool, parse_endpoints
+            
+            endpoints = parse_endpoints(vllm_base_url)
+            logger.info(f"Initializing JarvisVLA agent with {', '.join(endpoints)}...")
+            self.agent = agent_wrapper.VLLM_AGENT(
+                checkpoint_path=checkpoint_path,
+                base_url=endpoints[0],
+                temperature=temperature,
+                history_num=0,
+                action_chunk_len=1,
+                instruction_type='normal',
+            )
+            if len(endpoints) > 1:
+                # Sticky routing keeps this server on one replica's warm prefix cache
+                self.endpoint_pool = EndpointPool(endpoints, routing=routing)
+                self.agent.client = self.endpoint_pool.bind(agent_key or f"seed-{seed}")
+                logger.info(f"Load-balancing over {len(endpoints)} VLLM endpoints ({routing} routing)")
         logger.info("✓ Agent initialized!")
         
         self.current_instruction = None
@@ -126,19 +233,98 @@ class MineRLAgentServer:
         self.step_count = 0
         self.running = False
         
+        # Simulator health: consecutive step failures trigger an env restart,
+        # and a monitor thread kills the simulator if a step hangs
+        self.max_consecutive_failures = max_consecutive_failures
+        self.step_timeout = step_timeout
+        self.restarts = 0
+        self.degraded_steps = 0
+        self._step_started = None
+        # Set by the monitor after it killed a hung simulator: the loop
+        # restarts right away instead of stepping the dead one
+        self._env_killed = threading.Event()
+        self._monitor_stop = threading.Event()
+        if step_timeout:
+            threading.Thread(target=self._hang_monitor, daemon=True).start()
+        
+        # Latency SLO: the agent is built with a fixed history and chunk
+        # length and encodes frames itself, so only the POV scale moves (the
+        # JPEG quality here is just the debug screenshots' - not on the step path)
+        self.pov_scale = 1.0
+        self.quality = None
+        if latency_slo:
+            current = {'scale': self.pov_scale}
+            appliers = {'scale': lambda scale: setattr(self, 'pov_scale', scale)}
+            self.quality = QualityController(
+                latency_slo,
+                build_knobs(parse_bounds(quality_bounds), current, appliers),
+                log=logger.info
+            )
+            logger.info(f"Holding p95 step latency to {latency_slo:.0f}ms "
+                        f"(knobs: {', '.join(knob.name for knob in self.quality.knobs) or 'none'})")
+        
+    def _hang_monitor(self):
+        """Kill the simulator if a single env step runs longer than step_timeout"""
+        while not self._monitor_stop.wait(1.0):
+            started = self._step_started
+            if started and time.time() - started > self.step_timeout:
+                logger.error(f"Env step hung for more than {self.step_timeout:.0f}s - killing simulator")
+                self._step_started = None
+                try:
+                    self.env.close()
+                except Exception as e:
+                    logger.error(f"Error closing hung simulator: {e}")
+                self._env_killed.set()
+    
+    def _restart_env(self):
+        """Replace the simulator with a fresh one and return its first observation"""
+        logger.warning("Restarting MineRL environment...")
+        try:
+            self.env.close()
+        except Exception:
+            pass
+        self._env_killed.clear()
+        self.env = self._env_class(**self._env_kwargs)
+        obs, info = self.env.reset()
+        self.agent.reset()
+        self.restarts += 1
+        logger.info(f"✓ Environment restarted (restarts: {self.restarts})")
+        return obs, info
+    
+    def health_stats(self):
+        """Restart and degraded-step counters (plus per-endpoint stats when load-balancing)"""
+        stats = {'restarts': self.restarts, 'degraded_steps': self.degraded_steps}
+        if self.endpoint_pool:
+            stats['endpoints'] = self.endpoint_pool.stats()
+        return stats
+    
     def run_episode(self, instruction: str, max_steps: int = 1000):
         """
         Run single episode with given instruction
         
+        The world seed is not per episode: it is fixed when the server is
+        built (MineRLAgentServer(seed=...)); batch_eval.py gives each worker
+        its own server and seed.
+        
         Args:
             instruction: Task instruction for agent
             max_steps: Maximum steps per episode
+            
+        Returns:
+            Episode result dict (steps, total_reward, terminated, error, duration_s)
         """
         logger.info(f"Starting episode with instruction: {instruction}")
+        episode_start = time.time()
+        total_reward = 0.0
+        terminated = truncated = False
+        error = None
         
-        # Reset environment
-        obs, info = self.env.reset()
-        self.agent.reset()
+        # Reset environment (a simulator killed by the hang monitor is replaced)
+        if self._env_killed.is_set():
+            obs, info = self._restart_env()
+        else:
+            obs, info = self.env.reset()
+            self.agent.reset()
         self.current_instruction = instruction
         
         if self.interactive_port:
@@ -151,12 +337,18 @@ class MineRLAgentServer:
         
         self.running = True
         self.step_count = 0
+        consecutive_failures = 0
         
         # Main loop
         while self.running and self.step_count < max_steps:
             step_start = time.time()
             
             try:
+                if self._env_killed.is_set():
+                    # Killed by the hang monitor between steps
+                    obs, info = self._restart_env()
+                    consecutive_failures = 0
+                
                 # Get POV image (THIS WILL HAVE HANDS!)
                 pov_image = obs['pov']
                 
@@ -174,6 +366,10 @@ class MineRLAgentServer:
                     )
                 
                 # Get action from agent
+                if self.pov_scale != 1.0:
+                    width, height = pov_image.size
+                    pov_image = pov_image.resize((round(width * self.pov_scale), round(height * self.pov_scale)))
+                
                 # JarvisVLA agent.forward() returns actions directly compatible with MineRL
                 action = self.agent.forward(
                     observations=[pov_image],  # List of images
@@ -183,7 +379,23 @@ class MineRLAgentServer:
                 )
                 
                 # Execute action
-                obs, reward, terminated, truncated, info = self.env.step(action)
+                self._step_started = time.time()
+                try:
+                    obs, reward, terminated, truncated, info = self.env.step(action)
+                except Exception as e:
+                    consecutive_failures += 1
+                    self.degraded_steps += 1
+                    logger.error(f"Env step failed at step {self.step_count} "
+                                 f"({consecutive_failures}/{self.max_consecutive_failures}): {e}")
+                    # A simulator the hang monitor killed will never step again
+                    if self._env_killed.is_set() or consecutive_failures >= self.max_consecutive_failures:
+                        obs, info = self._restart_env()
+                        consecutive_failures = 0
+                    continue
+                finally:
+                    self._step_started = None
+                consecutive_failures = 0
+                total_reward += float(reward or 0.0)
                 
                 # Check termination
                 if terminated or truncated:
@@ -191,15 +403,20 @@ class MineRLAgentServer:
                     break
                 
                 self.step_count += 1
+                if self.quality:
+                    self.quality.record(time.time() - step_start)
                 
-                # Maintain FPS
+                # Maintain FPS (in auto-realtime mode the env paces itself
+                # while watched and runs uncapped otherwise)
                 elapsed = time.time() - step_start
-                if elapsed < self.step_delay:
+                if not self.auto_realtime and elapsed < self.step_delay:
                     time.sleep(self.step_delay - elapsed)
                 
                 actual_fps = 1.0 / max(elapsed, 0.001)
                 if self.step_count % 100 == 0:
                     logger.info(f"Running at {actual_fps:.1f} FPS")
+                    if self.quality:
+                        logger.info(f"Quality: {self.quality.stats()}")
                     
             except KeyboardInterrupt:
                 logger.info("Interrupted by user")
@@ -207,9 +424,21 @@ class MineRLAgentServer:
                 break
             except Exception as e:
                 logger.error(f"Error at step {self.step_count}: {e}", exc_info=True)
+                error = str(e)
                 break
         
         logger.info(f"Episode completed: {self.step_count} steps")
+        return {
+            'instruction': instruction,
+            'steps': self.step_count,
+            'total_reward': total_reward,
+            'terminated': bool(terminated),
+            'truncated': bool(truncated),
+            'error': error,
+            'duration_s': time.time() - episode_start,
+            'restarts': self.restarts,
+            'degraded_steps': self.degraded_steps,
+        }
         
     def run_interactive(self):
         """
@@ -244,6 +473,9 @@ class MineRLAgentServer:
     def close(self):
         """Clean up resources"""
         logger.info("Closing environment...")
+        self._monitor_stop.set()
+        if self.endpoint_pool:
+            self.endpoint_pool.close()
         self.env.close()
         logger.info("Done!")
 
@@ -271,14 +503,21 @@ Examples:
     parser.add_argument(
         "--checkpoint",
         type=str,
-        required=True,
-        help="Path to JarvisVLA checkpoint",
+        default=None,
+        help="Path to JarvisVLA checkpoint (required unless --policy is given)",
     )
     parser.add_argument(
         "--vllm-url",
         type=str,
         default="http://localhost:8000/v1",
-        help="VLLM server URL",
+        help="VLLM server URL (comma-separated URLs load-balance across replicas)",
+    )
+    parser.add_argument(
+        "--routing",
+        type=str,
+        default="sticky",
+        choices=["sticky", "least_outstanding", "latency"],
+        help="How requests are spread over multiple VLLM replicas",
     )
     parser.add_argument(
         "--log-dir",
@@ -315,8 +554,73 @@ Examples:
         action="store_true",
         help="Disable real-time mode (agent runs at full speed, not human-watchable)",
     )
+    parser.add_argument(
+        "--auto-realtime",
+        action="store_true",
+        help="Run at full speed and throttle to real time only while a spectator is connected",
+    )
+    parser.add_argument(
+        "--fast-reset",
+        action="store_true",
+        help="Reset episodes by restoring player state instead of regenerating the world",
+    )
+    parser.add_argument(
+        "--full-reset-every",
+        type=int,
+        default=0,
+        help="With --fast-reset, regenerate the world every N resets (0 = never)",
+    )
+    parser.add_argument(
+        "--views",
+        type=str,
+        default=None,
+        help="Multi-resolution observation views, e.g. 'overview=0.5,crosshair,gui' "
+             "(add 'nofull' to feed the overview to the model instead of the full frame)",
+    )
+    parser.add_argument(
+        "--replay-session",
+        type=str,
+        default=None,
+        help="Replay a recorded session_*.jsonl, JPEG directory or 'synthetic' "
+             "instead of running Minecraft (for profiling the server loop)",
+    )
+    parser.add_argument(
+        "--replay-step-latency",
+        type=str,
+        default=None,
+        help="Latency injected into replayed steps, e.g. 'normal:50,10' (ms)",
+    )
+    parser.add_argument(
+        "--latency-slo",
+        type=float,
+        default=None,
+        help="Target p95 step latency in ms; lowers the POV scale sent to the model "
+             "at runtime to hold it (default: off)",
+    )
+    parser.add_argument(
+        "--quality-bounds",
+        type=str,
+        default=None,
+        help="Cheapest settings the latency SLO may go to, e.g. 'scale=0.5'",
+    )
+    parser.add_argument(
+        "--policy",
+        type=str,
+        default=None,
+        choices=["random", "explore", "replay"],
+        help="Drive the agent with a local policy instead of JarvisVLA (no checkpoint "
+             "or vLLM needed; with --replay-session no Minecraft either)",
+    )
+    parser.add_argument(
+        "--policy-log",
+        type=str,
+        default=None,
+        help="Session log (or directory of them) for --policy replay",
+    )
     
     args = parser.parse_args()
+    if not args.checkpoint and not args.policy:
+        parser.error("--checkpoint is required unless --policy is given")
     
     # Create server
     server = MineRLAgentServer(
@@ -326,6 +630,17 @@ Examples:
         fps=args.fps,
         interactive_port=args.interactive_port,
         interactive_realtime=not args.no_realtime,
+        fast_reset=args.fast_reset,
+        full_reset_every=args.full_reset_every,
+        auto_realtime=args.auto_realtime,
+        routing=args.routing,
+        views=args.views,
+        replay_session=args.replay_session,
+        replay_step_latency=args.replay_step_latency,
+        latency_slo=args.latency_slo,
+        quality_bounds=args.quality_bounds,
+        policy=args.policy,
+        policy_log=args.policy_log,
     )
     
     # Run
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Prepare the JarvisVLA checkpoint for fast vLLM cold starts
+
+Rewrites the checkpoint's safetensors weights into evenly sized shards:
+
+  - tensors are ordered by layer so each shard is read front to back
+  - the data section starts on an aligned offset, so tensors (stored
+    back to back, as the format requires) keep their natural alignment when
+    the shard is mmapped
+  - shards are sized to a fixed target (default 2 GB), so vLLM's loader
+    threads get balanced work instead of one huge file and a tiny tail
+
+Tensor bytes are copied as-is (dtype-agnostic, no torch needed); only the
+layout changes. Config, tokenizer and processor files are linked next to
+the new shards. start_vllm_server.sh serves <model>-prepared automatically
+when it exists.
+
+  python prepare_model.py
+  python prepare_model.py --source ./models/JarvisVLA-Qwen2-VL-7B --shard-size-gb 4
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import struct
+import time
+from pathlib import Path
+
+SOURCE_DIR = "./models/JarvisVLA-Qwen2-VL-7B"
+ALIGNMENT = 64
+COPY_CHUNK = 64 * 1024 * 1024
+PREPARED_MARKER = '.prepared.json'
+
+
+def read_safetensors_header(path: Path):
+    """
+    Returns:
+        (header dict without __metadata__, metadata dict, byte offset of the data section)
+    """
+    with open(path, 'rb') as f:
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+    metadata = header.pop('__metadata__', {}) or {}
+    return header, metadata, 8 + header_len
+
+
+def _layer_key(name: str):
+    """Sort key that orders tensors by layer number (layers.2 before layers.10)"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def plan_shards(tensors, shard_size: int):
+    """
+    Group tensors into shards of at most `shard_size` bytes (a single larger
+    tensor gets a shard of its own)
+
+    Args:
+        tensors: List of (name, nbytes) in write order
+    Returns:
+        List of shards, each a list of tensor names
+    """
+    shards, current, current_size = [], [], 0
+    for name, nbytes in tensors:
+        if current and current_size + nbytes > shard_size:
+            shards.append(current)
+            current, current_size = [], 0
+        current.append(name)
+        current_size += nbytes
+    if current:
+        shards.append(current)
+    return shards
+
+
+def write_shard(out_path: Path, names, sources, metadata):
+    """Write one safetensors shard whose data section starts ALIGNMENT-aligned"""
+    header = {'__metadata__': metadata}
+    offset = 0
+    for name in names:
+        info = sources[name]['info']
+        nbytes = info['data_offsets'][1] - info['data_offsets'][0]
+        header[name] = {'dtype': info['dtype'], 'shape': info['shape'], 'data_offsets': [offset, offset + nbytes]}
+        offset += nbytes
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+    # Pad so the data section itself starts aligned
+    header_bytes += b' ' * (-(8 + len(header_bytes)) % ALIGNMENT)
+
+    tmp = out_path.with_suffix('.tmp')
+    handles = {}
+    try:
+        with open(tmp, 'wb') as out:
+            out.write(struct.pack('<Q', len(header_bytes)))
+            out.write(header_bytes)
+            for name in names:
+                src = sources[name]
+                begin, end = src['info']['data_offsets']
+                f = handles.get(src['file'])
+                if f is None:
+                    f = handles[src['file']] = open(src['file'], 'rb')
+                f.seek(src['data_start'] + begin)
+                remaining = end - begin
+                while remaining:
+                    chunk = f.read(min(COPY_CHUNK, remaining))
+                    if not chunk:
+                        raise IOError(f"{src['file']} truncated while copying {name}")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+    finally:
+        for f in handles.values():
+            f.close()
+    os.replace(tmp, out_path)
+    return offset
+
+
+def prepare_model(source: str, output: str = None, shard_size_gb: float = 2.0, force: bool = False):
+    """
+    Reshard `source` into `output` (default: <source>-prepared)
+
+    Returns:
+        Path of the prepared model directory
+    """
+    source = Path(source)
+    output = Path(output) if output else source.with_name(source.name + '-prepared')
+    marker = output / PREPARED_MARKER
+
+    weight_files = sorted(source.glob('*.safetensors'))
+    if not weight_files:
+        raise FileNotFoundError(f"No .safetensors files in {source}")
+
+    signature = {p.name: [p.stat().st_size, int(p.stat().st_mtime)] for p in weight_files}
+    if marker.exists() and not force:
+        with open(marker) as f:
+            if json.load(f).get('source') == signature:
+                print(f"✅ {output} is up to date")
+                return output
+
+    start = time.time()
+    sources, metadata = {}, {}
+    for path in weight_files:
+        header, file_metadata, data_start = read_safetensors_header(path)
+        metadata.update(file_metadata)
+        for name, info in header.items():
+            sources[name] = {'file': path, 'info': info, 'data_start': data_start}
+
+    ordered = sorted(sources, key=_layer_key)
+    sizes = [(n, sources[n]['info']['data_offsets'][1] - sources[n]['info']['data_offsets'][0]) for n in ordered]
+    total = sum(size for _, size in sizes)
+    shards = plan_shards(sizes, int(shard_size_gb * 1024 ** 3))
+    print(f"📦 {len(sources)} tensors, {total / 1024 ** 3:.2f} GB: "
+          f"{len(weight_files)} source files -> {len(shards)} shards")
+
+    output.mkdir(parents=True, exist_ok=True)
+    for old in output.glob('*.safetensors'):
+        old.unlink()
+
+    weight_map = {}
+    for i, names in enumerate(shards, 1):
+        shard_name = f"model-{i:05d}-of-{len(shards):05d}.safetensors"
+        size = write_shard(output / shard_name, names, sources, metadata)
+        weight_map.update({name: shard_name for name in names})
+        print(f"  {shard_name}: {len(names)} tensors, {size / 1024 ** 2:.0f} MB")
+
+    with open(output / 'model.safetensors.index.json', 'w') as f:
+        json.dump({'metadata': {'total_size': total}, 'weight_map': weight_map}, f, indent=2)
+
+    # Everything else (config, tokenizer, processor, chat template) is shared
+    for path in source.iterdir():
+        if path.is_file() and path.suffix != '.safetensors' and path.name != 'model.safetensors.index.json':
+            dest = output / path.name
+            if dest.exists():
+                dest.unlink()
+            try:
+                os.link(path, dest)
+            except OSError:
+                shutil.copyfile(path, dest)
+
+    with open(marker, 'w') as f:
+        json.dump({'source': signature, 'shards': len(shards), 'alignment': ALIGNMENT}, f, indent=2)
+    print(f"✅ Prepared model written to {output} in {time.time() - start:.1f}s")
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reshard the checkpoint for fast vLLM loading')
+    parser.add_argument('--source', type=str, default=SOURCE_DIR,
+                        help='Downloaded Hugging Face checkpoint')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output directory (default: <source>-prepared)')
+    parser.add_argument('--shard-size-gb', type=float, default=2.0,
+                        help='Target shard size')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild even if the prepared model is up to date')
+    args = parser.parse_args()
+
+    prepare_model(args.source, args.output, args.shard_size_gb, args.force)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Import-time profiler for the bridge and minerl_server modules
+
+Runs each module import in a fresh interpreter with `python -X importtime`
+and reports total import time plus the slowest imports it pulled in.
+Use it to check that servers and helper tools start quickly and that heavy
+packages (jarvisvla, minestudio, torch, gymnasium) stay out of import time.
+
+  python profile_imports.py
+  python profile_imports.py --top 15 bridge:server_mineflayer
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+
+# target -> (directory added to sys.path, module to import)
+DEFAULT_TARGETS = [
+    'bridge:mineflayer_env',
+    'bridge:vllm_client',
+    'bridge:vllm_agent_adapter',
+    'bridge:server_mineflayer',
+    '.:minerl_server.minerl_env',
+    '.:minerl_server.server_minerl',
+]
+
+HEAVY_PACKAGES = ('jarvisvla', 'minestudio', 'torch', 'gymnasium', 'transformers', 'vllm')
+
+
+def profile_import(path: str, module: str):
+    """
+    Import `module` in a subprocess and parse the -X importtime report
+
+    Returns:
+        (error or None, total_us, list of (cumulative_us, self_us, name))
+    """
+    code = f"import sys; sys.path.insert(0, {str(ROOT / path)!r}); import {module}"
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+        except ValueError:
+            continue
+
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed'
+
+    total = next((c for c, _, n in rows if n.strip() == module), 0)
+    return error, total, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile import time of bridge/minerl_server modules')
+    parser.add_argument('targets', nargs='*', default=DEFAULT_TARGETS,
+                        help='Targets as <dir>:<module> (default: all server modules)')
+    parser.add_argument('--top', type=int, default=8,
+                        help='Number of slowest imports to show per target')
+    args = parser.parse_args()
+
+    print(f"{'module':<34} {'import time':>12}  heavy packages loaded")
+    print("-" * 80)
+    details = []
+    for target in args.targets:
+        path, _, module = target.partition(':')
+        error, total, rows = profile_import(path, module)
+        loaded = {n.strip().split('.')[0] for _, _, n in rows}
+        heavy = sorted(loaded.intersection(HEAVY_PACKAGES))
+        status = f"{total / 1000:>10.1f}ms" if not error else f"{'FAILED':>12}"
+        print(f"{module:<34} {status}  {', '.join(heavy) or '-'}")
+        details.append((module, error, rows))
+
+    for module, error, rows in details:
+        print()
+        print(f"[{module}] slowest imports (cumulative):")
+        if error:
+            print(f"  error: {error}")
+        for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:>9.1f}ms  (self {self_us / 1000:>7.1f}ms)  {name.strip()}")
+
+
+if __name__ == '__main__':
+    main()
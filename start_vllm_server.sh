@@ -5,9 +5,12 @@ set -e
 
 echo "🚀 Starting JarvisVLA vLLM Server..."
 
-# Check if model exists locally
+# Check if model exists locally (prefer the resharded copy from prepare_model.py)
 MODEL_PATH="./models/JarvisVLA-Qwen2-VL-7B"
-if [ -d "$MODEL_PATH" ]; then
+if [ -f "$MODEL_PATH-prepared/.prepared.json" ]; then
+    echo "✅ Found prepared model at $MODEL_PATH-prepared"
+    MODEL_TO_SERVE="$MODEL_PATH-prepared"
+elif [ -d "$MODEL_PATH" ]; then
     echo "✅ Found local model at $MODEL_PATH"
     MODEL_TO_SERVE="$MODEL_PATH"
 else
@@ -19,12 +22,27 @@ fi
 PORT=${PORT:-3000}
 MAX_MODEL_LEN=${MAX_MODEL_LEN:-8192}
 GPU_ID=${CUDA_VISIBLE_DEVICES:-0}
+ENABLE_PREFIX_CACHING=${ENABLE_PREFIX_CACHING:-1}
+WARMUP=${WARMUP:-1}
+WARMUP_REQUESTS=${WARMUP_REQUESTS:-8}
+READY_FILE=${READY_FILE:-/tmp/vllm_ready_$PORT}
+WARMUP_LOG=${WARMUP_LOG:-./vllm_startup.jsonl}
+
+# Automatic prefix caching lets every agent step reuse the KV cache of the
+# shared system prompt + instruction prefix
+if [ "$ENABLE_PREFIX_CACHING" = "1" ]; then
+    PREFIX_CACHING_FLAG="--enable-prefix-caching"
+else
+    PREFIX_CACHING_FLAG="--no-enable-prefix-caching"
+fi
 
 echo "🔧 Configuration:"
 echo "  Model: $MODEL_TO_SERVE"
 echo "  Port: $PORT"
 echo "  Max Model Length: $MAX_MODEL_LEN"
 echo "  GPU: $GPU_ID"
+echo "  Prefix Caching: $ENABLE_PREFIX_CACHING"
+echo "  Warm-up: $WARMUP ($WARMUP_REQUESTS requests, ready file $READY_FILE)"
 echo ""
 
 echo "🌟 Starting vLLM server..."
@@ -34,10 +52,33 @@ echo ""
 echo "⏹️  Press Ctrl+C to stop the server"
 echo ""
 
+# The ready file only exists once the server has loaded and been warmed up,
+# so launchers/health checks can wait on it instead of on /health
+rm -f "$READY_FILE"
+STARTED_AT=$(date +%s.%N)
+
 # Start the vLLM server
 CUDA_VISIBLE_DEVICES=$GPU_ID vllm serve \
     "$MODEL_TO_SERVE" \
     --port $PORT \
     --max-model-len $MAX_MODEL_LEN \
     --trust-remote-code \
-    --served-model-name JarvisVLA-Qwen2-VL-7B
+    $PREFIX_CACHING_FLAG \
+    --served-model-name JarvisVLA-Qwen2-VL-7B &
+VLLM_PID=$!
+trap 'kill $VLLM_PID 2>/dev/null; rm -f "$READY_FILE"' INT TERM EXIT
+
+# Send synthetic POV + instruction requests before reporting ready, so the
+# first agent step doesn't pay for graph capture and compilation
+if [ "$WARMUP" = "1" ]; then
+    python3 "$(dirname "$0")/warmup_vllm.py" \
+        --base-url "http://localhost:$PORT/v1" \
+        --requests $WARMUP_REQUESTS \
+        --started-at $STARTED_AT \
+        --ready-file "$READY_FILE" \
+        --log "$WARMUP_LOG" || echo "⚠️  Warm-up failed, server is still starting/running"
+else
+    touch "$READY_FILE"
+fi
+
+wait $VLLM_PID
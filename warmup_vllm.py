@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+vLLM Warm-up Driver
+Waits for a freshly started vLLM server to come up, then sends synthetic
+agent requests (POV frame + instruction) so CUDA graph capture, kernel
+compilation and image-processor setup happen before real agents connect.
+
+Logs the server load time (until /health answers), the first-request
+latency and the latency of every later warm-up request, and touches a ready
+file once warm. start_vllm_server.sh runs this automatically.
+
+  python warmup_vllm.py --base-url http://localhost:3000/v1 --requests 8
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent / 'bridge'))
+
+from vllm_client import layout_messages
+
+INSTRUCTIONS = [
+    'chop down a tree and collect logs',
+    'craft a crafting table',
+    'mine stone with a wooden pickaxe',
+    'kill a cow and collect leather',
+    'build a dirt pillar',
+]
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def synthetic_frame(width: int = 640, height: int = 360) -> str:
+    """Sky/ground gradient with noise, encoded like a real POV frame"""
+    sky = Image.linear_gradient('L').resize((width, height // 2)).convert('RGB')
+    ground = Image.new('RGB', (width, height - height // 2), (90, 140, 60))
+    frame = Image.new('RGB', (width, height))
+    frame.paste(sky, (0, 0))
+    frame.paste(ground, (0, height // 2))
+    noise = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    frame = Image.blend(frame, noise, 0.1)
+    buffer = io.BytesIO()
+    frame.save(buffer, format='JPEG', quality=85)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def wait_for_health(base_url: str, timeout: float, started_at: float) -> float:
+    """
+    Poll /health until the server answers
+
+    Returns:
+        Seconds from `started_at` until the server was healthy
+    """
+    root = base_url.rstrip('/')
+    root = root[:-len('/v1')] if root.endswith('/v1') else root
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{root}/health", timeout=2.0) as response:
+                if response.status == 200:
+                    return time.time() - started_at
+        except Exception:
+            pass
+        time.sleep(1.0)
+    raise TimeoutError(f"vLLM at {root} not healthy after {timeout:.0f}s")
+
+
+def warmup(client, model: str, requests: int, max_tokens: int, width: int, height: int):
+    """
+    Send synthetic agent requests
+
+    Returns:
+        List of per-request latencies in seconds (first request first)
+    """
+    latencies = []
+    for i in range(requests):
+        messages = layout_messages([{'role': 'user', 'content': [
+            {'type': 'text', 'text': random.choice(INSTRUCTIONS)},
+            {'type': 'image_url', 'image_url': {'url': synthetic_frame(width, height)}},
+        ]}], SYSTEM_PROMPT)
+        start = time.perf_counter()
+        client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens, temperature=0.0)
+        latencies.append(time.perf_counter() - start)
+        print(f"[Warmup] Request {i + 1}/{requests}: {latencies[-1] * 1000:.0f}ms")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Wait for vLLM and warm it up with synthetic requests')
+    parser.add_argument('--base-url', type=str, default='http://localhost:3000/v1',
+                        help='vLLM OpenAI-compatible base URL')
+    parser.add_argument('--requests', type=int, default=8,
+                        help='Number of warm-up requests')
+    parser.add_argument('--max-tokens', type=int, default=16,
+                        help='Tokens generated per warm-up request')
+    parser.add_argument('--width', type=int, default=640,
+                        help='Synthetic frame width')
+    parser.add_argument('--height', type=int, default=360,
+                        help='Synthetic frame height')
+    parser.add_argument('--timeout', type=float, default=1800,
+                        help='Seconds to wait for the server to become healthy')
+    parser.add_argument('--started-at', type=float, default=None,
+                        help='Unix time the server process was started (for load time)')
+    parser.add_argument('--ready-file', type=str, default=None,
+                        help='File to touch once the server is warm')
+    parser.add_argument('--log', type=str, default=None,
+                        help='Append a JSON line with the timings to this file')
+    args = parser.parse_args()
+
+    from openai import OpenAI
+
+    started_at = args.started_at or time.time()
+    print(f"[Warmup] Waiting for {args.base_url}...")
+    load_s = wait_for_health(args.base_url, args.timeout, started_at)
+    print(f"[Warmup] Server healthy after {load_s:.1f}s")
+
+    client = OpenAI(api_key='EMPTY', base_url=args.base_url)
+    model = client.models.list().data[0].id
+    latencies = warmup(client, model, args.requests, args.max_tokens, args.width, args.height)
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'base_url': args.base_url,
+        'model': model,
+        'load_s': round(load_s, 2),
+        'first_request_ms': round(latencies[0] * 1000, 1) if latencies else None,
+        'warm_request_ms': round(sorted(latencies[1:])[len(latencies[1:]) // 2] * 1000, 1) if len(latencies) > 1 else None,
+        'ready_s': round(time.time() - started_at, 2),
+    }
+    print(f"[Warmup] Load {report['load_s']}s, first request {report['first_request_ms']}ms, "
+          f"warm p50 {report['warm_request_ms']}ms, ready after {report['ready_s']}s")
+
+    if args.log:
+        with open(args.log, 'a') as f:
+            f.write(json.dumps(report) + '\n')
+    if args.ready_file:
+        Path(args.ready_file).write_text(json.dumps(report))
+        print(f"[Warmup] Ready ({args.ready_file})")
+
+
+if __name__ == '__main__':
+    main()